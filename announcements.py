@@ -0,0 +1,127 @@
+"""
+Announcement dispatcher for iRacing Number Bot
+Batches claim/release announcements per channel so bursts become one message
+"""
+
+import asyncio
+import discord
+import logging
+from typing import Optional, List, Dict, Tuple
+from occupancy import DEFAULT_CLASS, number_label
+
+logger = logging.getLogger('iRacingBot.Announcements')
+
+# (kind, car number, user mention, car class) where kind is 'claimed' or 'released'
+AnnouncementEvent = Tuple[str, int, Optional[str], str]
+
+MAX_LINES_PER_FIELD = 20
+
+
+class AnnouncementDispatcher:
+    """Buffers announcement events per channel and posts them as one embed per window"""
+
+    def __init__(self, bot, window: float = 3.0):
+        self.bot = bot
+        self.window = window
+        self._buffers: Dict[int, List[AnnouncementEvent]] = {}
+        self._flush_tasks: Dict[int, asyncio.Task] = {}
+        self.messages_sent = 0
+        self.events_sent = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of events waiting to be posted across all channels"""
+        return sum(len(events) for events in self._buffers.values())
+
+    def announce(
+        self,
+        channel_id: int,
+        kind: str,
+        car_number: int,
+        user_mention: Optional[str] = None,
+        car_class: str = DEFAULT_CLASS
+    ):
+        """Queue an announcement; returns immediately and posts after the batching window"""
+        self._buffers.setdefault(channel_id, []).append((kind, car_number, user_mention, car_class))
+
+        if channel_id not in self._flush_tasks:
+            self._flush_tasks[channel_id] = asyncio.create_task(self._flush_later(channel_id))
+
+    async def _flush_later(self, channel_id: int):
+        await asyncio.sleep(self.window)
+        self._flush_tasks.pop(channel_id, None)
+        await self._flush(channel_id)
+
+    async def _flush(self, channel_id: int):
+        events = self._buffers.pop(channel_id, [])
+        if not events:
+            return
+
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            logger.warning(f"Dropping {len(events)} announcement(s) for unknown channel {channel_id}")
+            return
+
+        try:
+            await channel.send(embed=self._build_embed(events))
+            self.messages_sent += 1
+            self.events_sent += len(events)
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to send announcements to channel {channel_id}: {e}")
+
+    async def flush_all(self):
+        """Post everything still buffered right away (used on shutdown)"""
+        tasks = list(self._flush_tasks.values())
+        self._flush_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for channel_id in list(self._buffers):
+            await self._flush(channel_id)
+
+    def _build_embed(self, events: List[AnnouncementEvent]) -> discord.Embed:
+        """One event keeps the original single-claim look; several are combined"""
+        if len(events) == 1:
+            kind, number, mention, car_class = events[0]
+            number = number_label(number, car_class) if car_class else number
+            if kind == 'claimed':
+                return discord.Embed(
+                    title="🏁 New Number Claimed",
+                    description=f"{mention} claimed number **{number}**",
+                    color=discord.Color.blue()
+                )
+            return discord.Embed(
+                title="🏁 Number Released",
+                description=f"Number **{number}** is now available",
+                color=discord.Color.orange()
+            )
+
+        claimed = [
+            f"**{number_label(number, car_class)}** - {mention}"
+            for kind, number, mention, car_class in events if kind == 'claimed'
+        ]
+        released = [
+            f"**{number_label(number, car_class)}**"
+            for kind, number, mention, car_class in events if kind == 'released'
+        ]
+
+        embed = discord.Embed(
+            title="🏁 Number Updates",
+            description=f"{len(claimed)} claimed, {len(released)} released",
+            color=discord.Color.blue()
+        )
+
+        if claimed:
+            embed.add_field(name="Numbers Claimed", value=self._join_lines(claimed), inline=False)
+        if released:
+            embed.add_field(name="Numbers Released", value=self._join_lines(released), inline=False)
+
+        return embed
+
+    @staticmethod
+    def _join_lines(lines: List[str]) -> str:
+        text = "\n".join(lines[:MAX_LINES_PER_FIELD])
+        if len(lines) > MAX_LINES_PER_FIELD:
+            text += f"\n…and {len(lines) - MAX_LINES_PER_FIELD} more"
+        return text[:1024]
@@ -0,0 +1,328 @@
+"""
+Command load benchmark for iRacing Number Bot
+Drives the slash command cogs with fake interactions against a temporary, seeded SQLite database
+
+Usage:
+    python benchmarks/command_load.py [--guilds 20] [--claims 300] [--requests 500]
+                                      [--concurrency 16] [--only claim,roster] [--json out.json]
+
+For every command it reports throughput and p50/p95/p99 latency under the given
+concurrency, and the average number of SQL statements one call executes.
+No Discord connection or iRacing account is needed.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Any, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import discord
+from bot import iRacingNumberBot
+from database import Database
+from commands.claim import ClaimCommands
+from commands.release import ReleaseCommands
+from commands.roster import RosterCommands
+from commands.sync import SyncCommands
+from commands.admin import AdminCommands
+
+MIN_NUMBER, MAX_NUMBER = 1, 999
+FIRST_GUILD_ID = 1 << 32
+FIRST_USER_ID = 1 << 40
+_interaction_ids = itertools.count(1)
+
+
+class FakeMessage:
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeResponse:
+    def __init__(self):
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+
+    async def edit_message(self, *args, **kwargs):
+        self._done = True
+
+
+class FakeFollowup:
+    async def send(self, *args, **kwargs):
+        return FakeMessage()
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"driver{user_id - FIRST_USER_ID}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.roles = []
+        self.guild_permissions = discord.Permissions.all()
+
+    def __str__(self):
+        return self.name
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.name = f"League {guild_id - FIRST_GUILD_ID}"
+
+    def get_role(self, role_id: int):
+        return None
+
+    def get_member(self, user_id: int):
+        return None
+
+
+class FakeInteraction:
+    """The parts of discord.Interaction the cogs use"""
+
+    type = discord.InteractionType.application_command
+
+    def __init__(self, bot, guild_id: int, user_id: int):
+        self.id = next(_interaction_ids)
+        self.client = bot
+        self.guild_id = guild_id
+        self.guild = FakeGuild(guild_id)
+        self.user = FakeUser(user_id)
+        self.channel = None
+        self.command = None
+        self.extras = {}
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+class FakeIRacing:
+    """Answers like the iRacing API would, without the network"""
+
+    def __init__(self, rosters: Dict[int, List[Dict[str, Any]]]):
+        self.rosters = rosters
+
+    async def authenticate(self) -> bool:
+        return True
+
+    async def get_member_info(self, customer_id: int) -> Dict[str, Any]:
+        return {'cust_id': customer_id, 'display_name': f"Driver {customer_id}"}
+
+    async def get_members_info(self, customer_ids, batch_size: int = 50) -> Dict[int, Dict[str, Any]]:
+        return {cid: await self.get_member_info(cid) for cid in customer_ids}
+
+    async def get_league_roster(self, league_id: int) -> List[Dict[str, Any]]:
+        return self.rosters.get(league_id, [])
+
+    async def close(self):
+        pass
+
+
+class QueryCounter:
+    """Counts SQL statements run on the database connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement: str):
+        self.count += 1
+
+
+async def seed(db: Database, guilds: int, claims: int, rng: random.Random) -> Dict[int, List[Dict[str, Any]]]:
+    """Configure synthetic guilds with claims; returns an iRacing roster per league"""
+    rosters = {}
+    for g in range(guilds):
+        guild_id = FIRST_GUILD_ID + g
+        league_id = 1000 + g
+        await db.set_guild_config(guild_id, league_id=league_id, min_number=MIN_NUMBER, max_number=MAX_NUMBER)
+
+        numbers = rng.sample(range(MIN_NUMBER, MAX_NUMBER + 1), min(claims, MAX_NUMBER - MIN_NUMBER + 1))
+        rows = [
+            {
+                'car_number': number,
+                'discord_user_id': FIRST_USER_ID + i,
+                'discord_username': f"driver{i}",
+                'iracing_id': 100000 + i,
+                'iracing_name': f"Driver {i}",
+            }
+            for i, number in enumerate(numbers)
+        ]
+        await db.bulk_claim(guild_id, rows, FIRST_USER_ID)
+
+        # iRacing knows most of the claims plus a few drivers the bot hasn't seen
+        rosters[league_id] = [
+            {'cust_id': row['iracing_id'], 'car_number': row['car_number'], 'display_name': row['iracing_name']}
+            for row in rows[: int(len(rows) * 0.9)]
+        ] + [
+            {'cust_id': 900000 + n, 'car_number': n, 'display_name': f"Newcomer {n}"}
+            for n in range(MIN_NUMBER, MAX_NUMBER + 1) if n not in numbers
+        ][:10]
+
+    return rosters
+
+
+def scenarios(bot) -> List[Tuple[str, Callable[[random.Random, int, int], Any]]]:
+    """(name, call) pairs; call(rng, guild_id, user_id) returns the coroutine to run"""
+    claim = ClaimCommands(bot)
+    release = ReleaseCommands(bot)
+    roster = RosterCommands(bot)
+    sync = SyncCommands(bot)
+    admin = AdminCommands(bot)
+
+    def run(cog, command, **kwargs):
+        def call(rng, guild_id, user_id):
+            interaction = FakeInteraction(bot, guild_id, user_id)
+            args = {key: value(rng) if callable(value) else value for key, value in kwargs.items()}
+            return getattr(cog, command).callback(cog, interaction, **args)
+        return call
+
+    def own_number(rng, guild_id, user_id):
+        """Release one of the seeded claims, as the user who holds it"""
+        occupancy = bot.db.occupancy.get(guild_id)
+        number = rng.choice(list(occupancy.claimed)) if occupancy and occupancy.claimed else MIN_NUMBER
+        holder = occupancy.claimed.get(number) if occupancy else None
+        interaction = FakeInteraction(bot, guild_id, holder or user_id)
+        return release.release.callback(release, interaction, number=number)
+
+    any_number = lambda rng: rng.randint(MIN_NUMBER, MAX_NUMBER)
+
+    return [
+        ('claim', run(claim, 'claim', number=any_number)),
+        ('claim+iracing', run(claim, 'claim', number=any_number, iracing_id=lambda rng: rng.randint(1, 10 ** 6))),
+        ('release', own_number),
+        ('mynumbers', run(release, 'mynumbers')),
+        ('check', run(roster, 'check', number=any_number)),
+        ('roster', run(roster, 'roster')),
+        ('available', run(roster, 'available')),
+        ('suggest', run(roster, 'suggest', near=any_number, count=10)),
+        ('history', run(roster, 'history', number=any_number)),
+        ('export', run(roster, 'export', compress=False)),
+        ('syncstatus', run(sync, 'syncstatus')),
+        ('sync', run(sync, 'sync', dry_run=False)),
+        ('sync dry run', run(sync, 'sync', dry_run=True)),
+        ('config', run(admin, 'config')),
+        ('auditlog', run(admin, 'auditlog', limit=10)),
+    ]
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def measure(call, guild_ids, user_count, requests, concurrency, rng, counter) -> Dict[str, Any]:
+    # One call at a time first, so statements can be attributed to the command
+    probes = min(20, requests)
+    counter.count = 0
+    for _ in range(probes):
+        await call(rng, rng.choice(guild_ids), FIRST_USER_ID + rng.randrange(user_count))
+    queries = counter.count / probes
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call(rng, rng.choice(guild_ids), FIRST_USER_ID + rng.randrange(user_count))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'throughput': requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_call': queries,
+    }
+
+
+async def main_async(args) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='irbot-bench-')
+
+    bot = iRacingNumberBot()
+    bot.db = Database(os.path.join(workdir, 'bench.db'))
+    await bot.db.initialize()
+    bot.holds.db = bot.db
+
+    rosters = await seed(bot.db, args.guilds, args.claims, rng)
+    bot.iracing = FakeIRacing(rosters)
+    await bot.db.warm_caches()
+    bot.caches_warm.set()
+
+    counter = QueryCounter()
+    await bot.db.db.set_trace_callback(counter)
+
+    guild_ids = [FIRST_GUILD_ID + g for g in range(args.guilds)]
+    wanted = set(args.only.split(',')) if args.only else None
+    results = {}
+
+    try:
+        for name, call in scenarios(bot):
+            if wanted and name not in wanted:
+                continue
+            results[name] = await measure(
+                call, guild_ids, args.claims * 2, args.requests, args.concurrency, rng, counter
+            )
+            r = results[name]
+            print(
+                f"{name:<14} {r['throughput']:>9.0f}/s {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                f"{r['p99_ms']:>8.2f} {r['queries_per_call']:>8.1f}",
+                flush=True
+            )
+    finally:
+        await bot.db.db.set_trace_callback(None)
+        await bot.announcer.flush_all()
+        await bot.db.close()
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=20)
+    parser.add_argument('--claims', type=int, default=300, help='seeded claims per guild')
+    parser.add_argument('--requests', type=int, default=500, help='calls per command')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--only', help='comma-separated command names to run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    print(
+        f"{args.guilds} guild(s) x {args.claims} claim(s), {args.requests} call(s) per command, "
+        f"concurrency {args.concurrency}"
+    )
+    print(f"{'command':<14} {'throughput':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+
+    results = asyncio.run(main_async(args))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Gateway memory benchmark for iRacing Number Bot
+Feeds the same synthetic guilds, member joins and messages through discord.py's event
+parsers under each cache configuration and reports the RSS difference
+
+Usage:
+    python benchmarks/gateway_memory.py [--guilds 200] [--members 2000] [--messages 20]
+
+Each mode runs in its own process so the numbers don't share an allocator.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import discord
+from gateway import gateway_options
+
+MODES = ('default', 'low_memory')
+BOT_USER_ID = 1 << 40
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc isn't available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def user_payload(user_id: int) -> dict:
+    return {'id': str(user_id), 'username': f'driver{user_id}', 'discriminator': '0', 'avatar': None}
+
+
+def guild_payload(guild_id: int, channel_id: int) -> dict:
+    return {
+        'id': str(guild_id),
+        'name': f'League {guild_id}',
+        'owner_id': str(BOT_USER_ID),
+        'member_count': 0,
+        'large': True,
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0}],
+        'channels': [{'id': str(channel_id), 'type': 0, 'name': 'general', 'position': 0}],
+        'members': [{'user': user_payload(BOT_USER_ID), 'roles': [], 'joined_at': None, 'flags': 0}],
+        'emojis': [],
+        'stickers': [],
+    }
+
+
+async def load(mode: str, guilds: int, members: int, messages: int) -> dict:
+    options = gateway_options(low_memory=(mode == 'low_memory'))
+    client = discord.Client(**options)
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID))
+
+    gc.collect()
+    before = rss_mb()
+
+    for g in range(guilds):
+        guild_id = (g + 1) << 22
+        channel_id = guild_id + 1
+        state._add_guild_from_data(guild_payload(guild_id, channel_id))
+
+        # Both modes see identical events; the cache configuration decides what is kept
+        for m in range(members):
+            state.parse_guild_member_add({
+                'guild_id': str(guild_id),
+                'user': user_payload(guild_id + 100 + m),
+                'roles': [],
+                'joined_at': None,
+                'flags': 0,
+            })
+
+        for n in range(messages):
+            state.parse_message_create({
+                'id': str(channel_id + 10 + n),
+                'channel_id': str(channel_id),
+                'guild_id': str(guild_id),
+                'author': user_payload(guild_id + 100 + (n % max(members, 1))),
+                'content': 'Anyone running #42 this season?',
+                'timestamp': '2024-01-01T00:00:00+00:00',
+                'edited_timestamp': None,
+                'tts': False,
+                'mention_everyone': False,
+                'mentions': [],
+                'mention_roles': [],
+                'attachments': [],
+                'embeds': [],
+                'pinned': False,
+                'type': 0,
+            })
+
+    gc.collect()
+    after = rss_mb()
+
+    return {
+        'mode': mode,
+        'rss_before_mb': round(before, 1),
+        'rss_after_mb': round(after, 1),
+        'cache_growth_mb': round(after - before, 1),
+        'cached_members': sum(len(guild._members) for guild in state._guilds.values()),
+        'cached_messages': len(state._messages) if state._messages is not None else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=200)
+    parser.add_argument('--members', type=int, default=2000, help='members per guild')
+    parser.add_argument('--messages', type=int, default=20, help='messages per guild')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = asyncio.run(load(args.mode, args.guilds, args.members, args.messages))
+        print(json.dumps(result))
+        return
+
+    print(f"Synthetic load: {args.guilds} guild(s) x {args.members} member(s), {args.messages} message(s) each")
+    results = []
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--guilds', str(args.guilds),
+             '--members', str(args.members), '--messages', str(args.messages)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'mode':<12} {'RSS before':>11} {'RSS after':>10} {'growth':>8} {'members':>9} {'messages':>9}")
+    for r in results:
+        print(
+            f"{r['mode']:<12} {r['rss_before_mb']:>9.1f}MB {r['rss_after_mb']:>8.1f}MB "
+            f"{r['cache_growth_mb']:>6.1f}MB {r['cached_members']:>9} {r['cached_messages']:>9}"
+        )
+
+    default, low = results
+    if default['cache_growth_mb'] > 0:
+        saved = default['cache_growth_mb'] - low['cache_growth_mb']
+        print(f"Low-memory mode saves {saved:.1f}MB ({saved / default['cache_growth_mb']:.0%} of cache growth)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Boot pipeline for iRacing Number Bot
+Runs independent startup phases concurrently and records how long each one took
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Awaitable, Dict, Tuple, Sequence
+
+logger = logging.getLogger('iRacingBot.Boot')
+
+Phase = Tuple[Callable[[], Awaitable[None]], Sequence[str], bool]
+
+
+class BootPipeline:
+    """
+    Startup phases with dependencies.
+
+    Every phase starts as soon as the phases it depends on have finished.
+    A failing required phase aborts the boot; optional phases (like iRacing
+    login) only log a warning so the bot can still come up without them.
+    """
+
+    def __init__(self):
+        self._phases: Dict[str, Phase] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.timings: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        after: Sequence[str] = (),
+        required: bool = True
+    ):
+        for dependency in after:
+            if dependency not in self._phases:
+                raise ValueError(f"Boot phase {name} depends on unknown phase {dependency}")
+        self._phases[name] = (func, after, required)
+
+    async def _run_phase(self, name: str):
+        func, after, required = self._phases[name]
+        for dependency in after:
+            await self._tasks[dependency]
+
+        started = time.perf_counter()
+        try:
+            await func()
+        except Exception as e:
+            self.failed[name] = str(e)
+            if required:
+                raise
+            logger.warning(f"Optional boot phase {name} failed: {e}")
+        finally:
+            self.timings[name] = (time.perf_counter() - started) * 1000
+
+    async def run(self) -> float:
+        """Run every phase; returns the total wall time in milliseconds"""
+        started = time.perf_counter()
+        self._tasks = {name: asyncio.create_task(self._run_phase(name)) for name in self._phases}
+
+        try:
+            await asyncio.gather(*self._tasks.values())
+        except BaseException:
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            raise
+
+        total = (time.perf_counter() - started) * 1000
+        phases = ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.timings.items())
+        logger.info(f"Boot finished in {total:.0f}ms ({phases})")
+        return total
@@ -8,62 +8,160 @@ from discord import app_commands
 from discord.ext import commands, tasks
 import asyncio
 import logging
+import signal
+import time
 from datetime import datetime
 from config import Config
 from database import Database
 from iracing_api import iRacingAPI
+from render_cache import RenderCache
+from announcements import AnnouncementDispatcher
+from hold_scheduler import HoldScheduler
+from ratelimit import RateLimiter, RateLimited
+from sync_worker import SyncWorkerClient, perform_sync, preview_sync, run_worker
+from sharding import ShardPlan
+from gateway import gateway_options
+from command_sync import CommandSyncer, DEFAULT_HASH_FILE
+from boot import BootPipeline
+from metrics import BotMetrics, instrument_methods
+from tracing import Trace, trace_methods
+from loop_watchdog import LoopWatchdog
+from occupancy import number_label
+from logging_config import setup_logging, SLOW_LOGGER
+import multiprocessing
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger('iRacingBot')
+# Waterfalls of slow commands; setup_logging sends these to their own file
+slow_logger = logging.getLogger(SLOW_LOGGER)
 
-class iRacingNumberBot(commands.Bot):
+class iRacingNumberBot(commands.AutoShardedBot):
     def __init__(self):
-        intents = discord.Intents.default()
-        intents.message_content = True
-        intents.members = True
+        # SHARD_COUNT / SHARD_IDS split the bot across processes; unset means Discord picks
+        self.config = Config()
+        self.shard_plan = ShardPlan.from_config(self.config)
+        self.low_memory = self.config.get_bool('LOW_MEMORY_MODE', False)
 
         super().__init__(
             command_prefix='!',
-            intents=intents,
-            help_command=None
+            help_command=None,
+            **gateway_options(self.low_memory, self.config.get_int('MESSAGE_CACHE_SIZE', 0)),
+            shard_count=self.shard_plan.shard_count,
+            shard_ids=self.shard_plan.shard_ids
         )
 
-        self.config = Config()
         self.db = Database()
+        self.render_cache = RenderCache(max_entries=self.config.get_int('RENDER_CACHE_SIZE', 512))
+        self.announcer = AnnouncementDispatcher(
+            self,
+            window=self.config.get_int('ANNOUNCEMENT_BATCH_SECONDS', 3)
+        )
+        self.holds = HoldScheduler(self.db, on_expired=self.on_holds_expired, shards=self.shard_plan)
+        self.rate_limiter = RateLimiter.from_config(self.config)
+        self.tree.on_error = self.on_app_command_error
+        # Set once the boot pipeline has warmed the caches
+        self.caches_warm = asyncio.Event()
+
+        # Graceful shutdown: new commands are turned away while in-flight work drains
+        self.shutting_down = False
+        self._shutdown_task = None
+        self._inflight_commands = {}
+        self._inflight_syncs = 0
+        self.tree.interaction_check = self.accept_interaction
         self.iracing = iRacingAPI(
             username=self.config.get('IRACING_USERNAME'),
             password=self.config.get('IRACING_PASSWORD')
         )
 
+        # Per-command traces; commands slower than SLOW_COMMAND_MS are logged as a waterfall (0 = off)
+        self.slow_command_ms = self.config.get_int('SLOW_COMMAND_MS', 2000)
+        if self.slow_command_ms > 0:
+            trace_methods(self.db, 'db')
+            trace_methods(self.iracing, 'iracing')
+
+        # Optional Prometheus endpoint (METRICS_ENABLED)
+        self.metrics = None
+        if self.config.get_bool('METRICS_ENABLED', False):
+            self.metrics = BotMetrics(self)
+            instrument_methods(self.db, self.metrics.db_latency)
+            self.iracing.request_observer = self.metrics.observe_iracing_request
+
+        # Event loop lag sampling, with a stack dump when the loop is blocked longer than LOOP_STALL_MS
+        self.watchdog = LoopWatchdog(
+            threshold=self.config.get_int('LOOP_STALL_MS', 500) / 1000,
+            histogram=self.metrics.loop_lag if self.metrics else None
+        )
+
+        # Optional out-of-process sync worker ("off", "spawn" or "external")
+        self.sync_worker = None
+        if self.config.get('SYNC_WORKER_MODE', 'off').lower() in ('spawn', 'external'):
+            self.sync_worker = SyncWorkerClient(
+                host=self.config.get('SYNC_WORKER_HOST', '127.0.0.1'),
+                port=self.config.get_int('SYNC_WORKER_PORT', 8765),
+                token=self.config.get('SYNC_WORKER_TOKEN')
+            )
+
     async def setup_hook(self):
-        """Called when the bot is starting up"""
+        """Called when the bot is starting up, before it connects to the gateway"""
         logger.info("Setting up bot...")
 
-        # Initialize database
-        await self.db.initialize()
+        self.watchdog.start()
 
-        # Load commands
-        await self.load_commands()
+        pipeline = BootPipeline()
+        pipeline.add('database', self.db.initialize)
+        pipeline.add('iracing_auth', self.restore_iracing_session, required=False)
+        pipeline.add('extensions', self.load_commands)
+        pipeline.add('command_sync', self.sync_commands, after=['extensions'], required=False)
+        # Resume expiry timers for outstanding number holds
+        pipeline.add('holds', self.holds.start, after=['database'])
+        pipeline.add('cache_warmup', self.warm_caches, after=['database'])
+        if self.metrics:
+            pipeline.add('metrics', self.start_metrics, required=False)
 
-        # Sync slash commands
-        try:
-            synced = await self.tree.sync()
-            logger.info(f"Synced {len(synced)} slash command(s)")
-        except Exception as e:
-            logger.error(f"Failed to sync commands: {e}")
+        await pipeline.run()
+        if self.metrics:
+            self.metrics.observe_boot(pipeline.timings)
+        self.caches_warm.set()
 
         # Start background sync task
         if not self.auto_sync.is_running():
             self.auto_sync.start()
 
+        # SIGTERM (deploys) and SIGINT shut down gracefully instead of dropping work
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, lambda sig=sig: asyncio.create_task(self.close(sig.name)))
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on Windows; Ctrl+C still closes the bot
+
+    async def restore_iracing_session(self):
+        """Log in to iRacing up front so the first /claim doesn't pay for it"""
+        if not self.config.get('IRACING_USERNAME'):
+            return
+        if not await self.iracing.authenticate():
+            raise RuntimeError("iRacing authentication failed")
+
+    async def sync_commands(self):
+        """Sync slash commands (skipped when the tree hasn't changed since the last sync)"""
+        await CommandSyncer(
+            self.tree,
+            self.config.get('COMMAND_HASH_FILE', DEFAULT_HASH_FILE)
+        ).sync(
+            dev_guild_id=self.config.get_int('DEV_GUILD_ID', 0) or None,
+            force=self.config.get_bool('FORCE_COMMAND_SYNC', False)
+        )
+
+    async def start_metrics(self):
+        await self.metrics.start(
+            host=self.config.get('METRICS_HOST', '127.0.0.1'),
+            port=self.config.get_int('METRICS_PORT', 9108)
+        )
+
+    async def warm_caches(self):
+        """Preload guild configs and number occupancy for guilds on our shards"""
+        guilds = await self.db.warm_caches(self.shard_plan)
+        logger.info(f"Preloaded caches for {guilds} guild(s)")
+
     async def load_commands(self):
         """Load all command modules"""
         commands_list = [
@@ -71,20 +169,26 @@ class iRacingNumberBot(commands.Bot):
             'commands.release',
             'commands.roster',
             'commands.sync',
-            'commands.admin'
+            'commands.admin',
+            'commands.waitlist',
+            'commands.pools'
         ]
 
-        for cmd in commands_list:
+        async def load(cmd):
             try:
                 await self.load_extension(cmd)
                 logger.info(f"Loaded {cmd}")
             except Exception as e:
                 logger.error(f"Failed to load {cmd}: {e}")
 
+        await asyncio.gather(*(load(cmd) for cmd in commands_list))
+
     async def on_ready(self):
         """Called when the bot is ready"""
         logger.info(f'Logged in as {self.user.name} (ID: {self.user.id})')
-        logger.info(f'Connected to {len(self.guilds)} server(s)')
+        logger.info(f'Connected to {len(self.guilds)} server(s) on {self.shard_plan.describe()}')
+        if self.low_memory:
+            logger.info("Low-memory mode: member chunking and privileged intents are off")
 
         # Set bot status
         await self.change_presence(
@@ -94,6 +198,65 @@ class iRacingNumberBot(commands.Bot):
             )
         )
 
+    async def on_shard_ready(self, shard_id: int):
+        logger.info(f"Shard {shard_id} ready")
+
+    async def accept_interaction(self, interaction: discord.Interaction) -> bool:
+        """Turn away new commands during shutdown and track the ones we accept"""
+        if self.shutting_down:
+            if interaction.type == discord.InteractionType.application_command:
+                await interaction.response.send_message(
+                    "🔧 The bot is restarting. Please try again in a moment.",
+                    ephemeral=True
+                )
+            return False
+
+        if interaction.type == discord.InteractionType.application_command:
+            self._inflight_commands[interaction.id] = time.perf_counter()
+            if self.slow_command_ms > 0:
+                command = interaction.command.qualified_name if interaction.command else interaction.data.get('name')
+                trace = Trace(f"/{command}", guild=interaction.guild_id, user=interaction.user.id)
+                trace.activate()
+                interaction.extras['trace'] = trace
+        return True
+
+    def _finish_command(self, interaction: discord.Interaction, error: Exception = None):
+        trace = interaction.extras.pop('trace', None)
+        if trace and trace.finish() * 1000 >= self.slow_command_ms:
+            logger.warning(f"Slow command {trace.name}: {trace.duration * 1000:.0f}ms (see slow_commands.log)")
+            slow_logger.warning(f"{datetime.utcnow():%Y-%m-%d %H:%M:%S} {trace.waterfall()}")
+
+        started = self._inflight_commands.pop(interaction.id, None)
+        if not self.metrics or started is None:
+            return
+
+        command = interaction.command.qualified_name if interaction.command else 'unknown'
+        self.metrics.command_latency.observe(time.perf_counter() - started, command=command)
+        if error is not None:
+            original = getattr(error, 'original', error)
+            self.metrics.command_errors.inc(command=command, error=type(original).__name__)
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self._finish_command(interaction)
+
+    async def on_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        """Reply to rate-limited users; everything else gets the default handling"""
+        self._finish_command(interaction, error)
+
+        if isinstance(error, RateLimited):
+            scope = "This server is" if error.guild_wide else "You're"
+            message = (
+                f"⏳ {scope} using this command too quickly. "
+                f"Try again in {max(1, round(error.retry_after))} second(s)."
+            )
+            if interaction.response.is_done():
+                await interaction.followup.send(message, ephemeral=True)
+            else:
+                await interaction.response.send_message(message, ephemeral=True)
+            return
+
+        await app_commands.CommandTree.on_error(self.tree, interaction, error)
+
     async def on_guild_join(self, guild):
         """Called when the bot joins a new server"""
         logger.info(f"Joined new server: {guild.name} (ID: {guild.id})")
@@ -117,16 +280,65 @@ class iRacingNumberBot(commands.Bot):
                 await channel.send(embed=embed)
                 break
 
+    async def on_holds_expired(self, released: list):
+        """Announce numbers freed by lapsed holds, or hand them to the waitlist"""
+        for hold in released:
+            if hold.get('handoff'):
+                await self.notify_waitlist_handoff(hold['handoff'])
+                continue
+
+            config = await self.db.get_guild_config(hold['guild_id'])
+            if config and config.get('announcement_channel_id'):
+                self.announcer.announce(
+                    config['announcement_channel_id'], 'released', hold['car_number'], car_class=hold['car_class']
+                )
+
+    async def notify_waitlist_handoff(self, handoff: dict):
+        """DM the person who was next in line and announce their new number"""
+        guild = self.get_guild(handoff['guild_id'])
+        guild_name = guild.name if guild else "your league server"
+        user_id = handoff['discord_user_id']
+        car_class = handoff['car_class']
+
+        try:
+            user = self.get_user(user_id) or await self.fetch_user(user_id)
+            embed = discord.Embed(
+                title="🏁 Your Waitlisted Number Is Yours!",
+                description=(
+                    f"Number **{number_label(handoff['car_number'], car_class)}** was released in **{guild_name}** "
+                    f"and has been assigned to you from the waitlist."
+                ),
+                color=discord.Color.green()
+            )
+            embed.add_field(
+                name="Next Steps",
+                value="Ask a league admin to assign it in iRacing, or `/release` it if you no longer want it.",
+                inline=False
+            )
+            await user.send(embed=embed)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not DM waitlist handoff to user {user_id}: {e}")
+
+        config = await self.db.get_guild_config(handoff['guild_id'])
+        if config and config.get('announcement_channel_id'):
+            self.announcer.announce(
+                config['announcement_channel_id'], 'claimed', handoff['car_number'], f"<@{user_id}>", car_class
+            )
+
     @tasks.loop(hours=1)
     async def auto_sync(self):
         """Automatically sync with iRacing every hour"""
         try:
             logger.info("Starting automatic sync with iRacing...")
 
-            # Get all configured guilds
-            guilds = await self.db.get_all_guild_configs()
+            # Get configured guilds on this process's shards
+            guilds = await self.db.get_all_guild_configs(self.shard_plan)
 
             for guild_config in guilds:
+                if self.shutting_down:
+                    logger.info("Auto-sync stopped early for shutdown")
+                    break
+
                 guild_id = guild_config['guild_id']
                 league_id = guild_config.get('league_id')
 
@@ -147,53 +359,118 @@ class iRacingNumberBot(commands.Bot):
     async def before_auto_sync(self):
         """Wait for the bot to be ready before starting the sync loop"""
         await self.wait_until_ready()
+        await self.caches_warm.wait()
 
     async def sync_with_iracing(self, guild_id: int, league_id: int):
         """Sync car numbers from iRacing"""
+        self._inflight_syncs += 1
+        started = time.perf_counter()
+        success = False
         try:
-            # Authenticate with iRacing
-            if not await self.iracing.authenticate():
-                logger.error("Failed to authenticate with iRacing")
+            success = await self._sync_with_iracing(guild_id, league_id)
+            return success
+        finally:
+            self._inflight_syncs -= 1
+            if self.metrics:
+                self.metrics.observe_sync(success, time.perf_counter() - started)
+
+    async def _sync_with_iracing(self, guild_id: int, league_id: int):
+        if self.sync_worker:
+            try:
+                result = await self.sync_worker.submit(guild_id, league_id)
+                # The worker wrote to the database directly, so drop our cached view
+                self.db.invalidate_guild(guild_id)
+                return result.get('success', False)
+            except (ConnectionError, asyncio.TimeoutError) as e:
+                # A timed-out job has been cancelled on the worker by now
+                logger.warning(f"Sync worker unavailable, syncing in-process: {e}")
+            except RuntimeError as e:
+                # The worker may still be running the job; syncing here too could race it
+                logger.error(f"Sync for guild {guild_id} failed: {e}")
                 return False
 
-            # Get league roster from iRacing
-            roster = await self.iracing.get_league_roster(league_id)
+        result = await perform_sync(self.db, self.iracing, guild_id, league_id)
+        return result['success']
+
+    async def close(self, reason: str = "close requested"):
+        """
+        Shut down in order: stop background jobs, let in-flight commands and syncs
+        finish (up to SHUTDOWN_TIMEOUT seconds), post buffered announcements, close
+        the iRacing session and the database, and finally the gateway.
+        """
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.create_task(self._shutdown(reason))
+        await asyncio.shield(self._shutdown_task)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        # Client.run only waits for the gateway to close; wait for the whole shutdown
+        # so asyncio.run doesn't cancel it before the database is checkpointed
+        await self.close("client exited")
+
+    async def _shutdown(self, reason: str):
+        started = time.perf_counter()
+        logger.info(f"Shutting down ({reason})...")
+        self.shutting_down = True
+
+        # No new background work; auto-sync stops before its next guild
+        await self.holds.stop()
+
+        timeout = self.config.get_int('SHUTDOWN_TIMEOUT', 30)
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Shutdown deadline of {timeout}s reached with {len(self._inflight_commands)} command(s) "
+                f"and {self._inflight_syncs} sync(s) still running"
+            )
+        self.auto_sync.cancel()
+
+        steps = [
+            ("announcements", self.announcer.flush_all),
+            ("sync worker", self.sync_worker.close if self.sync_worker else None),
+            ("iRacing session", self.iracing.close),
+            ("metrics endpoint", self.metrics.stop if self.metrics else None),
+            ("loop watchdog", self.watchdog.stop),
+            ("database", self.db.close),
+            # Last: once the gateway is closed, start() returns and Client.run winds down
+            ("gateway", super().close),
+        ]
+        for name, step in steps:
+            if step is None:
+                continue
+            try:
+                await step()
+            except Exception as e:
+                logger.error(f"Error closing {name}: {e}")
 
-            if not roster:
-                logger.warning(f"No roster data found for league {league_id}")
-                return False
+        logger.info(f"Shutdown complete in {time.perf_counter() - started:.1f}s")
 
-            # Update database with iRacing assignments
-            sync_count = 0
-            for member in roster:
-                customer_id = member.get('cust_id')
-                car_number = member.get('car_number')
-
-                if customer_id and car_number:
-                    # Check if number is already in our database
-                    existing = await self.db.get_number_assignment(guild_id, car_number)
-
-                    if not existing:
-                        # Add new assignment from iRacing
-                        await self.db.sync_iracing_assignment(
-                            guild_id=guild_id,
-                            car_number=car_number,
-                            iracing_id=customer_id,
-                            iracing_data=member
-                        )
-                        sync_count += 1
-
-            logger.info(f"Synced {sync_count} assignments from iRacing for guild {guild_id}")
-            return True
+    async def _drain(self):
+        """Wait until no commands or syncs are running"""
+        while self._inflight_commands or self._inflight_syncs:
+            await asyncio.sleep(0.1)
 
+    async def preview_sync_with_iracing(self, guild_id: int, league_id: int):
+        """Compute what a sync would change without writing anything"""
+        try:
+            return await preview_sync(self.db, self.iracing, guild_id, league_id)
         except Exception as e:
-            logger.error(f"Error syncing with iRacing: {e}")
-            return False
+            logger.error(f"Error previewing iRacing sync: {e}")
+            return None
 
 def main():
     """Main entry point"""
-    bot = iRacingNumberBot()
+    # Logging first, so anything the bot logs while it's constructed is captured
+    log_listener = setup_logging(Config())
+
+    try:
+        run_bot(iRacingNumberBot())
+    finally:
+        # Write out anything still queued before the process exits
+        log_listener.stop()
 
+def run_bot(bot: iRacingNumberBot):
+    """Start the optional sync worker and run the bot until it shuts down"""
     # Get bot token from config
     token = bot.config.get('DISCORD_BOT_TOKEN')
 
@@ -202,12 +479,36 @@ def main():
         logger.error("Please create a .env file with your bot token.")
         return
 
+    # Start the sync worker alongside the bot if requested
+    worker_process = None
+    if bot.config.get('SYNC_WORKER_MODE', 'off').lower() == 'spawn':
+        worker_process = multiprocessing.Process(
+            target=run_worker,
+            kwargs={
+                'host': bot.config.get('SYNC_WORKER_HOST', '127.0.0.1'),
+                'port': bot.config.get_int('SYNC_WORKER_PORT', 8765),
+                'token': bot.config.get('SYNC_WORKER_TOKEN'),
+                'db_path': bot.db.db_path,
+                'username': bot.config.get('IRACING_USERNAME'),
+                'password': bot.config.get('IRACING_PASSWORD')
+            },
+            name='iRacingSyncWorker',
+            daemon=True
+        )
+        worker_process.start()
+        logger.info(f"Started sync worker process (PID: {worker_process.pid})")
+
     try:
-        bot.run(token)
+        # Logging is already set up (queued, rotating); don't let discord.py add its own handler
+        bot.run(token, log_handler=None)
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
         logger.error(f"Fatal error: {e}")
+    finally:
+        if worker_process and worker_process.is_alive():
+            worker_process.terminate()
+            worker_process.join(timeout=10)
 
 if __name__ == "__main__":
     main()
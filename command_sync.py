@@ -0,0 +1,88 @@
+"""
+Slash command sync for iRacing Number Bot
+Only pushes the command tree to Discord when its payload has changed since the last sync
+"""
+
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Optional, Dict
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger('iRacingBot.CommandSync')
+
+DEFAULT_HASH_FILE = '.command_tree_hash'
+
+
+def tree_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Stable hash of the payload tree.sync() would send for a scope"""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get('type', 1), command['name'])
+    )
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class CommandSyncer:
+    """
+    Syncs the command tree globally, or to a single dev guild, when it changed.
+
+    Hashes are kept per application and scope in a small JSON file, so
+    restarts and rolling deploys with an unchanged tree skip the API call.
+    """
+
+    def __init__(self, tree: app_commands.CommandTree, hash_file: str = DEFAULT_HASH_FILE):
+        self.tree = tree
+        self.hash_file = Path(hash_file)
+
+    def _load_hashes(self) -> Dict[str, str]:
+        try:
+            return json.loads(self.hash_file.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable command hash file {self.hash_file}: {e}")
+            return {}
+
+    def _save_hashes(self, hashes: Dict[str, str]):
+        try:
+            tmp = self.hash_file.with_name(self.hash_file.name + '.tmp')
+            tmp.write_text(json.dumps(hashes, indent=2, sort_keys=True))
+            tmp.replace(self.hash_file)
+        except OSError as e:
+            logger.warning(f"Could not save command hash file {self.hash_file}: {e}")
+
+    async def sync(self, dev_guild_id: Optional[int] = None, force: bool = False) -> bool:
+        """
+        Sync if needed. With dev_guild_id the global commands are copied to that
+        guild and synced there only, which takes effect immediately.
+
+        Returns True if commands were sent to Discord.
+        """
+        started = time.perf_counter()
+        guild = discord.Object(id=dev_guild_id) if dev_guild_id else None
+        if guild:
+            self.tree.copy_global_to(guild=guild)
+
+        scope = f"guild:{dev_guild_id}" if guild else "global"
+        key = f"{self.tree.client.application_id}:{scope}"
+        digest = tree_hash(self.tree, guild)
+
+        hashes = self._load_hashes()
+        if not force and hashes.get(key) == digest:
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info(f"Slash commands unchanged for {scope}, skipped sync ({elapsed:.1f}ms)")
+            return False
+
+        synced = await self.tree.sync(guild=guild)
+        hashes[key] = digest
+        self._save_hashes(hashes)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(f"Synced {len(synced)} slash command(s) to {scope} in {elapsed:.1f}ms")
+        return True
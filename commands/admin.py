@@ -5,16 +5,27 @@ Admin commands - setup and management
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
+import csv
+import io
 import logging
-from typing import Optional
+import re
+from typing import Optional, List, Dict, Any
+from occupancy import normalize_class, number_label
+from ratelimit import rate_limited
+from commands.pools import class_autocomplete
 
 logger = logging.getLogger('iRacingBot.Commands.Admin')
 
+MAX_IMPORT_BYTES = 1024 * 1024
+MENTION_PATTERN = re.compile(r"^<@!?(\d+)>$")
+
 class AdminCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     @app_commands.command(name="setup", description="Configure the bot for your server")
+    @rate_limited("admin")
     @app_commands.checks.has_permissions(administrator=True)
     @app_commands.describe(
         league_id="Your iRacing league ID",
@@ -115,6 +126,7 @@ class AdminCommands(commands.Cog):
         )
 
     @app_commands.command(name="config", description="View current bot configuration")
+    @rate_limited("lookup")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def config(self, interaction: discord.Interaction):
         """View configuration"""
@@ -173,30 +185,39 @@ class AdminCommands(commands.Cog):
         await interaction.followup.send(embed=embed, ephemeral=True)
 
     @app_commands.command(name="forcerelease", description="Force release a number (admin only)")
+    @rate_limited("admin")
     @app_commands.checks.has_permissions(administrator=True)
-    @app_commands.describe(number="The car number to release")
-    async def forcerelease(self, interaction: discord.Interaction, number: int):
+    @app_commands.describe(
+        number="The car number to release",
+        car_class="Car class pool the number is in (optional, for multi-class leagues)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def forcerelease(self, interaction: discord.Interaction, number: int, car_class: Optional[str] = None):
         """Force release a number"""
         await interaction.response.defer(ephemeral=True)
 
         guild_id = interaction.guild_id
+        car_class = normalize_class(car_class)
+        label = number_label(number, car_class)
 
-        assignment = await self.bot.db.get_number_assignment(guild_id, number)
+        assignment = await self.bot.db.get_number_assignment(guild_id, number, car_class)
 
         if not assignment:
             await interaction.followup.send(
-                f"❌ Number **{number}** is not currently claimed.",
+                f"❌ Number **{label}** is not currently claimed.",
                 ephemeral=True
             )
             return
 
         # Release the number
-        success = await self.bot.db.release_number(guild_id, number, assignment['discord_user_id'])
+        success, handoff = await self.bot.db.release_number_with_handoff(
+            guild_id, number, assignment['discord_user_id'], car_class, reason='force_release'
+        )
 
         if success:
             embed = discord.Embed(
                 title="✅ Number Force Released",
-                description=f"Number **{number}** has been released by administrator.",
+                description=f"Number **{label}** has been released by administrator.",
                 color=discord.Color.orange()
             )
 
@@ -212,23 +233,209 @@ class AdminCommands(commands.Cog):
                 inline=True
             )
 
+            if handoff:
+                embed.add_field(
+                    name="Waitlist",
+                    value=f"Passed to **{handoff['discord_username']}** (next in line)",
+                    inline=False
+                )
+
             await interaction.followup.send(embed=embed, ephemeral=True)
 
+            if handoff:
+                await self.bot.notify_waitlist_handoff(handoff)
+
             # Log the action
             await self.bot.db.log_action(
                 guild_id,
                 interaction.user.id,
                 "force_release",
-                f"Force released number {number}"
+                f"Force released number {label}"
             )
 
         else:
             await interaction.followup.send(
-                f"❌ Failed to release number {number}.",
+                f"❌ Failed to release number {label}.",
                 ephemeral=True
             )
 
+    @forcerelease.autocomplete('number')
+    async def forcerelease_number_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[int]]:
+        """Suggest claimed numbers matching what the admin has typed, in the class picked so far"""
+        car_class = normalize_class(getattr(interaction.namespace, 'car_class', None))
+        occupancy = await self.bot.db.get_occupancy(interaction.guild_id, car_class)
+        if occupancy is None:
+            return []
+
+        return [
+            app_commands.Choice(name=f"#{n}", value=n)
+            for n in occupancy.claimed_numbers()
+            if str(n).startswith(current)
+        ][:25]
+
+    @app_commands.command(name="import", description="Bulk import number claims from a CSV file (admin only)")
+    @rate_limited("export")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(file="CSV with columns: number, Discord user ID or mention, iRacing ID (optional)")
+    async def import_claims(self, interaction: discord.Interaction, file: discord.Attachment):
+        """Bulk import claims from a CSV attachment"""
+        await interaction.response.defer(ephemeral=True)
+
+        guild_id = interaction.guild_id
+
+        if file.size > MAX_IMPORT_BYTES:
+            await interaction.followup.send("❌ The CSV file is too large (max 1 MB).", ephemeral=True)
+            return
+
+        try:
+            text = (await file.read()).decode('utf-8-sig')
+        except (discord.HTTPException, UnicodeDecodeError) as e:
+            await interaction.followup.send(f"❌ Could not read the CSV file: {e}", ephemeral=True)
+            return
+
+        # Validate every row against the range, existing claims and the file itself in one pass
+        occupancy = await self.bot.db.get_occupancy(guild_id)
+        results = []
+        valid = []
+        seen = set()
+
+        for line_number, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+            if not row or not any(cell.strip() for cell in row):
+                continue
+
+            number_text = row[0].strip()
+            user_text = row[1].strip() if len(row) > 1 else ""
+            iracing_text = row[2].strip() if len(row) > 2 else ""
+
+            # Skip a header row
+            if line_number == 1 and not number_text.isdigit():
+                continue
+
+            result = {
+                'row': line_number,
+                'car_number': number_text,
+                'discord_user': user_text,
+                'iracing_id': iracing_text,
+                'iracing_name': '',
+                'result': ''
+            }
+            results.append(result)
+
+            mention = MENTION_PATTERN.match(user_text)
+            user_id_text = mention.group(1) if mention else user_text
+
+            if not number_text.isdigit():
+                result['result'] = "Invalid number"
+            elif not user_id_text.isdigit():
+                result['result'] = "Discord user must be a user ID or mention"
+            elif iracing_text and not iracing_text.isdigit():
+                result['result'] = "Invalid iRacing ID"
+            elif not occupancy.in_range(int(number_text)):
+                result['result'] = f"Out of range ({occupancy.min_number}-{occupancy.max_number})"
+            elif int(number_text) in occupancy.claimed:
+                result['result'] = "Already claimed"
+            elif int(number_text) in seen:
+                result['result'] = "Duplicate number in file"
+            else:
+                seen.add(int(number_text))
+                result.update({
+                    'car_number': int(number_text),
+                    'discord_user_id': int(user_id_text),
+                    'iracing_id': int(iracing_text) if iracing_text else None
+                })
+                valid.append(result)
+
+        if not results:
+            await interaction.followup.send("❌ The CSV file has no rows to import.", ephemeral=True)
+            return
+
+        await self._resolve_import_names(interaction.guild, valid)
+
+        try:
+            inserted = set(await self.bot.db.bulk_claim(guild_id, valid, interaction.user.id))
+        except Exception as e:
+            logger.error(f"Error importing claims: {e}")
+            await interaction.followup.send("❌ The import failed. No claims were written.", ephemeral=True)
+            return
+
+        for result in valid:
+            result['result'] = "Imported" if result['car_number'] in inserted else "Already claimed"
+
+        # Build the per-row report
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["Row", "Car Number", "Discord User", "iRacing ID", "iRacing Name", "Result"])
+        for result in results:
+            writer.writerow([
+                result['row'], result['car_number'], result.get('discord_username', result['discord_user']),
+                result['iracing_id'] or '', result['iracing_name'] or '', result['result']
+            ])
+
+        report = discord.File(io.BytesIO(output.getvalue().encode()), filename=f"import_report_{guild_id}.csv")
+
+        failed = len(results) - len(inserted)
+        embed = discord.Embed(
+            title="📥 Import Complete",
+            description=f"Imported {len(inserted)} of {len(results)} row(s)",
+            color=discord.Color.green() if not failed else discord.Color.orange()
+        )
+        embed.add_field(name="✅ Imported", value=str(len(inserted)), inline=True)
+        embed.add_field(name="❌ Skipped", value=str(failed), inline=True)
+        embed.set_footer(text="See the attached report for per-row results")
+
+        await interaction.followup.send(embed=embed, file=report, ephemeral=True)
+
+        await self.bot.db.log_action(
+            guild_id,
+            interaction.user.id,
+            "import",
+            f"Imported {len(inserted)} of {len(results)} claim(s) from {file.filename}"
+        )
+
+    async def _resolve_import_names(self, guild: discord.Guild, rows: List[Dict[str, Any]]):
+        """Fill in Discord usernames and iRacing names for import rows using batched lookups"""
+        user_ids = {row['discord_user_id'] for row in rows}
+        names = {}
+
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member:
+                names[user_id] = str(member)
+
+        missing = [user_id for user_id in user_ids if user_id not in names]
+        for i in range(0, len(missing), 100):
+            try:
+                # In low-memory mode the results are used once and not kept in the member cache
+                members = await guild.query_members(
+                    user_ids=missing[i:i + 100],
+                    limit=100,
+                    cache=not getattr(self.bot, 'low_memory', False)
+                )
+            except (discord.ClientException, discord.HTTPException, asyncio.TimeoutError) as e:
+                logger.warning(f"Could not look up import members: {e}")
+                break
+            names.update({member.id: str(member) for member in members})
+
+        iracing_ids = [row['iracing_id'] for row in rows if row['iracing_id']]
+        iracing_members = {}
+        if iracing_ids:
+            try:
+                iracing_members = await self.bot.iracing.get_members_info(iracing_ids)
+            except Exception as e:
+                logger.warning(f"Could not verify imported iRacing IDs: {e}")
+
+        for row in rows:
+            row['discord_username'] = names.get(row['discord_user_id'], str(row['discord_user_id']))
+            member = iracing_members.get(row['iracing_id'])
+            if member:
+                row['iracing_name'] = member.get('display_name')
+
     @app_commands.command(name="auditlog", description="View recent bot actions (admin only)")
+    @rate_limited("lookup")
     @app_commands.checks.has_permissions(administrator=True)
     @app_commands.describe(limit="Number of recent entries to show (default: 10)")
     async def auditlog(self, interaction: discord.Interaction, limit: int = 10):
@@ -275,7 +482,37 @@ class AdminCommands(commands.Cog):
 
         await interaction.followup.send(embed=embed, ephemeral=True)
 
+    @app_commands.command(name="looplag", description="View bot responsiveness (event loop lag) (admin only)")
+    @rate_limited("lookup")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def looplag(self, interaction: discord.Interaction):
+        """Show event loop lag percentiles and recent stalls"""
+        watchdog = self.bot.watchdog
+        lag = watchdog.percentiles()
+
+        embed = discord.Embed(
+            title="⏱️ Event Loop Lag",
+            description=f"Over the last {len(watchdog.samples)} sample(s), every {watchdog.interval * 1000:.0f}ms",
+            color=discord.Color.green() if lag['p99'] < watchdog.threshold else discord.Color.orange()
+        )
+        for name in ('p50', 'p95', 'p99', 'max'):
+            embed.add_field(name=name, value=f"{lag[name] * 1000:.1f}ms", inline=True)
+
+        stalls = watchdog.recent_stalls()
+        if stalls:
+            embed.add_field(
+                name=f"Recent Stalls (over {watchdog.threshold * 1000:.0f}ms)",
+                value="\n".join(
+                    f"`{stall['at']:%H:%M:%S}` {stall['duration'] * 1000:.0f}ms - {stall['location'].split('/')[-1]}"
+                    for stall in stalls
+                )[:1024],
+                inline=False
+            )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="help", description="View help and available commands")
+    @rate_limited("lookup")
     async def help(self, interaction: discord.Interaction):
         """Show help information"""
         await interaction.response.defer(ephemeral=True)
@@ -290,13 +527,18 @@ class AdminCommands(commands.Cog):
         embed.add_field(
             name="👤 Member Commands",
             value=(
-                "`/claim <number>` - Claim a car number\n"
+                "`/claim <number> [car_class]` - Claim a car number\n"
+                "`/hold <number>` - Hold a number, then `/confirm` it\n"
                 "`/release <number>` - Release your claimed number\n"
                 "`/mynumbers` - View your claimed numbers\n"
                 "`/check <number>` - Check if a number is available\n"
                 "`/roster` - View all number assignments\n"
                 "`/available` - View available numbers\n"
-                "`/link <iracing_id>` - Link your iRacing account"
+                "`/suggest` - Suggest free numbers near a target or pattern\n"
+                "`/link <iracing_id>` - Link your iRacing account\n"
+                "`/waitlist join|leave|show` - Queue for a taken number\n"
+                "`/pool list` - View the car class number pools\n"
+                "`/history [number] [user]` - See who held a number and when"
             ),
             inline=False
         )
@@ -306,12 +548,15 @@ class AdminCommands(commands.Cog):
             name="👑 Admin Commands",
             value=(
                 "`/setup` - Configure the bot for your server\n"
-                "`/sync` - Sync with iRacing league data\n"
+                "`/sync [dry_run]` - Sync with iRacing (dry run previews changes)\n"
                 "`/syncstatus` - View sync status\n"
                 "`/config` - View current configuration\n"
                 "`/export` - Export roster to CSV\n"
                 "`/forcerelease` - Force release a number\n"
-                "`/auditlog` - View recent actions"
+                "`/pool set|remove` - Manage per-class number pools\n"
+                "`/import` - Bulk import claims from CSV\n"
+                "`/auditlog` - View recent actions\n"
+                "`/looplag` - View bot responsiveness"
             ),
             inline=False
         )
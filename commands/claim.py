@@ -6,6 +6,11 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from occupancy import normalize_class, number_label
+from ratelimit import rate_limited
+from commands.pools import class_autocomplete
 
 logger = logging.getLogger('iRacingBot.Commands.Claim')
 
@@ -14,15 +19,19 @@ class ClaimCommands(commands.Cog):
         self.bot = bot
 
     @app_commands.command(name="claim", description="Claim a car number for yourself")
+    @rate_limited("claim")
     @app_commands.describe(
         number="The car number you want to claim",
-        iracing_id="Your iRacing customer ID (optional)"
+        iracing_id="Your iRacing customer ID (optional)",
+        car_class="Car class pool, e.g. GT3 (optional, for multi-class leagues)"
     )
+    @app_commands.autocomplete(car_class=class_autocomplete)
     async def claim(
         self,
         interaction: discord.Interaction,
         number: int,
-        iracing_id: int = None
+        iracing_id: int = None,
+        car_class: Optional[str] = None
     ):
         """Claim a car number"""
         await interaction.response.defer(ephemeral=True)
@@ -30,33 +39,36 @@ class ClaimCommands(commands.Cog):
         guild_id = interaction.guild_id
         user_id = interaction.user.id
         username = str(interaction.user)
+        car_class = normalize_class(car_class)
+        label = number_label(number, car_class)
 
-        # Get guild config
-        config = await self.bot.db.get_guild_config(guild_id)
+        # Cheap in-memory pre-check so taken numbers fail before iRacing verification
+        occupancy = await self.bot.db.get_occupancy(guild_id, car_class)
 
-        if config:
-            min_num = config.get('min_number', 0)
-            max_num = config.get('max_number', 999)
-
-            # Check if number is in valid range
-            if number < min_num or number > max_num:
-                await interaction.followup.send(
-                    f"❌ Invalid number! Numbers must be between {min_num} and {max_num}.",
-                    ephemeral=True
-                )
-                return
-
-        # Check if number is already claimed
-        existing = await self.bot.db.get_number_assignment(guild_id, number)
+        if occupancy is None:
+            await interaction.followup.send(
+                f"❌ There is no **{car_class}** number pool. Use `/pool list` to see the classes.",
+                ephemeral=True
+            )
+            return
 
-        if existing:
-            claimed_by = existing.get('discord_username', 'Unknown')
+        if not occupancy.in_range(number):
             await interaction.followup.send(
-                f"❌ Number **{number}** is already claimed by **{claimed_by}**.",
+                f"❌ Invalid number! Numbers must be between {occupancy.min_number} and {occupancy.max_number}.",
                 ephemeral=True
             )
             return
 
+        if number in occupancy.claimed:
+            existing = await self.bot.db.get_number_assignment(guild_id, number, car_class)
+            if existing:
+                claimed_by = existing.get('discord_username', 'Unknown')
+                await interaction.followup.send(
+                    f"❌ Number **{label}** is already claimed by **{claimed_by}**.",
+                    ephemeral=True
+                )
+                return
+
         # Verify iRacing ID if provided
         iracing_name = None
         if iracing_id:
@@ -73,21 +85,50 @@ class ClaimCommands(commands.Cog):
             except Exception as e:
                 logger.error(f"Error verifying iRacing ID: {e}")
 
-        # Claim the number
-        success = await self.bot.db.claim_number(
-            guild_id=guild_id,
-            car_number=number,
-            discord_user_id=user_id,
-            discord_username=username,
-            iracing_id=iracing_id,
-            iracing_name=iracing_name
-        )
+        # Claim the number (range check, insert and audit in one transaction)
+        try:
+            result = await self.bot.db.try_claim(
+                guild_id=guild_id,
+                car_number=number,
+                discord_user_id=user_id,
+                discord_username=username,
+                iracing_id=iracing_id,
+                iracing_name=iracing_name,
+                car_class=car_class
+            )
+        except Exception as e:
+            logger.error(f"Error claiming number: {e}")
+            result = {'status': 'error'}
+
+        if result['status'] == 'taken':
+            claimed_by = result['holder'].get('discord_username', 'Unknown')
+            await interaction.followup.send(
+                f"❌ Number **{label}** is already claimed by **{claimed_by}**.",
+                ephemeral=True
+            )
+            return
+
+        if result['status'] == 'unknown_class':
+            await interaction.followup.send(
+                f"❌ There is no **{car_class}** number pool. Use `/pool list` to see the classes.",
+                ephemeral=True
+            )
+            return
+
+        if result['status'] == 'out_of_range':
+            await interaction.followup.send(
+                f"❌ Invalid number! Numbers must be between {result['min_number']} and {result['max_number']}.",
+                ephemeral=True
+            )
+            return
+
+        success = result['status'] == 'claimed'
 
         if success:
             # Create success embed
             embed = discord.Embed(
                 title="✅ Number Claimed!",
-                description=f"You have successfully claimed number **{number}**.",
+                description=f"You have successfully claimed number **{label}**.",
                 color=discord.Color.green()
             )
 
@@ -113,27 +154,179 @@ class ClaimCommands(commands.Cog):
 
             await interaction.followup.send(embed=embed, ephemeral=True)
 
-            # Send announcement if configured
+            # Queue announcement if configured (batched and sent in the background)
+            config = await self.bot.db.get_guild_config(guild_id)
             if config and config.get('announcement_channel_id'):
-                channel = self.bot.get_channel(config['announcement_channel_id'])
-                if channel:
-                    announce_embed = discord.Embed(
-                        title="🏁 New Number Claimed",
-                        description=f"{interaction.user.mention} claimed number **{number}**",
-                        color=discord.Color.blue()
-                    )
-                    try:
-                        await channel.send(embed=announce_embed)
-                    except:
-                        pass
+                self.bot.announcer.announce(
+                    config['announcement_channel_id'],
+                    'claimed',
+                    number,
+                    interaction.user.mention,
+                    car_class
+                )
 
         else:
             await interaction.followup.send(
-                f"❌ Failed to claim number {number}. Please try again.",
+                f"❌ Failed to claim number {label}. Please try again.",
+                ephemeral=True
+            )
+
+    @claim.autocomplete('number')
+    async def claim_number_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[int]]:
+        """Suggest free numbers near what the user has typed, in the class picked so far"""
+        car_class = normalize_class(getattr(interaction.namespace, 'car_class', None))
+        occupancy = await self.bot.db.get_occupancy(interaction.guild_id, car_class)
+        if occupancy is None:
+            return []
+
+        target = int(current) if current.isdigit() else occupancy.min_number
+
+        return [
+            app_commands.Choice(name=f"#{n} (available)", value=n)
+            for n in occupancy.free_near(target, 25)
+        ]
+
+    @app_commands.command(name="hold", description="Hold a car number for a while before claiming it")
+    @rate_limited("claim")
+    @app_commands.describe(
+        number="The car number you want to hold",
+        minutes="How long to hold it (default from server settings)",
+        car_class="Car class pool, e.g. GT3 (optional, for multi-class leagues)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def hold(
+        self,
+        interaction: discord.Interaction,
+        number: int,
+        minutes: int = None,
+        car_class: Optional[str] = None
+    ):
+        """Temporarily hold a car number"""
+        await interaction.response.defer(ephemeral=True)
+
+        guild_id = interaction.guild_id
+        car_class = normalize_class(car_class)
+        label = number_label(number, car_class)
+        max_minutes = self.bot.config.get_int('HOLD_MAX_MINUTES', 1440)
+        minutes = minutes or self.bot.config.get_int('HOLD_DEFAULT_MINUTES', 30)
+
+        if minutes < 1 or minutes > max_minutes:
+            await interaction.followup.send(
+                f"❌ Holds must be between 1 and {max_minutes} minutes.",
+                ephemeral=True
+            )
+            return
+
+        expires_at = datetime.utcnow() + timedelta(minutes=minutes)
+
+        try:
+            result = await self.bot.db.try_claim(
+                guild_id=guild_id,
+                car_number=number,
+                discord_user_id=interaction.user.id,
+                discord_username=str(interaction.user),
+                hold_expires_at=expires_at,
+                car_class=car_class
+            )
+        except Exception as e:
+            logger.error(f"Error holding number: {e}")
+            await interaction.followup.send(
+                f"❌ Failed to hold number {label}. Please try again.",
+                ephemeral=True
+            )
+            return
+
+        if result['status'] == 'taken':
+            claimed_by = result['holder'].get('discord_username', 'Unknown')
+            await interaction.followup.send(
+                f"❌ Number **{label}** is already taken by **{claimed_by}**.",
+                ephemeral=True
+            )
+            return
+
+        if result['status'] == 'unknown_class':
+            await interaction.followup.send(
+                f"❌ There is no **{car_class}** number pool. Use `/pool list` to see the classes.",
+                ephemeral=True
+            )
+            return
+
+        if result['status'] == 'out_of_range':
+            await interaction.followup.send(
+                f"❌ Invalid number! Numbers must be between {result['min_number']} and {result['max_number']}.",
                 ephemeral=True
             )
+            return
+
+        self.bot.holds.schedule(guild_id, number, expires_at)
+
+        expires_ts = int((expires_at - datetime(1970, 1, 1)).total_seconds())
+        confirm = f"/confirm {number}" + (f" car_class:{car_class}" if car_class else "")
+        embed = discord.Embed(
+            title="🕒 Number Held",
+            description=f"Number **{label}** is held for you until <t:{expires_ts}:t> (<t:{expires_ts}:R>).",
+            color=discord.Color.gold()
+        )
+        embed.add_field(
+            name="Next Steps",
+            value=f"Use `{confirm}` to keep it. Otherwise the hold lapses and the number is released.",
+            inline=False
+        )
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="confirm", description="Confirm a held number so it becomes your claim")
+    @rate_limited("claim")
+    @app_commands.describe(
+        number="The held car number to confirm",
+        car_class="Car class pool the number is held in (optional)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def confirm(self, interaction: discord.Interaction, number: int, car_class: Optional[str] = None):
+        """Convert a hold into a claim"""
+        await interaction.response.defer(ephemeral=True)
+
+        car_class = normalize_class(car_class)
+        label = number_label(number, car_class)
+        status = await self.bot.db.confirm_hold(interaction.guild_id, number, interaction.user.id, car_class)
+
+        if status == 'expired':
+            await interaction.followup.send(
+                f"❌ Your hold on number **{label}** has expired. Use `/hold` or `/claim` to try again.",
+                ephemeral=True
+            )
+            return
+
+        if status != 'confirmed':
+            await interaction.followup.send(
+                f"❌ You don't have an active hold on number **{label}**.",
+                ephemeral=True
+            )
+            return
+
+        embed = discord.Embed(
+            title="✅ Number Claimed!",
+            description=f"Your hold on number **{label}** is now a claim.",
+            color=discord.Color.green()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+        config = await self.bot.db.get_guild_config(interaction.guild_id)
+        if config and config.get('announcement_channel_id'):
+            self.bot.announcer.announce(
+                config['announcement_channel_id'],
+                'claimed',
+                number,
+                interaction.user.mention,
+                car_class
+            )
 
     @app_commands.command(name="link", description="Link your iRacing account to your Discord")
+    @rate_limited("claim")
     @app_commands.describe(iracing_id="Your iRacing customer ID")
     async def link(self, interaction: discord.Interaction, iracing_id: int):
         """Link iRacing account to Discord"""
@@ -152,23 +345,16 @@ class ClaimCommands(commands.Cog):
 
             iracing_name = member_info.get('display_name', 'Unknown')
 
-            # Update any existing number claims
+            # One upsert links the account everywhere the user has claims
             guild_id = interaction.guild_id
-            user_id = interaction.user.id
-
-            user_numbers = await self.bot.db.get_user_numbers(guild_id, user_id)
-
-            if user_numbers:
-                # Update existing claims with iRacing info
-                for assignment in user_numbers:
-                    await self.bot.db.db.execute("""
-                        UPDATE number_assignments
-                        SET iracing_id = ?, iracing_name = ?, iracing_verified = 1
-                        WHERE id = ?
-                    """, (iracing_id, iracing_name, assignment['id']))
-
-                await self.bot.db.db.commit()
+            claims = await self.bot.db.link_user(
+                discord_user_id=interaction.user.id,
+                discord_username=str(interaction.user),
+                iracing_id=iracing_id,
+                iracing_name=iracing_name
+            )
 
+            if claims:
                 embed = discord.Embed(
                     title="✅ iRacing Account Linked!",
                     description=f"Your Discord account is now linked to **{iracing_name}** (ID: {iracing_id})",
@@ -176,9 +362,15 @@ class ClaimCommands(commands.Cog):
                 )
                 embed.add_field(
                     name="Updated Claims",
-                    value=f"Linked to {len(user_numbers)} existing number claim(s)",
+                    value=f"Linked to {claims.get(guild_id, 0)} existing number claim(s) in this server",
                     inline=False
                 )
+                if len(claims) > 1:
+                    embed.add_field(
+                        name="Other Servers",
+                        value=f"Also applied to your claims in {len(claims) - 1} other server(s)",
+                        inline=False
+                    )
             else:
                 embed = discord.Embed(
                     title="✅ iRacing Account Verified!",
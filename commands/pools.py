@@ -0,0 +1,153 @@
+"""
+Pool commands - per-class number pools for multi-class leagues
+"""
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+import logging
+from typing import Optional, List
+from occupancy import normalize_class
+from ratelimit import rate_limited
+
+logger = logging.getLogger('iRacingBot.Commands.Pools')
+
+
+async def class_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """Suggest the guild's class pools (shared by every command with a car_class option)"""
+    pools = await interaction.client.db.get_number_pools(interaction.guild_id)
+    typed = normalize_class(current)
+
+    return [
+        app_commands.Choice(name=f"{name} ({pool['min_number']}-{pool['max_number']})", value=name)
+        for name, pool in pools.items()
+        if name.startswith(typed)
+    ][:25]
+
+
+class PoolCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    pool = app_commands.Group(name="pool", description="Number pools for car classes (GT3, LMP2, ...)")
+
+    @pool.command(name="set", description="Create or update a class number pool (admin only)")
+    @rate_limited("admin")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(
+        car_class="Class name, e.g. GT3",
+        min_number="Minimum car number in this class",
+        max_number="Maximum car number in this class",
+        iracing_class_id="iRacing car class ID, so /sync puts these drivers in this pool (optional)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def pool_set(
+        self,
+        interaction: discord.Interaction,
+        car_class: str,
+        min_number: int,
+        max_number: int,
+        iracing_class_id: Optional[int] = None
+    ):
+        """Create or update a pool"""
+        await interaction.response.defer(ephemeral=True)
+
+        if min_number < 0 or max_number > 9999 or min_number > max_number:
+            await interaction.followup.send(
+                "❌ Invalid number range! Min must be >= 0, max must be <= 9999, and min must be <= max.",
+                ephemeral=True
+            )
+            return
+
+        try:
+            name = await self.bot.db.set_number_pool(
+                interaction.guild_id, car_class, min_number, max_number, iracing_class_id
+            )
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="✅ Number Pool Saved",
+            description=f"**{name}** numbers can now be claimed with `/claim number:<n> car_class:{name}`.",
+            color=discord.Color.green()
+        )
+        embed.add_field(name="Number Range", value=f"{min_number}-{max_number}", inline=True)
+        embed.add_field(
+            name="iRacing Class",
+            value=str(iracing_class_id) if iracing_class_id else "Not mapped (sync uses the main pool)",
+            inline=True
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+        await self.bot.db.log_action(
+            interaction.guild_id,
+            interaction.user.id,
+            "set_pool",
+            f"Set {name} pool to {min_number}-{max_number}"
+        )
+
+    @pool.command(name="remove", description="Remove an empty class number pool (admin only)")
+    @rate_limited("admin")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(car_class="The class pool to remove")
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def pool_remove(self, interaction: discord.Interaction, car_class: str):
+        """Remove a pool"""
+        await interaction.response.defer(ephemeral=True)
+
+        guild_id = interaction.guild_id
+        name = normalize_class(car_class)
+
+        if name not in await self.bot.db.get_number_pools(guild_id):
+            await interaction.followup.send(f"❌ There is no **{name or car_class}** pool.", ephemeral=True)
+            return
+
+        if not await self.bot.db.remove_number_pool(guild_id, name):
+            await interaction.followup.send(
+                f"❌ Numbers are still claimed in the **{name}** pool. Release them first.",
+                ephemeral=True
+            )
+            return
+
+        await interaction.followup.send(f"✅ Removed the **{name}** pool.", ephemeral=True)
+        await self.bot.db.log_action(guild_id, interaction.user.id, "remove_pool", f"Removed {name} pool")
+
+    @pool.command(name="list", description="List the class number pools and how full they are")
+    @rate_limited("lookup")
+    async def pool_list(self, interaction: discord.Interaction):
+        """List pools"""
+        await interaction.response.defer(ephemeral=True)
+
+        guild_id = interaction.guild_id
+        pools = await self.bot.db.get_number_pools(guild_id)
+        main = await self.bot.db.get_occupancy(guild_id)
+
+        embed = discord.Embed(
+            title="🏎️ Number Pools",
+            description="Each class has its own numbers, so #7 can be taken once per class.",
+            color=discord.Color.blue()
+        )
+        embed.add_field(
+            name="Main pool",
+            value=f"{main.min_number}-{main.max_number} · {main.free_count()} free",
+            inline=False
+        )
+
+        for name, pool in pools.items():
+            occupancy = await self.bot.db.get_occupancy(guild_id, name)
+            iracing = f" · iRacing class {pool['iracing_class_id']}" if pool.get('iracing_class_id') else ""
+            embed.add_field(
+                name=name,
+                value=f"{pool['min_number']}-{pool['max_number']} · {occupancy.free_count()} free{iracing}",
+                inline=True
+            )
+
+        if not pools:
+            embed.set_footer(text="Use /pool set to add a class pool")
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(PoolCommands(bot))
@@ -6,6 +6,10 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
+from typing import List, Optional
+from occupancy import normalize_class, number_label
+from ratelimit import rate_limited
+from commands.pools import class_autocomplete
 
 logger = logging.getLogger('iRacingBot.Commands.Release')
 
@@ -14,20 +18,27 @@ class ReleaseCommands(commands.Cog):
         self.bot = bot
 
     @app_commands.command(name="release", description="Release a car number you've claimed")
-    @app_commands.describe(number="The car number you want to release")
-    async def release(self, interaction: discord.Interaction, number: int):
+    @rate_limited("claim")
+    @app_commands.describe(
+        number="The car number you want to release",
+        car_class="Car class pool the number is in (optional, for multi-class leagues)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def release(self, interaction: discord.Interaction, number: int, car_class: Optional[str] = None):
         """Release a claimed car number"""
         await interaction.response.defer(ephemeral=True)
 
         guild_id = interaction.guild_id
         user_id = interaction.user.id
+        car_class = normalize_class(car_class)
+        label = number_label(number, car_class)
 
         # Check if the number is claimed by this user
-        assignment = await self.bot.db.get_number_assignment(guild_id, number)
+        assignment = await self.bot.db.get_number_assignment(guild_id, number, car_class)
 
         if not assignment:
             await interaction.followup.send(
-                f"❌ Number **{number}** is not currently claimed.",
+                f"❌ Number **{label}** is not currently claimed.",
                 ephemeral=True
             )
             return
@@ -46,21 +57,29 @@ class ReleaseCommands(commands.Cog):
             if not is_admin and not interaction.user.guild_permissions.administrator:
                 claimed_by = assignment.get('discord_username', 'another user')
                 await interaction.followup.send(
-                    f"❌ Number **{number}** is claimed by **{claimed_by}**. You can only release your own numbers.",
+                    f"❌ Number **{label}** is claimed by **{claimed_by}**. You can only release your own numbers.",
                     ephemeral=True
                 )
                 return
 
         # Release the number
-        success = await self.bot.db.release_number(guild_id, number, assignment['discord_user_id'])
+        success, handoff = await self.bot.db.release_number_with_handoff(
+            guild_id, number, assignment['discord_user_id'], car_class
+        )
 
         if success:
             embed = discord.Embed(
                 title="✅ Number Released",
-                description=f"Number **{number}** has been released and is now available.",
+                description=f"Number **{label}** has been released and is now available.",
                 color=discord.Color.green()
             )
 
+            if handoff:
+                embed.description = (
+                    f"Number **{label}** has been released and passed to "
+                    f"**{handoff['discord_username']}**, who was next on the waitlist."
+                )
+
             if assignment['discord_user_id'] != user_id:
                 embed.add_field(
                     name="Released by Admin",
@@ -70,28 +89,42 @@ class ReleaseCommands(commands.Cog):
 
             await interaction.followup.send(embed=embed, ephemeral=True)
 
-            # Send announcement if configured
+            if handoff:
+                # Next person on the waitlist got the number
+                await self.bot.notify_waitlist_handoff(handoff)
+                return
+
+            # Queue announcement if configured (batched and sent in the background)
             config = await self.bot.db.get_guild_config(guild_id)
             if config and config.get('announcement_channel_id'):
-                channel = self.bot.get_channel(config['announcement_channel_id'])
-                if channel:
-                    announce_embed = discord.Embed(
-                        title="🏁 Number Released",
-                        description=f"Number **{number}** is now available",
-                        color=discord.Color.orange()
-                    )
-                    try:
-                        await channel.send(embed=announce_embed)
-                    except:
-                        pass
+                self.bot.announcer.announce(config['announcement_channel_id'], 'released', number, car_class=car_class)
 
         else:
             await interaction.followup.send(
-                f"❌ Failed to release number {number}. Please try again.",
+                f"❌ Failed to release number {label}. Please try again.",
                 ephemeral=True
             )
 
+    @release.autocomplete('number')
+    async def release_number_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[int]]:
+        """Suggest the user's own claimed numbers in the class picked so far"""
+        car_class = normalize_class(getattr(interaction.namespace, 'car_class', None))
+        occupancy = await self.bot.db.get_occupancy(interaction.guild_id, car_class)
+        if occupancy is None:
+            return []
+
+        return [
+            app_commands.Choice(name=f"#{n}", value=n)
+            for n in occupancy.user_numbers(interaction.user.id)
+            if str(n).startswith(current)
+        ][:25]
+
     @app_commands.command(name="mynumbers", description="View your claimed car numbers")
+    @rate_limited("lookup")
     async def mynumbers(self, interaction: discord.Interaction):
         """View user's claimed numbers"""
         await interaction.response.defer(ephemeral=True)
@@ -116,7 +149,12 @@ class ReleaseCommands(commands.Cog):
 
         for assignment in assignments:
             number = assignment['car_number']
-            status = "✅ Synced" if assignment.get('synced_with_iracing') else "⏳ Pending"
+            if assignment.get('car_class'):
+                number = number_label(number, assignment['car_class'])
+            if assignment.get('status') == 'held':
+                status = f"🕒 Held until {assignment.get('hold_expires_at')} UTC"
+            else:
+                status = "✅ Synced" if assignment.get('synced_with_iracing') else "⏳ Pending"
 
             field_value = f"Status: {status}\n"
 
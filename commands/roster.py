@@ -6,45 +6,77 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Optional, List
+from occupancy import normalize_class, number_label
+from roster_export import export_roster, export_filename, DEFAULT_SPILL_THRESHOLD
+from ratelimit import rate_limited
+from commands.pools import class_autocomplete
 
 logger = logging.getLogger('iRacingBot.Commands.Roster')
 
+HISTORY_LIMIT = 20
+HISTORY_SOURCES = {
+    'claim': "claimed",
+    'hold': "held",
+    'import': "imported",
+    'sync': "synced from iRacing",
+    'waitlist': "from waitlist"
+}
+HISTORY_ENDINGS = {
+    'release': "released",
+    'force_release': "force released",
+    'expired': "hold expired"
+}
+
 class RosterCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     @app_commands.command(name="roster", description="View the current car number roster")
-    async def roster(self, interaction: discord.Interaction):
+    @rate_limited("lookup")
+    @app_commands.describe(car_class="Only show one car class pool, e.g. GT3 (optional)")
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def roster(self, interaction: discord.Interaction, car_class: Optional[str] = None):
         """View the complete roster"""
         await interaction.response.defer()
 
         guild_id = interaction.guild_id
+        car_class = normalize_class(car_class) if car_class is not None else None
+        cache_key = (guild_id, 'roster', (car_class,), self.bot.db.guild_version(guild_id))
+
+        embed = await self.bot.render_cache.get_embed(
+            cache_key,
+            lambda: self._build_roster_embed(guild_id, car_class)
+        )
+        await interaction.followup.send(embed=embed)
 
-        assignments = await self.bot.db.get_all_assignments(guild_id)
+    async def _build_roster_embed(self, guild_id: int, car_class: Optional[str] = None) -> discord.Embed:
+        """Render the roster embed for a guild, or for one of its class pools"""
+        assignments = await self.bot.db.get_all_assignments(guild_id, car_class)
 
         embed = discord.Embed(
-            title="🏁 Car Number Roster",
+            title=f"🏁 {car_class} Car Number Roster" if car_class else "🏁 Car Number Roster",
             description=f"Total claimed numbers: {len(assignments)}",
             color=discord.Color.blue()
         )
 
         if not assignments:
             embed.description = "No numbers have been claimed yet. Use `/claim` to be the first!"
-            await interaction.followup.send(embed=embed)
-            return
-
-        # Sort by car number
-        assignments.sort(key=lambda x: x['car_number'])
+            return embed
 
+        # Assignments come sorted by class, then car number
         # Group assignments for display (max 25 fields per embed)
         roster_text = []
         for assignment in assignments[:25]:  # Discord embed field limit
-            number = assignment['car_number']
+            number = number_label(assignment['car_number'], assignment.get('car_class'))
             user = assignment.get('discord_username', 'Unknown')
-            status = "✅" if assignment.get('synced_with_iracing') else "⏳"
+            if assignment.get('status') == 'held':
+                status = "🕒"
+            else:
+                status = "✅" if assignment.get('synced_with_iracing') else "⏳"
 
-            roster_text.append(f"{status} **#{number}** - {user}")
+            roster_text.append(f"{status} **{number}** - {user}")
 
         # Split into chunks of 10 for better formatting
         chunk_size = 10
@@ -61,30 +93,62 @@ class RosterCommands(commands.Cog):
 
         embed.add_field(
             name="Legend",
-            value="✅ Synced with iRacing\n⏳ Pending manual assignment",
+            value="✅ Synced with iRacing\n⏳ Pending manual assignment\n🕒 Held (not yet confirmed)",
             inline=False
         )
 
-        await interaction.followup.send(embed=embed)
+        return embed
 
     @app_commands.command(name="available", description="View available car numbers")
+    @rate_limited("lookup")
     @app_commands.describe(
         range_start="Starting number (optional)",
-        range_end="Ending number (optional)"
+        range_end="Ending number (optional)",
+        car_class="Car class pool, e.g. GT3 (optional, for multi-class leagues)"
     )
+    @app_commands.autocomplete(car_class=class_autocomplete)
     async def available(
         self,
         interaction: discord.Interaction,
         range_start: Optional[int] = None,
-        range_end: Optional[int] = None
+        range_end: Optional[int] = None,
+        car_class: Optional[str] = None
     ):
         """View available numbers"""
         await interaction.response.defer(ephemeral=True)
 
         guild_id = interaction.guild_id
+        car_class = normalize_class(car_class)
+
+        if not await self._pool_exists(interaction, car_class):
+            return
+
+        cache_key = (guild_id, 'available', (range_start, range_end, car_class), self.bot.db.guild_version(guild_id))
+
+        embed = await self.bot.render_cache.get_embed(
+            cache_key,
+            lambda: self._build_available_embed(guild_id, range_start, range_end, car_class)
+        )
+
+        if embed is None:
+            await interaction.followup.send(
+                "❌ No available numbers in the specified range!",
+                ephemeral=True
+            )
+            return
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
-        # Get available numbers
-        available = await self.bot.db.get_available_numbers(guild_id)
+    async def _build_available_embed(
+        self,
+        guild_id: int,
+        range_start: Optional[int],
+        range_end: Optional[int],
+        car_class: str = ''
+    ) -> Optional[discord.Embed]:
+        """Render the available numbers embed, or None if nothing is free"""
+        # Get available numbers (an unknown class has none)
+        available = await self.bot.db.get_available_numbers(guild_id, car_class)
 
         # Apply range filter if specified
         if range_start is not None or range_end is not None:
@@ -93,15 +157,11 @@ class RosterCommands(commands.Cog):
             available = [n for n in available if start <= n <= end]
 
         if not available:
-            await interaction.followup.send(
-                "❌ No available numbers in the specified range!",
-                ephemeral=True
-            )
-            return
+            return None
 
         # Create embed
         embed = discord.Embed(
-            title="🔢 Available Car Numbers",
+            title=f"🔢 Available {car_class} Car Numbers" if car_class else "🔢 Available Car Numbers",
             description=f"Found {len(available)} available number(s)",
             color=discord.Color.green()
         )
@@ -128,21 +188,31 @@ class RosterCommands(commands.Cog):
             )
             embed.set_footer(text=f"Showing first 100 of {len(available)} available numbers")
 
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        return embed
 
     @app_commands.command(name="check", description="Check if a specific number is available")
-    @app_commands.describe(number="The car number to check")
-    async def check(self, interaction: discord.Interaction, number: int):
+    @rate_limited("lookup")
+    @app_commands.describe(
+        number="The car number to check",
+        car_class="Car class pool, e.g. GT3 (optional, for multi-class leagues)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def check(self, interaction: discord.Interaction, number: int, car_class: Optional[str] = None):
         """Check if a number is available"""
         await interaction.response.defer(ephemeral=True)
 
         guild_id = interaction.guild_id
+        car_class = normalize_class(car_class)
+        title = f"Number {number_label(number, car_class)}" if car_class else f"Number {number}"
 
-        assignment = await self.bot.db.get_number_assignment(guild_id, number)
+        if not await self._pool_exists(interaction, car_class):
+            return
+
+        assignment = await self.bot.db.get_number_assignment(guild_id, number, car_class)
 
         if assignment:
             embed = discord.Embed(
-                title=f"Number {number}",
+                title=title,
                 description="❌ This number is already claimed",
                 color=discord.Color.red()
             )
@@ -160,7 +230,10 @@ class RosterCommands(commands.Cog):
                     inline=True
                 )
 
-            status = "✅ Synced with iRacing" if assignment.get('synced_with_iracing') else "⏳ Pending assignment"
+            if assignment.get('status') == 'held':
+                status = f"🕒 Held until {assignment.get('hold_expires_at')} UTC"
+            else:
+                status = "✅ Synced with iRacing" if assignment.get('synced_with_iracing') else "⏳ Pending assignment"
             embed.add_field(name="Status", value=status, inline=False)
 
             claimed_date = assignment['claimed_at'][:10]
@@ -168,64 +241,250 @@ class RosterCommands(commands.Cog):
 
         else:
             embed = discord.Embed(
-                title=f"Number {number}",
+                title=title,
                 description="✅ This number is available!",
                 color=discord.Color.green()
             )
+            claim_usage = f"/claim number:{number} car_class:{car_class}" if car_class else f"/claim {number}"
             embed.add_field(
                 name="Claim It",
-                value=f"Use `/claim {number}` to claim this number",
+                value=f"Use `{claim_usage}` to claim this number",
                 inline=False
             )
 
         await interaction.followup.send(embed=embed, ephemeral=True)
 
-    @app_commands.command(name="export", description="Export roster to CSV format")
-    @app_commands.checks.has_permissions(administrator=True)
-    async def export(self, interaction: discord.Interaction):
-        """Export roster to CSV"""
+    @check.autocomplete('number')
+    async def check_number_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[int]]:
+        """Suggest numbers near what the user has typed, marking who holds them"""
+        car_class = normalize_class(getattr(interaction.namespace, 'car_class', None))
+        occupancy = await self.bot.db.get_occupancy(interaction.guild_id, car_class)
+        if occupancy is None:
+            return []
+
+        if not current.isdigit():
+            return [
+                app_commands.Choice(name=f"#{n} (available)", value=n)
+                for n in occupancy.free_near(occupancy.min_number, 25)
+            ]
+
+        target = int(current)
+        choices = []
+        if target in occupancy.claimed:
+            choices.append(app_commands.Choice(name=f"#{target} (claimed)", value=target))
+
+        choices += [
+            app_commands.Choice(name=f"#{n} (available)", value=n)
+            for n in occupancy.free_near(target, 25 - len(choices))
+        ]
+        return choices
+
+    @app_commands.command(name="suggest", description="Suggest free numbers near a target or matching a pattern")
+    @rate_limited("lookup")
+    @app_commands.describe(
+        near="Find free numbers closest to this number",
+        pattern="Digit pattern: ? = one digit, * = any digits (e.g. *3, 7?, 1*1)",
+        count="How many suggestions to show (default: 10)"
+    )
+    async def suggest(
+        self,
+        interaction: discord.Interaction,
+        near: Optional[int] = None,
+        pattern: Optional[app_commands.Range[str, 1, 8]] = None,
+        count: app_commands.Range[int, 1, 50] = 10
+    ):
+        """Suggest free numbers"""
         await interaction.response.defer(ephemeral=True)
 
-        guild_id = interaction.guild_id
+        occupancy = await self.bot.db.get_occupancy(interaction.guild_id)
 
-        assignments = await self.bot.db.get_all_assignments(guild_id)
+        if pattern:
+            try:
+                numbers = occupancy.free_matching(pattern.strip(), count)
+            except ValueError as e:
+                await interaction.followup.send(f"❌ {e}", ephemeral=True)
+                return
+            heading = f"Free numbers matching `{pattern.strip()}`"
+        else:
+            target = near if near is not None else occupancy.min_number
+            numbers = occupancy.free_near(target, count)
+            heading = f"Free numbers closest to {target}"
 
-        if not assignments:
+        if not numbers:
             await interaction.followup.send(
-                "No assignments to export!",
+                "❌ No free numbers match that search.",
                 ephemeral=True
             )
             return
 
-        # Create CSV content
-        csv_lines = ["Car Number,Discord User,iRacing ID,iRacing Name,Status,Claimed Date"]
+        embed = discord.Embed(
+            title="💡 Number Suggestions",
+            description=heading,
+            color=discord.Color.green()
+        )
+        embed.add_field(
+            name="Suggestions",
+            value=", ".join(f"**{n}**" for n in numbers),
+            inline=False
+        )
+        embed.set_footer(text=f"{occupancy.free_count()} free numbers in range {occupancy.min_number}-{occupancy.max_number}")
 
-        for assignment in sorted(assignments, key=lambda x: x['car_number']):
-            number = assignment['car_number']
-            discord_user = assignment.get('discord_username', '')
-            iracing_id = assignment.get('iracing_id', '')
-            iracing_name = assignment.get('iracing_name', '')
-            status = 'Synced' if assignment.get('synced_with_iracing') else 'Pending'
-            claimed_date = assignment['claimed_at'][:10]
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
-            csv_lines.append(f"{number},{discord_user},{iracing_id},{iracing_name},{status},{claimed_date}")
+    @app_commands.command(name="history", description="See who has held a number, or which numbers a member has held")
+    @rate_limited("lookup")
+    @app_commands.describe(
+        number="Car number to look up",
+        user="Member to look up",
+        car_class="Car class pool of the number (optional, for multi-class leagues)",
+        since="Only tenures still running on or after this date (YYYY-MM-DD, UTC)",
+        until="Only tenures that started on or before this date (YYYY-MM-DD, UTC)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def history(
+        self,
+        interaction: discord.Interaction,
+        number: Optional[int] = None,
+        user: Optional[discord.User] = None,
+        car_class: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ):
+        """Show number ownership history"""
+        await interaction.response.defer(ephemeral=True)
 
-        csv_content = "\n".join(csv_lines)
+        if number is None and user is None:
+            await interaction.followup.send("❌ Give a `number`, a `user`, or both.", ephemeral=True)
+            return
+
+        try:
+            since_at = datetime.strptime(since, "%Y-%m-%d") if since else None
+            # The until date is inclusive
+            until_at = datetime.strptime(until, "%Y-%m-%d") + timedelta(days=1) if until else None
+        except ValueError:
+            await interaction.followup.send("❌ Dates must look like 2026-03-31.", ephemeral=True)
+            return
 
-        # Create file
-        import io
-        file = discord.File(
-            io.BytesIO(csv_content.encode()),
-            filename=f"roster_{interaction.guild.name}_{guild_id}.csv"
+        car_class = normalize_class(car_class) if number is not None or car_class else None
+        tenures = await self.bot.db.get_number_history(
+            interaction.guild_id,
+            car_number=number,
+            discord_user_id=user.id if user else None,
+            car_class=car_class,
+            since=since_at,
+            until=until_at,
+            limit=HISTORY_LIMIT
         )
 
+        subject = []
+        if number is not None:
+            subject.append(f"number **{number_label(number, car_class)}**")
+        if user:
+            subject.append(user.mention)
+
         embed = discord.Embed(
-            title="📊 Roster Export",
-            description=f"Exported {len(assignments)} assignments",
+            title="📜 Number History",
+            description=f"History for {' and '.join(subject)}",
             color=discord.Color.blue()
         )
 
-        await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+        if not tenures:
+            if number is not None:
+                embed.description += "\nNo one has held it in that period."
+            else:
+                embed.description += "\nNo numbers held in that period."
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+
+        lines = []
+        for tenure in tenures:
+            started = tenure['started_at'][:10]
+            ended = tenure['ended_at'][:10] if tenure.get('ended_at') else "now"
+            how = HISTORY_SOURCES.get(tenure['source'], tenure['source'])
+            if tenure.get('end_reason'):
+                how += f", {HISTORY_ENDINGS.get(tenure['end_reason'], tenure['end_reason'])}"
+
+            if number is not None and not user:
+                if tenure.get('discord_user_id'):
+                    who = f"<@{tenure['discord_user_id']}>"
+                else:
+                    who = tenure.get('holder_name') or "Unknown"
+            else:
+                who = number_label(tenure['car_number'], tenure['car_class'])
+            lines.append(f"**{who}** · {started} → {ended} ({how})")
+
+        embed.add_field(name="Tenures (newest first)", value="\n".join(lines)[:1024], inline=False)
+        if len(tenures) == HISTORY_LIMIT:
+            embed.set_footer(text=f"Showing the latest {HISTORY_LIMIT}; narrow it down with since/until")
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="export", description="Export the roster as CSV or JSON Lines")
+    @rate_limited("export")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(
+        format="File format (default: CSV)",
+        compress="Gzip the file (default: no)"
+    )
+    @app_commands.choices(format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSON Lines", value="jsonl")
+    ])
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        format: Optional[app_commands.Choice[str]] = None,
+        compress: bool = False
+    ):
+        """Export the roster"""
+        await interaction.response.defer(ephemeral=True)
+
+        guild_id = interaction.guild_id
+        fmt = format.value if format else 'csv'
+
+        # Rows are streamed page by page from the database into a spooled file
+        export_file, count = await export_roster(
+            self.bot.db.iter_assignments(guild_id),
+            fmt=fmt,
+            compress=compress,
+            spill_threshold=self.bot.config.get_int('EXPORT_SPILL_BYTES', DEFAULT_SPILL_THRESHOLD)
+        )
+
+        with export_file:
+            if count == 0:
+                await interaction.followup.send(
+                    "No assignments to export!",
+                    ephemeral=True
+                )
+                return
+
+            file = discord.File(
+                export_file,
+                filename=export_filename(f"roster_{interaction.guild.name}_{guild_id}", fmt, compress)
+            )
+
+            embed = discord.Embed(
+                title="📊 Roster Export",
+                description=f"Exported {count} assignments",
+                color=discord.Color.blue()
+            )
+
+            await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+
+    async def _pool_exists(self, interaction: discord.Interaction, car_class: str) -> bool:
+        """Tell the user and return False when they picked a class pool that doesn't exist"""
+        if await self.bot.db.get_occupancy(interaction.guild_id, car_class) is not None:
+            return True
+
+        await interaction.followup.send(
+            f"❌ There is no **{car_class}** number pool. Use `/pool list` to see the classes.",
+            ephemeral=True
+        )
+        return False
 
     def _format_number_ranges(self, numbers: list) -> str:
         """Format a list of numbers into ranges (e.g., 1-5, 10, 15-20)"""
@@ -5,19 +5,61 @@ Sync command - sync car numbers with iRacing
 import discord
 from discord import app_commands
 from discord.ext import commands
+import io
 import logging
+from ratelimit import rate_limited
+from occupancy import number_label
 
 logger = logging.getLogger('iRacingBot.Commands.Sync')
 
+PREVIEW_PAGE_SIZE = 15
+
+class PagedEmbedView(discord.ui.View):
+    """Previous/next buttons for flipping through a list of embeds"""
+
+    def __init__(self, pages: list, owner_id: int, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.owner_id = owner_id
+        self.index = 0
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message(
+                "❌ Only the person who ran this command can change pages.",
+                ephemeral=True
+            )
+            return False
+        return True
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index -= 1
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.index], view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index += 1
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.index], view=self)
+
 class SyncCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     @app_commands.command(name="sync", description="Sync car numbers with iRacing league data")
+    @rate_limited("sync")
     @app_commands.checks.has_permissions(manage_guild=True)
-    async def sync(self, interaction: discord.Interaction):
+    @app_commands.describe(dry_run="Preview what would change without writing anything")
+    async def sync(self, interaction: discord.Interaction, dry_run: bool = False):
         """Sync with iRacing"""
-        await interaction.response.defer()
+        await interaction.response.defer(ephemeral=dry_run)
 
         guild_id = interaction.guild_id
 
@@ -40,6 +82,10 @@ class SyncCommands(commands.Cog):
 
         league_id = config['league_id']
 
+        if dry_run:
+            await self._send_sync_preview(interaction, guild_id, league_id)
+            return
+
         # Create status embed
         status_embed = discord.Embed(
             title="🔄 Syncing with iRacing",
@@ -121,22 +167,109 @@ class SyncCommands(commands.Cog):
             )
             await status_message.edit(embed=embed)
 
+    async def _send_sync_preview(self, interaction: discord.Interaction, guild_id: int, league_id: int):
+        """Show a paged report of what /sync would change, plus a CSV download"""
+        plan = await self.bot.preview_sync_with_iracing(guild_id, league_id)
+
+        if plan is None:
+            await interaction.followup.send(
+                "❌ Could not load the iRacing roster. Check the league ID and iRacing credentials.",
+                ephemeral=True
+            )
+            return
+
+        summary = discord.Embed(
+            title="🔍 Sync Preview (dry run)",
+            description="Nothing has been written. Run `/sync` without `dry_run` to apply.",
+            color=discord.Color.blue()
+        )
+        summary.add_field(name="➕ Would Add", value=str(len(plan.to_add)), inline=True)
+        summary.add_field(name="⚠️ Conflicts", value=str(len(plan.conflicts)), inline=True)
+        summary.add_field(name="❓ Missing in iRacing", value=str(len(plan.missing)), inline=True)
+        summary.add_field(name="✅ Already Matching", value=str(len(plan.matched)), inline=True)
+        summary.add_field(name="League", value=f"League ID: {league_id}", inline=True)
+
+        pages = [summary]
+        pages += self._preview_pages(
+            "➕ Numbers That Would Be Added",
+            [
+                f"**{number_label(e['car_number'], e['car_class'])}** - {e['iracing_name']} (ID: {e['iracing_id']})"
+                for e in plan.to_add
+            ],
+            discord.Color.green()
+        )
+        pages += self._preview_pages(
+            "⚠️ Conflicts (skipped by sync)",
+            [
+                f"**{number_label(e['car_number'], e['car_class'])}** - iRacing: {e['iracing_name']} "
+                f"vs Discord: {e['discord_username']}\n"
+                f"└ {e['reason']}"
+                for e in plan.conflicts
+            ],
+            discord.Color.orange()
+        )
+        pages += self._preview_pages(
+            "❓ Missing in iRacing",
+            [
+                f"**{number_label(e['car_number'], e['car_class'])}** - {e['discord_username']} ({e['reason']})"
+                for e in plan.missing
+            ],
+            discord.Color.red()
+        )
+
+        for i, page in enumerate(pages, start=1):
+            page.set_footer(text=f"Page {i} of {len(pages)}")
+
+        file = discord.File(
+            io.BytesIO(plan.to_csv().encode()),
+            filename=f"sync_preview_{guild_id}.csv"
+        )
+
+        view = PagedEmbedView(pages, interaction.user.id) if len(pages) > 1 else discord.utils.MISSING
+        await interaction.followup.send(embed=pages[0], file=file, view=view, ephemeral=True)
+
+    def _preview_pages(self, title: str, lines: list, color: discord.Color) -> list:
+        """Split report lines into embed pages"""
+        pages = []
+        for i in range(0, len(lines), PREVIEW_PAGE_SIZE):
+            pages.append(discord.Embed(
+                title=title,
+                description="\n".join(lines[i:i + PREVIEW_PAGE_SIZE]),
+                color=color
+            ))
+        return pages
+
     @app_commands.command(name="syncstatus", description="View sync status and statistics")
+    @rate_limited("lookup")
     async def syncstatus(self, interaction: discord.Interaction):
         """View sync status"""
         await interaction.response.defer(ephemeral=True)
 
         guild_id = interaction.guild_id
+        auto_sync_running = self.bot.auto_sync.is_running()
+        cache_key = (guild_id, 'syncstatus', (auto_sync_running,), self.bot.db.guild_version(guild_id))
 
-        config = await self.bot.db.get_guild_config(guild_id)
+        embed = await self.bot.render_cache.get_embed(
+            cache_key,
+            lambda: self._build_syncstatus_embed(guild_id, auto_sync_running)
+        )
 
-        if not config:
+        if embed is None:
             await interaction.followup.send(
                 "This server hasn't been configured yet. Use `/setup` to get started.",
                 ephemeral=True
             )
             return
 
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    async def _build_syncstatus_embed(self, guild_id: int, auto_sync_running: bool):
+        """Render the sync status embed, or None if the guild isn't configured"""
+        config = await self.bot.db.get_guild_config(guild_id)
+
+        if not config:
+            return None
+
         # Get roster stats
         assignments = await self.bot.db.get_all_assignments(guild_id)
         synced_count = sum(1 for a in assignments if a.get('synced_with_iracing'))
@@ -182,7 +315,7 @@ class SyncCommands(commands.Cog):
             )
 
         # Auto-sync status
-        if self.bot.auto_sync.is_running():
+        if auto_sync_running:
             embed.add_field(
                 name="Auto-Sync",
                 value="✅ Enabled (runs every hour)",
@@ -197,7 +330,7 @@ class SyncCommands(commands.Cog):
 
         embed.set_footer(text="Use /sync to manually trigger a sync")
 
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        return embed
 
 async def setup(bot):
     await bot.add_cog(SyncCommands(bot))
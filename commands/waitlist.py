@@ -0,0 +1,179 @@
+"""
+Waitlist commands - queue up for numbers that are already claimed
+"""
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+import logging
+from typing import Optional
+from occupancy import normalize_class, number_label
+from ratelimit import rate_limited
+from commands.pools import class_autocomplete
+
+logger = logging.getLogger('iRacingBot.Commands.Waitlist')
+
+class WaitlistCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    waitlist = app_commands.Group(name="waitlist", description="Queue up for a number that is already claimed")
+
+    @waitlist.command(name="join", description="Join the waitlist for a claimed number")
+    @rate_limited("claim")
+    @app_commands.describe(
+        number="The car number you want to wait for",
+        car_class="Car class pool, e.g. GT3 (optional, for multi-class leagues)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def join(self, interaction: discord.Interaction, number: int, car_class: Optional[str] = None):
+        """Join a number's waitlist"""
+        await interaction.response.defer(ephemeral=True)
+
+        guild_id = interaction.guild_id
+        user_id = interaction.user.id
+        car_class = normalize_class(car_class)
+        label = number_label(number, car_class)
+        occupancy = await self.bot.db.get_occupancy(guild_id, car_class)
+
+        if occupancy is None:
+            await interaction.followup.send(
+                f"❌ There is no **{car_class}** number pool. Use `/pool list` to see the classes.",
+                ephemeral=True
+            )
+            return
+
+        if not occupancy.in_range(number):
+            await interaction.followup.send(
+                f"❌ Invalid number! Numbers must be between {occupancy.min_number} and {occupancy.max_number}.",
+                ephemeral=True
+            )
+            return
+
+        if number not in occupancy.claimed:
+            claim = f"/claim {number}" + (f" car_class:{car_class}" if car_class else "")
+            await interaction.followup.send(
+                f"✅ Number **{label}** is available right now! Use `{claim}` to claim it.",
+                ephemeral=True
+            )
+            return
+
+        if occupancy.claimed[number] == user_id:
+            await interaction.followup.send(
+                f"❌ You already hold number **{label}**.",
+                ephemeral=True
+            )
+            return
+
+        position = await self.bot.db.join_waitlist(guild_id, number, user_id, str(interaction.user), car_class)
+
+        if position is None:
+            position = await self.bot.db.get_waitlist_position(guild_id, number, user_id, car_class)
+            await interaction.followup.send(
+                f"ℹ️ You're already on the waitlist for **{label}** (position {position}).",
+                ephemeral=True
+            )
+            return
+
+        embed = discord.Embed(
+            title="📝 Joined Waitlist",
+            description=f"You're **#{position}** in line for number **{label}**.",
+            color=discord.Color.blue()
+        )
+        embed.add_field(
+            name="What Happens Next",
+            value="If the number is released you'll get it automatically and receive a DM.",
+            inline=False
+        )
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @waitlist.command(name="leave", description="Leave the waitlist for a number")
+    @rate_limited("claim")
+    @app_commands.describe(
+        number="The car number to stop waiting for",
+        car_class="Car class pool of the number (optional)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def leave(self, interaction: discord.Interaction, number: int, car_class: Optional[str] = None):
+        """Leave a number's waitlist"""
+        await interaction.response.defer(ephemeral=True)
+
+        car_class = normalize_class(car_class)
+        label = number_label(number, car_class)
+        removed = await self.bot.db.leave_waitlist(interaction.guild_id, number, interaction.user.id, car_class)
+
+        if removed:
+            await interaction.followup.send(
+                f"✅ You've left the waitlist for number **{label}**.",
+                ephemeral=True
+            )
+        else:
+            await interaction.followup.send(
+                f"❌ You're not on the waitlist for number **{label}**.",
+                ephemeral=True
+            )
+
+    @waitlist.command(name="show", description="Show the waitlist for a number, or your own waitlists")
+    @rate_limited("lookup")
+    @app_commands.describe(
+        number="The car number to show (optional)",
+        car_class="Car class pool of the number (optional)"
+    )
+    @app_commands.autocomplete(car_class=class_autocomplete)
+    async def show(
+        self,
+        interaction: discord.Interaction,
+        number: Optional[int] = None,
+        car_class: Optional[str] = None
+    ):
+        """Show a waitlist"""
+        await interaction.response.defer(ephemeral=True)
+
+        guild_id = interaction.guild_id
+        car_class = normalize_class(car_class)
+
+        if number is None:
+            waitlists = await self.bot.db.get_user_waitlists(guild_id, interaction.user.id)
+            if not waitlists:
+                await interaction.followup.send(
+                    "You're not on any waitlists. Use `/waitlist join` to queue for a number.",
+                    ephemeral=True
+                )
+                return
+
+            lines = [
+                f"**{number_label(car_number, waiting_class)}** - position {position}"
+                for waiting_class, car_number, position in waitlists
+            ]
+
+            embed = discord.Embed(
+                title="📝 Your Waitlists",
+                description="\n".join(lines),
+                color=discord.Color.blue()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+
+        entries = await self.bot.db.get_waitlist(guild_id, number, car_class)
+
+        embed = discord.Embed(
+            title=f"📝 Waitlist for {number_label(number, car_class)}",
+            color=discord.Color.blue()
+        )
+
+        if not entries:
+            embed.description = "Nobody is waiting for this number."
+        else:
+            lines = [
+                f"{i}. {entry.get('discord_username') or 'Unknown'}"
+                for i, entry in enumerate(entries[:25], start=1)
+            ]
+            embed.description = "\n".join(lines)
+            if len(entries) > 25:
+                embed.set_footer(text=f"Showing first 25 of {len(entries)} waiting")
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(WaitlistCommands(bot))
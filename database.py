@@ -4,21 +4,283 @@ Manages SQLite database for number assignments and guild configurations
 """
 
 import aiosqlite
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from occupancy import OccupancyIndex, GuildOccupancy, DEFAULT_CLASS, normalize_class
+from sharding import ShardPlan
 
 logger = logging.getLogger('iRacingBot.Database')
 
+SQLITE_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+# Assignments with the holder's linked iRacing identity filled in from the users table
+# ({verified} and {extra_columns} let later migrations recreate the view as the schema grows)
+ASSIGNMENT_DETAILS_VIEW = """
+    CREATE VIEW IF NOT EXISTS assignment_details AS
+    SELECT
+        na.id, na.guild_id, na.car_number, na.discord_user_id,
+        COALESCE(u.iracing_id, na.iracing_id) AS iracing_id,
+        na.discord_username,
+        COALESCE(u.iracing_name, na.iracing_name) AS iracing_name,
+        na.status, na.claimed_at, na.synced_with_iracing,
+        {verified} AS iracing_verified,
+        na.notes, na.hold_expires_at{extra_columns}
+    FROM number_assignments na
+    LEFT JOIN users u ON u.discord_user_id = na.discord_user_id
+"""
+
+# Versions 3-4 of the view counted any link as verified; from version 6 the users
+# row records whether its iRacing ID was actually verified
+LINKED_AS_VERIFIED = "CASE WHEN u.iracing_id IS NOT NULL THEN 1 ELSE na.iracing_verified END"
+USER_VERIFIED = "CASE WHEN u.iracing_verified = 1 THEN 1 ELSE na.iracing_verified END"
+
+# Schema migrations applied in order on startup, tracked with PRAGMA user_version
+MIGRATIONS = [
+    (1, [
+        # Temporary holds: status 'held' with an expiry time (UTC, SQLite timestamp format)
+        "ALTER TABLE number_assignments ADD COLUMN hold_expires_at TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_assignments_hold_expiry "
+        "ON number_assignments(hold_expires_at) WHERE status = 'held'",
+    ]),
+    (2, [
+        # Per-number FIFO waitlists; the id orders the queue
+        """
+        CREATE TABLE IF NOT EXISTS waitlist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            car_number INTEGER NOT NULL,
+            discord_user_id INTEGER NOT NULL,
+            discord_username TEXT,
+            joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, car_number, discord_user_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_waitlist_queue ON waitlist(guild_id, car_number, id)",
+    ]),
+    (3, [
+        # Global Discord -> iRacing identity shared by every guild
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            discord_user_id INTEGER PRIMARY KEY,
+            discord_username TEXT,
+            iracing_id INTEGER,
+            iracing_name TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # Backfill from existing claims with a verified iRacing ID, most recent first
+        """
+        INSERT OR IGNORE INTO users (discord_user_id, discord_username, iracing_id, iracing_name)
+        SELECT discord_user_id, discord_username, iracing_id, iracing_name
+        FROM number_assignments
+        WHERE discord_user_id IS NOT NULL AND iracing_id IS NOT NULL AND iracing_verified = 1
+        ORDER BY claimed_at DESC, id DESC
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_assignments_user ON number_assignments(discord_user_id)",
+        ASSIGNMENT_DETAILS_VIEW.format(verified=LINKED_AS_VERIFIED, extra_columns=""),
+    ]),
+    (4, [
+        # Per-class number pools (GT3, LMP2, ...) with their own range; the guild's
+        # min/max in guild_config stays the range of the main pool (car_class '')
+        """
+        CREATE TABLE IF NOT EXISTS number_pools (
+            guild_id INTEGER NOT NULL,
+            car_class TEXT NOT NULL,
+            min_number INTEGER NOT NULL,
+            max_number INTEGER NOT NULL,
+            iracing_class_id INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, car_class)
+        )
+        """,
+        # Numbers become unique per (guild, class). SQLite can't change a UNIQUE
+        # constraint in place, so the table is rebuilt and existing claims land in
+        # the main pool
+        "DROP VIEW IF EXISTS assignment_details",
+        """
+        CREATE TABLE number_assignments_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            car_class TEXT NOT NULL DEFAULT '',
+            car_number INTEGER NOT NULL,
+            discord_user_id INTEGER,
+            iracing_id INTEGER,
+            discord_username TEXT,
+            iracing_name TEXT,
+            status TEXT DEFAULT 'claimed',
+            claimed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            synced_with_iracing INTEGER DEFAULT 0,
+            iracing_verified INTEGER DEFAULT 0,
+            notes TEXT,
+            hold_expires_at TEXT,
+            UNIQUE(guild_id, car_class, car_number),
+            FOREIGN KEY (guild_id) REFERENCES guild_config(guild_id)
+        )
+        """,
+        """
+        INSERT INTO number_assignments_new
+        (id, guild_id, car_number, discord_user_id, iracing_id, discord_username, iracing_name,
+         status, claimed_at, synced_with_iracing, iracing_verified, notes, hold_expires_at)
+        SELECT id, guild_id, car_number, discord_user_id, iracing_id, discord_username, iracing_name,
+               status, claimed_at, synced_with_iracing, iracing_verified, notes, hold_expires_at
+        FROM number_assignments
+        """,
+        "DROP TABLE number_assignments",
+        "ALTER TABLE number_assignments_new RENAME TO number_assignments",
+        "CREATE INDEX IF NOT EXISTS idx_assignments_hold_expiry "
+        "ON number_assignments(hold_expires_at) WHERE status = 'held'",
+        "CREATE INDEX IF NOT EXISTS idx_assignments_user ON number_assignments(discord_user_id)",
+        ASSIGNMENT_DETAILS_VIEW.format(verified=LINKED_AS_VERIFIED, extra_columns=", na.car_class"),
+    ]),
+    (5, [
+        # Who held which number when: one row per tenure, open (ended_at NULL) while held.
+        # source is how it started (claim, hold, import, sync, waitlist), end_reason how it
+        # ended (release, force_release, expired)
+        """
+        CREATE TABLE IF NOT EXISTS number_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            car_class TEXT NOT NULL DEFAULT '',
+            car_number INTEGER NOT NULL,
+            discord_user_id INTEGER,
+            iracing_id INTEGER,
+            holder_name TEXT,
+            started_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            ended_at TEXT,
+            source TEXT NOT NULL,
+            end_reason TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_history_number ON number_history(guild_id, car_number, started_at)",
+        "CREATE INDEX IF NOT EXISTS idx_history_holder ON number_history(guild_id, discord_user_id, started_at)",
+        # Backfill an open tenure for every current assignment
+        """
+        INSERT INTO number_history
+        (guild_id, car_class, car_number, discord_user_id, iracing_id, holder_name, started_at, source)
+        SELECT guild_id, car_class, car_number, discord_user_id, iracing_id,
+               COALESCE(discord_username, iracing_name), COALESCE(claimed_at, CURRENT_TIMESTAMP),
+               CASE status WHEN 'synced' THEN 'sync' WHEN 'held' THEN 'hold' ELSE 'claim' END
+        FROM number_assignments
+        """,
+    ]),
+    (6, [
+        # Track verification on the identity itself, so a link only shows as verified
+        # when the iRacing ID was checked (by /link, or on a verified claim)
+        "ALTER TABLE users ADD COLUMN iracing_verified INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE users SET iracing_verified = 1
+        WHERE EXISTS (
+            SELECT 1 FROM number_assignments na
+            WHERE na.discord_user_id = users.discord_user_id
+              AND na.iracing_id = users.iracing_id
+              AND na.iracing_verified = 1
+        )
+        """,
+        "DROP VIEW IF EXISTS assignment_details",
+        ASSIGNMENT_DETAILS_VIEW.format(verified=USER_VERIFIED, extra_columns=", na.car_class"),
+    ]),
+    (7, [
+        # Waitlists per class pool, like the numbers they queue for. Existing entries
+        # are for the main pool; the table is rebuilt to widen the UNIQUE constraint
+        """
+        CREATE TABLE waitlist_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            car_class TEXT NOT NULL DEFAULT '',
+            car_number INTEGER NOT NULL,
+            discord_user_id INTEGER NOT NULL,
+            discord_username TEXT,
+            joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(guild_id, car_class, car_number, discord_user_id)
+        )
+        """,
+        """
+        INSERT INTO waitlist_new (id, guild_id, car_number, discord_user_id, discord_username, joined_at)
+        SELECT id, guild_id, car_number, discord_user_id, discord_username, joined_at FROM waitlist
+        """,
+        "DROP TABLE waitlist",
+        "ALTER TABLE waitlist_new RENAME TO waitlist",
+        "CREATE INDEX IF NOT EXISTS idx_waitlist_queue ON waitlist(guild_id, car_class, car_number, id)",
+    ]),
+]
+
+# Start a tenure, unless the number already has an open one (params from _open_history_params)
+OPEN_HISTORY_SQL = """
+    INSERT INTO number_history
+    (guild_id, car_class, car_number, discord_user_id, iracing_id, holder_name, source)
+    SELECT ?, ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (
+        SELECT 1 FROM number_history
+        WHERE guild_id = ? AND car_number = ? AND car_class = ? AND ended_at IS NULL
+    )
+"""
+
+# End a number's open tenure: (end_reason, guild_id, car_number, car_class)
+CLOSE_HISTORY_SQL = """
+    UPDATE number_history SET ended_at = CURRENT_TIMESTAMP, end_reason = ?
+    WHERE guild_id = ? AND car_number = ? AND car_class = ? AND ended_at IS NULL
+"""
+
+
+def _open_history_params(
+    guild_id: int,
+    car_class: str,
+    car_number: int,
+    discord_user_id: Optional[int],
+    iracing_id: Optional[int],
+    holder_name: Optional[str],
+    source: str
+) -> Tuple[Any, ...]:
+    return (
+        guild_id, car_class, car_number, discord_user_id, iracing_id, holder_name, source,
+        guild_id, car_number, car_class
+    )
+
+
+def _describe_number(car_number: int, car_class: str = DEFAULT_CLASS) -> str:
+    """'number 7' for the main pool, 'GT3 number 7' for a class pool (audit log wording)"""
+    return f"{car_class} number {car_number}" if car_class else f"number {car_number}"
+
+
+def _range_bounds(guild_id: int, car_class: str) -> Tuple[str, Tuple[Any, ...]]:
+    """SQL for 'min AND max' of a pool, for use after BETWEEN; NULL bounds for unknown classes"""
+    if car_class == DEFAULT_CLASS:
+        return (
+            "COALESCE((SELECT min_number FROM guild_config WHERE guild_id = ?), 0) AND "
+            "COALESCE((SELECT max_number FROM guild_config WHERE guild_id = ?), 999)",
+            (guild_id, guild_id)
+        )
+    return (
+        "(SELECT min_number FROM number_pools WHERE guild_id = ? AND car_class = ?) AND "
+        "(SELECT max_number FROM number_pools WHERE guild_id = ? AND car_class = ?)",
+        (guild_id, car_class, guild_id, car_class)
+    )
+
+
 class Database:
     def __init__(self, db_path: str = "iracing_numbers.db"):
         self.db_path = db_path
         self.db = None
+        self.occupancy = OccupancyIndex()
+        # One writer at a time on the shared connection, so transactions don't interleave
+        self._write_lock = asyncio.Lock()
+        # Per-guild data version, bumped by every committed write (used by the render cache)
+        self.versions: Dict[int, int] = {}
+        # Guild configs are read by nearly every command and only change through set_guild_config
+        self._configs: Dict[int, Optional[Dict[str, Any]]] = {}
+        # Named number pools per guild, by class; changed only through set/remove_number_pool
+        self._pools: Dict[int, Dict[str, Dict[str, Any]]] = {}
 
     async def initialize(self):
         """Initialize the database and create tables"""
         try:
             self.db = await aiosqlite.connect(self.db_path)
+            # WAL lets the sync worker process write while the bot reads
+            await self.db.execute("PRAGMA journal_mode=WAL")
+            await self.db.execute("PRAGMA busy_timeout=5000")
             await self._create_tables()
             logger.info("Database initialized successfully")
         except Exception as e:
@@ -74,54 +336,260 @@ class Database:
         """)
 
         await self.db.commit()
+        await self._migrate()
         logger.info("Database tables created/verified")
 
+    async def _migrate(self):
+        """Apply schema migrations newer than the database's user_version"""
+        async with self.db.execute("PRAGMA user_version") as cursor:
+            version = (await cursor.fetchone())[0]
+
+        for target, statements in MIGRATIONS:
+            if version >= target:
+                continue
+
+            async with self.transaction() as db:
+                # Another process (e.g. the sync worker) may have migrated since we looked
+                async with db.execute("PRAGMA user_version") as cursor:
+                    version = (await cursor.fetchone())[0]
+                if version >= target:
+                    continue
+
+                for statement in statements:
+                    await db.execute(statement)
+                await db.execute(f"PRAGMA user_version = {target}")
+
+            logger.info(f"Migrated database schema to version {target}")
+
+    @asynccontextmanager
+    async def transaction(self, guild_id: Optional[int] = None):
+        """Run statements in a single BEGIN IMMEDIATE transaction, committing on success"""
+        async with self._write_lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            except BaseException:
+                await self.db.rollback()
+                raise
+            else:
+                await self.db.commit()
+                if guild_id is not None:
+                    self.bump_version(guild_id)
+
+    def guild_version(self, guild_id: int) -> int:
+        """Current data version for a guild"""
+        return self.versions.get(guild_id, 0)
+
+    def bump_version(self, guild_id: int):
+        self.versions[guild_id] = self.versions.get(guild_id, 0) + 1
+
+    def invalidate_guild(self, guild_id: int):
+        """Forget cached state for a guild after it was changed outside this connection"""
+        self.occupancy.invalidate(guild_id)
+        self._configs.pop(guild_id, None)
+        self._pools.pop(guild_id, None)
+        self.bump_version(guild_id)
+
     # Guild Configuration Methods
     async def get_guild_config(self, guild_id: int) -> Optional[Dict[str, Any]]:
         """Get configuration for a guild"""
+        if guild_id in self._configs:
+            config = self._configs[guild_id]
+            return dict(config) if config else None
+
         async with self.db.execute(
             "SELECT * FROM guild_config WHERE guild_id = ?",
             (guild_id,)
         ) as cursor:
             row = await cursor.fetchone()
-            if row:
-                return dict(zip([d[0] for d in cursor.description], row))
-            return None
+            config = dict(zip([d[0] for d in cursor.description], row)) if row else None
+
+        self._configs[guild_id] = config
+        return dict(config) if config else None
 
     async def set_guild_config(self, guild_id: int, **kwargs):
         """Set or update guild configuration"""
         config = await self.get_guild_config(guild_id)
 
-        if config:
-            # Update existing config
-            set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
-            set_clause += ", updated_at = CURRENT_TIMESTAMP"
-            values = list(kwargs.values()) + [guild_id]
+        async with self.transaction(guild_id) as db:
+            if config:
+                # Update existing config
+                set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
+                set_clause += ", updated_at = CURRENT_TIMESTAMP"
+                values = list(kwargs.values()) + [guild_id]
 
-            await self.db.execute(
-                f"UPDATE guild_config SET {set_clause} WHERE guild_id = ?",
-                values
-            )
-        else:
-            # Insert new config
-            columns = ["guild_id"] + list(kwargs.keys())
-            placeholders = ", ".join(["?"] * len(columns))
-            values = [guild_id] + list(kwargs.values())
-
-            await self.db.execute(
-                f"INSERT INTO guild_config ({', '.join(columns)}) VALUES ({placeholders})",
-                values
-            )
+                await db.execute(
+                    f"UPDATE guild_config SET {set_clause} WHERE guild_id = ?",
+                    values
+                )
+            else:
+                # Insert new config
+                columns = ["guild_id"] + list(kwargs.keys())
+                placeholders = ", ".join(["?"] * len(columns))
+                values = [guild_id] + list(kwargs.values())
 
-        await self.db.commit()
+                await db.execute(
+                    f"INSERT INTO guild_config ({', '.join(columns)}) VALUES ({placeholders})",
+                    values
+                )
 
-    async def get_all_guild_configs(self) -> List[Dict[str, Any]]:
-        """Get all guild configurations"""
-        async with self.db.execute("SELECT * FROM guild_config") as cursor:
+        self._configs.pop(guild_id, None)
+        self.occupancy.invalidate(guild_id)
+
+    async def get_all_guild_configs(self, shards: Optional[ShardPlan] = None) -> List[Dict[str, Any]]:
+        """Get all guild configurations (only guilds on our shards, if a shard plan is given)"""
+        where, params = shards.sql_filter() if shards else ("1 = 1", [])
+        async with self.db.execute(f"SELECT * FROM guild_config WHERE {where}", params) as cursor:
             rows = await cursor.fetchall()
             return [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
 
+    # Number Pool Methods
+    async def get_number_pools(self, guild_id: int) -> Dict[str, Dict[str, Any]]:
+        """A guild's named number pools keyed by class (the main pool is not included)"""
+        if guild_id not in self._pools:
+            async with self.db.execute(
+                "SELECT * FROM number_pools WHERE guild_id = ? ORDER BY car_class",
+                (guild_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                columns = [d[0] for d in cursor.description]
+            self._pools[guild_id] = {row[columns.index('car_class')]: dict(zip(columns, row)) for row in rows}
+
+        return {name: dict(pool) for name, pool in self._pools[guild_id].items()}
+
+    async def get_number_range(self, guild_id: int, car_class: str = DEFAULT_CLASS) -> Optional[Tuple[int, int]]:
+        """(min, max) of a pool; the main pool uses the guild config. None for an unknown class"""
+        if car_class == DEFAULT_CLASS:
+            config = await self.get_guild_config(guild_id) or {}
+            return config.get('min_number', 0), config.get('max_number', 999)
+
+        pool = (await self.get_number_pools(guild_id)).get(car_class)
+        return (pool['min_number'], pool['max_number']) if pool else None
+
+    async def set_number_pool(
+        self,
+        guild_id: int,
+        car_class: str,
+        min_number: int,
+        max_number: int,
+        iracing_class_id: Optional[int] = None
+    ) -> str:
+        """Create or update a class pool; returns the normalized class name"""
+        car_class = normalize_class(car_class)
+        if not car_class:
+            raise ValueError("Class pools need a name; the main pool is set with /setup")
+
+        async with self.transaction(guild_id) as db:
+            await db.execute("""
+                INSERT INTO number_pools (guild_id, car_class, min_number, max_number, iracing_class_id)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, car_class) DO UPDATE SET
+                    min_number = excluded.min_number,
+                    max_number = excluded.max_number,
+                    iracing_class_id = excluded.iracing_class_id
+            """, (guild_id, car_class, min_number, max_number, iracing_class_id))
+
+        self._pools.pop(guild_id, None)
+        self.occupancy.invalidate(guild_id)
+        return car_class
+
+    async def remove_number_pool(self, guild_id: int, car_class: str) -> bool:
+        """Delete a class pool, but only while nobody holds a number in it"""
+        async with self.transaction(guild_id) as db:
+            cursor = await db.execute("""
+                DELETE FROM number_pools
+                WHERE guild_id = ? AND car_class = ? AND NOT EXISTS (
+                    SELECT 1 FROM number_assignments WHERE guild_id = ? AND car_class = ?
+                )
+            """, (guild_id, car_class, guild_id, car_class))
+            removed = cursor.rowcount > 0
+
+        if removed:
+            self._pools.pop(guild_id, None)
+            self.occupancy.invalidate(guild_id)
+        return removed
+
+    async def get_iracing_class_map(self, guild_id: int) -> Dict[int, str]:
+        """{iRacing car class ID: pool} for sync; read fresh since the sync worker has its own connection"""
+        async with self.db.execute(
+            "SELECT iracing_class_id, car_class FROM number_pools "
+            "WHERE guild_id = ? AND iracing_class_id IS NOT NULL",
+            (guild_id,)
+        ) as cursor:
+            return dict(await cursor.fetchall())
+
     # Number Assignment Methods
+    async def try_claim(
+        self,
+        guild_id: int,
+        car_number: int,
+        discord_user_id: int,
+        discord_username: str,
+        iracing_id: Optional[int] = None,
+        iracing_name: Optional[str] = None,
+        hold_expires_at: Optional[datetime] = None,
+        car_class: str = DEFAULT_CLASS
+    ) -> Dict[str, Any]:
+        """
+        Atomically claim a number: range check, insert and audit in one transaction.
+
+        With hold_expires_at (UTC) the number is only held until then instead of claimed.
+        car_class picks the number pool (the main pool by default).
+        Returns a dict with 'status' set to 'claimed' (with the new 'assignment'),
+        'taken' (with the current 'holder'), 'out_of_range' (with 'min_number'/'max_number')
+        or 'unknown_class'.
+        """
+        status = 'held' if hold_expires_at else 'claimed'
+        expires = hold_expires_at.strftime(SQLITE_TIMESTAMP) if hold_expires_at else None
+        bounds, bound_params = _range_bounds(guild_id, car_class)
+        described = _describe_number(car_number, car_class)
+
+        async with self.transaction(guild_id) as db:
+            async with db.execute(f"""
+                INSERT INTO number_assignments
+                (guild_id, car_class, car_number, discord_user_id, discord_username, iracing_id, iracing_name,
+                 status, hold_expires_at)
+                SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?
+                WHERE ? BETWEEN {bounds}
+                ON CONFLICT(guild_id, car_class, car_number) DO NOTHING
+                RETURNING *
+            """, (
+                guild_id, car_class, car_number, discord_user_id, discord_username, iracing_id, iracing_name,
+                status, expires, car_number
+            ) + bound_params) as cursor:
+                row = await cursor.fetchone()
+                assignment = dict(zip([d[0] for d in cursor.description], row)) if row else None
+
+            if assignment:
+                await db.execute(OPEN_HISTORY_SQL, _open_history_params(
+                    guild_id, car_class, car_number, discord_user_id, iracing_id, discord_username,
+                    'hold' if hold_expires_at else 'claim'
+                ))
+                if hold_expires_at:
+                    details = f"Held {described} until {expires} UTC"
+                    await self._insert_audit(db, guild_id, discord_user_id, "hold_number", details)
+                else:
+                    await self._insert_audit(db, guild_id, discord_user_id, "claim_number", f"Claimed {described}")
+
+        if assignment:
+            self.occupancy.claim(guild_id, car_number, discord_user_id, car_class)
+            return {'status': 'claimed', 'assignment': assignment}
+
+        # Nothing inserted: someone holds it, it is outside the pool's range or the pool doesn't exist
+        holder = await self.get_number_assignment(guild_id, car_number, car_class)
+        if holder:
+            return {'status': 'taken', 'holder': holder}
+
+        number_range = await self.get_number_range(guild_id, car_class)
+        if number_range is None:
+            return {'status': 'unknown_class'}
+
+        return {
+            'status': 'out_of_range',
+            'min_number': number_range[0],
+            'max_number': number_range[1]
+        }
+
     async def claim_number(
         self,
         guild_id: int,
@@ -133,22 +601,20 @@ class Database:
     ) -> bool:
         """Claim a car number for a user"""
         try:
-            await self.db.execute("""
-                INSERT INTO number_assignments
-                (guild_id, car_number, discord_user_id, discord_username, iracing_id, iracing_name, status)
-                VALUES (?, ?, ?, ?, ?, ?, 'claimed')
-            """, (guild_id, car_number, discord_user_id, discord_username, iracing_id, iracing_name))
-
-            await self.db.commit()
-
-            # Log the action
-            await self.log_action(
-                guild_id,
-                discord_user_id,
-                "claim_number",
-                f"Claimed number {car_number}"
-            )
+            async with self.transaction(guild_id) as db:
+                await db.execute("""
+                    INSERT INTO number_assignments
+                    (guild_id, car_number, discord_user_id, discord_username, iracing_id, iracing_name, status)
+                    VALUES (?, ?, ?, ?, ?, ?, 'claimed')
+                """, (guild_id, car_number, discord_user_id, discord_username, iracing_id, iracing_name))
+                await db.execute(OPEN_HISTORY_SQL, _open_history_params(
+                    guild_id, DEFAULT_CLASS, car_number, discord_user_id, iracing_id, discord_username, 'claim'
+                ))
+
+                # Log the action
+                await self._insert_audit(db, guild_id, discord_user_id, "claim_number", f"Claimed number {car_number}")
 
+            self.occupancy.claim(guild_id, car_number, discord_user_id)
             return True
         except aiosqlite.IntegrityError:
             # Number already claimed
@@ -157,34 +623,383 @@ class Database:
             logger.error(f"Error claiming number: {e}")
             return False
 
+    async def bulk_claim(self, guild_id: int, rows: List[Dict[str, Any]], actor_id: int) -> List[int]:
+        """
+        Insert many claims into the main pool in one transaction.
+
+        Each row needs car_number, discord_user_id and discord_username, and may carry
+        iracing_id/iracing_name. Numbers that are already taken are skipped; the numbers
+        that were actually inserted are returned.
+        """
+        if not rows:
+            return []
+
+        async with self.transaction(guild_id) as db:
+            await db.executemany("""
+                INSERT INTO number_assignments
+                (guild_id, car_number, discord_user_id, discord_username, iracing_id, iracing_name,
+                 status, iracing_verified)
+                VALUES (?, ?, ?, ?, ?, ?, 'claimed', ?)
+                ON CONFLICT(guild_id, car_class, car_number) DO NOTHING
+            """, [
+                (
+                    guild_id, row['car_number'], row['discord_user_id'], row['discord_username'],
+                    row.get('iracing_id'), row.get('iracing_name'), 1 if row.get('iracing_name') else 0
+                )
+                for row in rows
+            ])
+
+            # Work out which rows won, in case something was claimed since validation
+            numbers = [row['car_number'] for row in rows]
+            placeholders = ", ".join(["?"] * len(numbers))
+            async with db.execute(
+                f"SELECT car_number, discord_user_id FROM number_assignments "
+                f"WHERE guild_id = ? AND car_class = ? AND car_number IN ({placeholders})",
+                [guild_id, DEFAULT_CLASS] + numbers
+            ) as cursor:
+                holders = dict(await cursor.fetchall())
+
+            inserted = [row for row in rows if holders.get(row['car_number']) == row['discord_user_id']]
+
+            await db.executemany(OPEN_HISTORY_SQL, [
+                _open_history_params(
+                    guild_id, DEFAULT_CLASS, row['car_number'], row['discord_user_id'],
+                    row.get('iracing_id'), row['discord_username'], 'import'
+                )
+                for row in inserted
+            ])
+
+            await db.executemany("""
+                INSERT INTO audit_log (guild_id, user_id, action, details)
+                VALUES (?, ?, ?, ?)
+            """, [
+                (guild_id, actor_id, "import_number",
+                 f"Imported number {row['car_number']} for user {row['discord_user_id']}")
+                for row in inserted
+            ])
+
+        for row in inserted:
+            self.occupancy.claim(guild_id, row['car_number'], row['discord_user_id'])
+
+        return [row['car_number'] for row in inserted]
+
+    async def confirm_hold(
+        self,
+        guild_id: int,
+        car_number: int,
+        discord_user_id: int,
+        car_class: str = DEFAULT_CLASS,
+        now: Optional[datetime] = None
+    ) -> str:
+        """
+        Turn a user's hold into a permanent claim.
+
+        Returns 'confirmed', 'expired' (the hold lapsed but the scheduler hasn't
+        released it yet) or 'no_hold'.
+        """
+        cutoff = (now or datetime.utcnow()).strftime(SQLITE_TIMESTAMP)
+
+        async with self.transaction(guild_id) as db:
+            cursor = await db.execute("""
+                UPDATE number_assignments
+                SET status = 'claimed', hold_expires_at = NULL
+                WHERE guild_id = ? AND car_class = ? AND car_number = ? AND discord_user_id = ?
+                  AND status = 'held' AND hold_expires_at > ?
+            """, (guild_id, car_class, car_number, discord_user_id, cutoff))
+
+            if cursor.rowcount > 0:
+                await self._insert_audit(
+                    db, guild_id, discord_user_id, "confirm_hold",
+                    f"Confirmed hold on {_describe_number(car_number, car_class)}"
+                )
+                return 'confirmed'
+
+            async with db.execute("""
+                SELECT 1 FROM number_assignments
+                WHERE guild_id = ? AND car_class = ? AND car_number = ? AND discord_user_id = ? AND status = 'held'
+            """, (guild_id, car_class, car_number, discord_user_id)) as cursor:
+                return 'expired' if await cursor.fetchone() else 'no_hold'
+
+    async def get_active_holds(self, shards: Optional[ShardPlan] = None) -> List[Dict[str, Any]]:
+        """Get every hold across all guilds (or just the guilds on our shards)"""
+        where, params = shards.sql_filter() if shards else ("1 = 1", [])
+        async with self.db.execute(
+            f"SELECT guild_id, car_number, hold_expires_at FROM number_assignments WHERE status = 'held' AND {where}",
+            params
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
+
+    async def release_expired_holds(
+        self,
+        now: Optional[datetime] = None,
+        shards: Optional[ShardPlan] = None
+    ) -> List[Dict[str, Any]]:
+        """Release every hold that has lapsed, in one transaction, and return what was released"""
+        cutoff = (now or datetime.utcnow()).strftime(SQLITE_TIMESTAMP)
+        where, params = shards.sql_filter() if shards else ("1 = 1", [])
+
+        async with self.transaction() as db:
+            async with db.execute(f"""
+                DELETE FROM number_assignments
+                WHERE status = 'held' AND hold_expires_at <= ? AND {where}
+                RETURNING guild_id, car_class, car_number, discord_user_id
+            """, [cutoff] + params) as cursor:
+                rows = await cursor.fetchall()
+                released = [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
+
+            await db.executemany("""
+                INSERT INTO audit_log (guild_id, user_id, action, details)
+                VALUES (?, ?, ?, ?)
+            """, [
+                (hold['guild_id'], hold['discord_user_id'], "hold_expired",
+                 f"Hold on {_describe_number(hold['car_number'], hold['car_class'])} expired")
+                for hold in released
+            ])
+            await db.executemany(CLOSE_HISTORY_SQL, [
+                ('expired', hold['guild_id'], hold['car_number'], hold['car_class']) for hold in released
+            ])
+
+            for hold in released:
+                hold['handoff'] = await self._handoff_to_waitlist(
+                    db, hold['guild_id'], hold['car_number'], hold['car_class']
+                )
+
+        for hold in released:
+            self.occupancy.release(hold['guild_id'], hold['car_number'], hold['car_class'])
+            if hold['handoff']:
+                self.occupancy.claim(
+                    hold['guild_id'], hold['car_number'], hold['handoff']['discord_user_id'], hold['car_class']
+                )
+            self.bump_version(hold['guild_id'])
+
+        return released
+
     async def release_number(self, guild_id: int, car_number: int, user_id: int) -> bool:
         """Release a car number"""
+        released, _ = await self.release_number_with_handoff(guild_id, car_number, user_id)
+        return released
+
+    async def release_number_with_handoff(
+        self,
+        guild_id: int,
+        car_number: int,
+        user_id: int,
+        car_class: str = DEFAULT_CLASS,
+        reason: str = 'release'
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Release a car number and hand it to the head of its waitlist in the same transaction.
+
+        Returns (released, handoff) where handoff describes the new holder, if any.
+        reason is recorded as how the holder's tenure ended in the number history.
+        """
         try:
-            cursor = await self.db.execute("""
-                DELETE FROM number_assignments
-                WHERE guild_id = ? AND car_number = ? AND discord_user_id = ?
-            """, (guild_id, car_number, user_id))
+            handoff = None
+            async with self.transaction(guild_id) as db:
+                cursor = await db.execute("""
+                    DELETE FROM number_assignments
+                    WHERE guild_id = ? AND car_class = ? AND car_number = ? AND discord_user_id = ?
+                """, (guild_id, car_class, car_number, user_id))
 
-            await self.db.commit()
+                released = cursor.rowcount > 0
+                if released:
+                    await db.execute(CLOSE_HISTORY_SQL, (reason, guild_id, car_number, car_class))
+                    await self._insert_audit(
+                        db, guild_id, user_id, "release_number", f"Released {_describe_number(car_number, car_class)}"
+                    )
+                    handoff = await self._handoff_to_waitlist(db, guild_id, car_number, car_class)
 
-            if cursor.rowcount > 0:
-                await self.log_action(
-                    guild_id,
-                    user_id,
-                    "release_number",
-                    f"Released number {car_number}"
-                )
-                return True
-            return False
+            if released:
+                self.occupancy.release(guild_id, car_number, car_class)
+                if handoff:
+                    self.occupancy.claim(guild_id, car_number, handoff['discord_user_id'], car_class)
+            return released, handoff
         except Exception as e:
             logger.error(f"Error releasing number: {e}")
-            return False
+            return False, None
+
+    async def _handoff_to_waitlist(
+        self,
+        db,
+        guild_id: int,
+        car_number: int,
+        car_class: str = DEFAULT_CLASS
+    ) -> Optional[Dict[str, Any]]:
+        """Assign a just-released number to the first person waiting for it (inside a transaction)"""
+        async with db.execute("""
+            SELECT id, discord_user_id, discord_username FROM waitlist
+            WHERE guild_id = ? AND car_class = ? AND car_number = ?
+            ORDER BY id LIMIT 1
+        """, (guild_id, car_class, car_number)) as cursor:
+            row = await cursor.fetchone()
+
+        if not row:
+            return None
+
+        entry_id, discord_user_id, discord_username = row
+        await db.execute("DELETE FROM waitlist WHERE id = ?", (entry_id,))
+        await db.execute("""
+            INSERT INTO number_assignments
+            (guild_id, car_class, car_number, discord_user_id, discord_username, status)
+            VALUES (?, ?, ?, ?, ?, 'claimed')
+        """, (guild_id, car_class, car_number, discord_user_id, discord_username))
+        await db.execute(OPEN_HISTORY_SQL, _open_history_params(
+            guild_id, car_class, car_number, discord_user_id, None, discord_username, 'waitlist'
+        ))
+        await self._insert_audit(
+            db, guild_id, discord_user_id, "waitlist_handoff",
+            f"{_describe_number(car_number, car_class).capitalize()} handed to next on waitlist"
+        )
+
+        return {'guild_id': guild_id, 'car_class': car_class, 'car_number': car_number,
+                'discord_user_id': discord_user_id, 'discord_username': discord_username}
+
+    # User Identity Methods
+    async def link_user(
+        self,
+        discord_user_id: int,
+        discord_username: str,
+        iracing_id: int,
+        iracing_name: str
+    ) -> Dict[int, int]:
+        """
+        Link a Discord user to an iRacing account for every guild with a single upsert.
+        The caller has checked the iRacing ID, so the link is stored as verified.
+
+        Returns {guild_id: number of claims} for the guilds where the user holds numbers.
+        """
+        async with self.transaction() as db:
+            await db.execute("""
+                INSERT INTO users (discord_user_id, discord_username, iracing_id, iracing_name, iracing_verified)
+                VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT(discord_user_id) DO UPDATE SET
+                    discord_username = excluded.discord_username,
+                    iracing_id = excluded.iracing_id,
+                    iracing_name = excluded.iracing_name,
+                    iracing_verified = 1,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (discord_user_id, discord_username, iracing_id, iracing_name))
+
+        async with self.db.execute(
+            "SELECT guild_id, COUNT(*) FROM number_assignments WHERE discord_user_id = ? GROUP BY guild_id",
+            (discord_user_id,)
+        ) as cursor:
+            claims = dict(await cursor.fetchall())
+
+        # Every guild that shows this user's claims now renders differently
+        for guild_id in claims:
+            self.bump_version(guild_id)
+
+        return claims
+
+    async def get_user(self, discord_user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a user's linked identity"""
+        async with self.db.execute(
+            "SELECT * FROM users WHERE discord_user_id = ?",
+            (discord_user_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            if row:
+                return dict(zip([d[0] for d in cursor.description], row))
+            return None
+
+    # Waitlist Methods
+    async def join_waitlist(
+        self,
+        guild_id: int,
+        car_number: int,
+        discord_user_id: int,
+        discord_username: str,
+        car_class: str = DEFAULT_CLASS
+    ) -> Optional[int]:
+        """Add a user to a number's waitlist; returns their position, or None if already waiting"""
+        try:
+            async with self.transaction(guild_id) as db:
+                await db.execute("""
+                    INSERT INTO waitlist (guild_id, car_class, car_number, discord_user_id, discord_username)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (guild_id, car_class, car_number, discord_user_id, discord_username))
+        except aiosqlite.IntegrityError:
+            return None
+
+        return await self.get_waitlist_position(guild_id, car_number, discord_user_id, car_class)
+
+    async def leave_waitlist(
+        self,
+        guild_id: int,
+        car_number: int,
+        discord_user_id: int,
+        car_class: str = DEFAULT_CLASS
+    ) -> bool:
+        """Remove a user from a number's waitlist"""
+        async with self.transaction(guild_id) as db:
+            cursor = await db.execute(
+                "DELETE FROM waitlist WHERE guild_id = ? AND car_class = ? AND car_number = ? AND discord_user_id = ?",
+                (guild_id, car_class, car_number, discord_user_id)
+            )
+            return cursor.rowcount > 0
 
-    async def get_number_assignment(self, guild_id: int, car_number: int) -> Optional[Dict[str, Any]]:
-        """Get assignment information for a specific number"""
+    async def get_waitlist(
+        self,
+        guild_id: int,
+        car_number: int,
+        car_class: str = DEFAULT_CLASS
+    ) -> List[Dict[str, Any]]:
+        """Get a number's waitlist in queue order"""
+        async with self.db.execute(
+            "SELECT * FROM waitlist WHERE guild_id = ? AND car_class = ? AND car_number = ? ORDER BY id",
+            (guild_id, car_class, car_number)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
+
+    async def get_waitlist_position(
+        self,
+        guild_id: int,
+        car_number: int,
+        discord_user_id: int,
+        car_class: str = DEFAULT_CLASS
+    ) -> Optional[int]:
+        """1-based position of a user in a number's waitlist"""
+        async with self.db.execute("""
+            SELECT COUNT(*) FROM waitlist
+            WHERE guild_id = ? AND car_class = ? AND car_number = ? AND id <= (
+                SELECT id FROM waitlist
+                WHERE guild_id = ? AND car_class = ? AND car_number = ? AND discord_user_id = ?
+            )
+        """, (guild_id, car_class, car_number, guild_id, car_class, car_number, discord_user_id)) as cursor:
+            position = (await cursor.fetchone())[0]
+            return position or None
+
+    async def get_user_waitlists(self, guild_id: int, discord_user_id: int) -> List[Tuple[str, int, int]]:
+        """(car_class, car_number, position) of every number a user is waiting for, in one query"""
+        async with self.db.execute("""
+            SELECT car_class, car_number, position FROM (
+                SELECT w.car_class, w.car_number, w.discord_user_id,
+                       ROW_NUMBER() OVER (PARTITION BY w.car_class, w.car_number ORDER BY w.id) AS position
+                FROM waitlist w
+                WHERE w.guild_id = ? AND EXISTS (
+                    SELECT 1 FROM waitlist mine
+                    WHERE mine.guild_id = w.guild_id AND mine.car_class = w.car_class
+                      AND mine.car_number = w.car_number AND mine.discord_user_id = ?
+                )
+            )
+            WHERE discord_user_id = ?
+            ORDER BY car_class, car_number
+        """, (guild_id, discord_user_id, discord_user_id)) as cursor:
+            return [tuple(row) for row in await cursor.fetchall()]
+
+    async def get_number_assignment(
+        self,
+        guild_id: int,
+        car_number: int,
+        car_class: str = DEFAULT_CLASS
+    ) -> Optional[Dict[str, Any]]:
+        """Get assignment information for a specific number in a pool"""
         async with self.db.execute(
-            "SELECT * FROM number_assignments WHERE guild_id = ? AND car_number = ?",
-            (guild_id, car_number)
+            "SELECT * FROM assignment_details WHERE guild_id = ? AND car_class = ? AND car_number = ?",
+            (guild_id, car_class, car_number)
         ) as cursor:
             row = await cursor.fetchone()
             if row:
@@ -192,91 +1007,223 @@ class Database:
             return None
 
     async def get_user_numbers(self, guild_id: int, discord_user_id: int) -> List[Dict[str, Any]]:
-        """Get all numbers assigned to a user"""
+        """Get all numbers assigned to a user, in every pool"""
         async with self.db.execute(
-            "SELECT * FROM number_assignments WHERE guild_id = ? AND discord_user_id = ? ORDER BY car_number",
+            "SELECT * FROM assignment_details WHERE guild_id = ? AND discord_user_id = ? "
+            "ORDER BY car_class, car_number",
             (guild_id, discord_user_id)
         ) as cursor:
             rows = await cursor.fetchall()
             return [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
 
-    async def get_all_assignments(self, guild_id: int) -> List[Dict[str, Any]]:
-        """Get all number assignments for a guild"""
+    async def get_all_assignments(self, guild_id: int, car_class: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get all number assignments for a guild, or just one pool's"""
+        where, params = "guild_id = ?", [guild_id]
+        if car_class is not None:
+            where += " AND car_class = ?"
+            params.append(car_class)
+
         async with self.db.execute(
-            "SELECT * FROM number_assignments WHERE guild_id = ? ORDER BY car_number",
-            (guild_id,)
+            f"SELECT * FROM assignment_details WHERE {where} ORDER BY car_class, car_number",
+            params
         ) as cursor:
             rows = await cursor.fetchall()
             return [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
 
-    async def get_available_numbers(self, guild_id: int) -> List[int]:
-        """Get list of available numbers based on guild config"""
-        config = await self.get_guild_config(guild_id)
+    async def iter_assignments(self, guild_id: int, page_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a guild's assignments in (class, car number) order, reading one page at a time"""
+        last_class, last_number = DEFAULT_CLASS, -1
+
+        while True:
+            async with self.db.execute(
+                "SELECT * FROM assignment_details WHERE guild_id = ? AND (car_class, car_number) > (?, ?) "
+                "ORDER BY car_class, car_number LIMIT ?",
+                (guild_id, last_class, last_number, page_size)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                columns = [d[0] for d in cursor.description]
+
+            for row in rows:
+                yield dict(zip(columns, row))
+
+            if len(rows) < page_size:
+                return
+            last_class = rows[-1][columns.index('car_class')]
+            last_number = rows[-1][columns.index('car_number')]
+
+    async def get_occupancy(self, guild_id: int, car_class: str = DEFAULT_CLASS) -> Optional[GuildOccupancy]:
+        """
+        Get the in-memory occupancy index for a guild's pool, loading it on first use.
+
+        The main pool always exists (with a default range if the guild isn't configured);
+        returns None for a class pool that hasn't been set up.
+        """
+        occupancy = self.occupancy.get(guild_id, car_class)
+        if occupancy:
+            return occupancy
 
-        if not config:
-            # Default range if no config
-            min_num, max_num = 0, 999
-        else:
-            min_num = config.get('min_number', 0)
-            max_num = config.get('max_number', 999)
+        number_range = await self.get_number_range(guild_id, car_class)
+        if number_range is None:
+            return None
 
-        # Get all claimed numbers
         async with self.db.execute(
-            "SELECT car_number FROM number_assignments WHERE guild_id = ?",
-            (guild_id,)
+            "SELECT car_number, discord_user_id FROM number_assignments WHERE guild_id = ? AND car_class = ?",
+            (guild_id, car_class)
+        ) as cursor:
+            claims = await cursor.fetchall()
+
+        occupancy = GuildOccupancy(number_range[0], number_range[1], claims)
+        self.occupancy.set(guild_id, occupancy, car_class)
+        return occupancy
+
+    async def warm_caches(self, shards: Optional[ShardPlan] = None) -> int:
+        """
+        Load guild configs, class pools and occupancy for every configured guild (on our
+        shards) up front, using one query for all claims instead of one per guild.
+        Returns the number of guilds.
+        """
+        configs = await self.get_all_guild_configs(shards)
+        where, params = shards.sql_filter() if shards else ("1 = 1", [])
+
+        pools: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        async with self.db.execute(f"SELECT * FROM number_pools WHERE {where}", params) as cursor:
+            columns = [d[0] for d in cursor.description]
+            async for row in cursor:
+                pool = dict(zip(columns, row))
+                pools.setdefault(pool['guild_id'], {})[pool['car_class']] = pool
+
+        claims: Dict[Tuple[int, str], List[Tuple[int, Optional[int]]]] = {}
+        async with self.db.execute(
+            f"SELECT guild_id, car_class, car_number, discord_user_id FROM number_assignments WHERE {where}",
+            params
         ) as cursor:
-            claimed = [row[0] for row in await cursor.fetchall()]
+            async for guild_id, car_class, car_number, discord_user_id in cursor:
+                claims.setdefault((guild_id, car_class), []).append((car_number, discord_user_id))
+
+        for config in configs:
+            guild_id = config['guild_id']
+            self._configs[guild_id] = config
+            self._pools[guild_id] = pools.get(guild_id, {})
+            self.occupancy.set(guild_id, GuildOccupancy(
+                config.get('min_number', 0),
+                config.get('max_number', 999),
+                claims.get((guild_id, DEFAULT_CLASS), ())
+            ))
+            for car_class, pool in self._pools[guild_id].items():
+                self.occupancy.set(guild_id, GuildOccupancy(
+                    pool['min_number'],
+                    pool['max_number'],
+                    claims.get((guild_id, car_class), ())
+                ), car_class)
 
-        # Return available numbers
-        return [num for num in range(min_num, max_num + 1) if num not in claimed]
+        return len(configs)
+
+    async def get_available_numbers(self, guild_id: int, car_class: str = DEFAULT_CLASS) -> List[int]:
+        """Get list of available numbers in a pool's range (empty for an unknown class)"""
+        occupancy = await self.get_occupancy(guild_id, car_class)
+        return occupancy.free_numbers() if occupancy else []
 
     async def sync_iracing_assignment(
         self,
         guild_id: int,
         car_number: int,
         iracing_id: int,
-        iracing_data: Dict[str, Any]
+        iracing_data: Dict[str, Any],
+        car_class: str = DEFAULT_CLASS
     ):
-        """Sync an assignment from iRacing"""
+        """Sync an assignment from iRacing into a pool"""
         iracing_name = iracing_data.get('display_name', 'Unknown')
 
         try:
-            await self.db.execute("""
-                INSERT INTO number_assignments
-                (guild_id, car_number, iracing_id, iracing_name, status, synced_with_iracing, iracing_verified)
-                VALUES (?, ?, ?, ?, 'synced', 1, 1)
-                ON CONFLICT(guild_id, car_number) DO UPDATE SET
-                    iracing_id = excluded.iracing_id,
-                    iracing_name = excluded.iracing_name,
-                    synced_with_iracing = 1,
-                    iracing_verified = 1
-            """, (guild_id, car_number, iracing_id, iracing_name))
+            async with self.transaction(guild_id) as db:
+                await db.execute("""
+                    INSERT INTO number_assignments
+                    (guild_id, car_class, car_number, iracing_id, iracing_name, status,
+                     synced_with_iracing, iracing_verified)
+                    VALUES (?, ?, ?, ?, ?, 'synced', 1, 1)
+                    ON CONFLICT(guild_id, car_class, car_number) DO UPDATE SET
+                        iracing_id = excluded.iracing_id,
+                        iracing_name = excluded.iracing_name,
+                        synced_with_iracing = 1,
+                        iracing_verified = 1
+                """, (guild_id, car_class, car_number, iracing_id, iracing_name))
+                # A number that was already claimed in Discord keeps its open tenure
+                await db.execute(OPEN_HISTORY_SQL, _open_history_params(
+                    guild_id, car_class, car_number, None, iracing_id, iracing_name, 'sync'
+                ))
 
-            await self.db.commit()
+            occupancy = self.occupancy.get(guild_id, car_class)
+            if occupancy and car_number not in occupancy.claimed:
+                occupancy.claim(car_number)
         except Exception as e:
             logger.error(f"Error syncing iRacing assignment: {e}")
 
-    async def mark_synced(self, guild_id: int, car_number: int):
+    async def mark_synced(self, guild_id: int, car_number: int, car_class: str = DEFAULT_CLASS):
         """Mark a number as synced with iRacing"""
-        await self.db.execute("""
-            UPDATE number_assignments
-            SET synced_with_iracing = 1
-            WHERE guild_id = ? AND car_number = ?
-        """, (guild_id, car_number))
-        await self.db.commit()
+        async with self.transaction(guild_id) as db:
+            await db.execute("""
+                UPDATE number_assignments
+                SET synced_with_iracing = 1
+                WHERE guild_id = ? AND car_class = ? AND car_number = ?
+            """, (guild_id, car_class, car_number))
+
+    # Number History Methods
+    async def get_number_history(
+        self,
+        guild_id: int,
+        car_number: Optional[int] = None,
+        discord_user_id: Optional[int] = None,
+        car_class: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 25
+    ) -> List[Dict[str, Any]]:
+        """
+        Tenures of a number and/or a holder that overlap [since, until) (UTC), newest first.
+
+        Filtering by number or holder uses the (guild, number, start) and (guild, holder, start)
+        indexes, so the time window is a range scan rather than a full table scan.
+        """
+        where, params = ["guild_id = ?"], [guild_id]
+        if car_number is not None:
+            where.append("car_number = ?")
+            params.append(car_number)
+        if discord_user_id is not None:
+            where.append("discord_user_id = ?")
+            params.append(discord_user_id)
+        if car_class is not None:
+            where.append("car_class = ?")
+            params.append(car_class)
+        if until is not None:
+            where.append("started_at < ?")
+            params.append(until.strftime(SQLITE_TIMESTAMP))
+        if since is not None:
+            where.append("(ended_at IS NULL OR ended_at >= ?)")
+            params.append(since.strftime(SQLITE_TIMESTAMP))
+
+        async with self.db.execute(
+            f"SELECT * FROM number_history WHERE {' AND '.join(where)} ORDER BY started_at DESC, id DESC LIMIT ?",
+            params + [limit]
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
 
     # Audit Log Methods
     async def log_action(self, guild_id: int, user_id: int, action: str, details: str):
         """Log an action to the audit log"""
         try:
-            await self.db.execute("""
-                INSERT INTO audit_log (guild_id, user_id, action, details)
-                VALUES (?, ?, ?, ?)
-            """, (guild_id, user_id, action, details))
-            await self.db.commit()
+            async with self.transaction(guild_id) as db:
+                await self._insert_audit(db, guild_id, user_id, action, details)
         except Exception as e:
             logger.error(f"Error logging action: {e}")
 
+    async def _insert_audit(self, db, guild_id: int, user_id: int, action: str, details: str):
+        """Write an audit entry inside an already-open transaction"""
+        await db.execute("""
+            INSERT INTO audit_log (guild_id, user_id, action, details)
+            VALUES (?, ?, ?, ?)
+        """, (guild_id, user_id, action, details))
+
     async def get_audit_log(self, guild_id: int, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent audit log entries"""
         async with self.db.execute(
@@ -287,6 +1234,14 @@ class Database:
             return [dict(zip([d[0] for d in cursor.description], row)) for row in rows]
 
     async def close(self):
-        """Close the database connection"""
-        if self.db:
+        """Wait for any running transaction, checkpoint the WAL and close the connection"""
+        if not self.db:
+            return
+
+        async with self._write_lock:
+            try:
+                await self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as e:
+                logger.warning(f"WAL checkpoint failed on close: {e}")
             await self.db.close()
+            self.db = None
@@ -0,0 +1,34 @@
+"""
+Gateway settings for iRacing Number Bot
+Intents and cache policy, including a low-memory mode for large deployments
+"""
+
+import discord
+from typing import Dict, Any
+
+
+def gateway_options(low_memory: bool = False, message_cache_size: int = 0) -> Dict[str, Any]:
+    """
+    Client keyword arguments for the gateway connection.
+
+    The bot is slash-command only and reads user data from interactions, so
+    low-memory mode drops the privileged intents, never chunks guilds, keeps
+    no members beyond the bot itself and caches at most message_cache_size
+    messages (0 disables the message cache).
+    """
+    if not low_memory:
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.members = True
+        return {'intents': intents}
+
+    # Guild and channel events only; everything else arrives with the interaction
+    intents = discord.Intents.none()
+    intents.guilds = True
+
+    return {
+        'intents': intents,
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        'chunk_guilds_at_startup': False,
+        'max_messages': message_cache_size or None
+    }
@@ -0,0 +1,112 @@
+"""
+Hold expiry scheduler for iRacing Number Bot
+Releases lapsed number holds using a single timer for all guilds
+"""
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, List, Tuple, Callable, Awaitable, Dict, Any
+
+from database import Database, SQLITE_TIMESTAMP
+from sharding import ShardPlan
+
+logger = logging.getLogger('iRacingBot.Holds')
+
+RETRY_SECONDS = 60
+
+
+class HoldScheduler:
+    """
+    Min-heap of hold expiry times shared by every guild.
+
+    One background task sleeps until the earliest expiry, then releases all
+    lapsed holds in a single database transaction. The heap is rebuilt from
+    the database on start, so holds survive restarts. With a shard plan only
+    holds in guilds on this process's shards are tracked and released.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        on_expired: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+        shards: Optional[ShardPlan] = None
+    ):
+        self.db = db
+        self.shards = shards
+        self.on_expired = on_expired
+        self._heap: List[Tuple[datetime, int, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    async def start(self):
+        """Load outstanding holds from the database and start the timer"""
+        holds = await self.db.get_active_holds(self.shards)
+        self._heap = [
+            (datetime.strptime(hold['hold_expires_at'], SQLITE_TIMESTAMP), hold['guild_id'], hold['car_number'])
+            for hold in holds
+            if hold.get('hold_expires_at')
+        ]
+        heapq.heapify(self._heap)
+        logger.info(f"Loaded {len(self._heap)} pending hold(s)")
+
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    def schedule(self, guild_id: int, car_number: int, expires_at: datetime):
+        """Track a new hold (expires_at is UTC)"""
+        if self.shards and not self.shards.owns(guild_id):
+            return
+        heapq.heappush(self._heap, (expires_at, guild_id, car_number))
+        self._wakeup.set()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+
+            if self._heap:
+                delay = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+            else:
+                delay = None
+
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue  # A new hold may expire sooner; recompute
+                except asyncio.TimeoutError:
+                    pass
+
+            now = datetime.utcnow()
+            while self._heap and self._heap[0][0] <= now:
+                heapq.heappop(self._heap)
+
+            # Entries for confirmed or released holds are simply stale; the database decides
+            try:
+                released = await self.db.release_expired_holds(now, self.shards)
+            except Exception as e:
+                logger.error(f"Failed to release expired holds: {e}")
+                # Retry shortly; guild 0 / number 0 is just a timer entry
+                heapq.heappush(self._heap, (now + timedelta(seconds=RETRY_SECONDS), 0, 0))
+                continue
+
+            if released:
+                logger.info(f"Released {len(released)} expired hold(s)")
+                if self.on_expired:
+                    try:
+                        await self.on_expired(released)
+                    except Exception as e:
+                        logger.error(f"Error handling expired holds: {e}")
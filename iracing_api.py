@@ -7,7 +7,8 @@ import aiohttp
 import hashlib
 import base64
 import logging
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime, timedelta
 
 logger = logging.getLogger('iRacingBot.API')
@@ -22,6 +23,12 @@ class iRacingAPI:
         self.authenticated = False
         self.auth_token = None
         self.auth_expires = None
+        # Called with (endpoint, status, seconds) after every HTTP request, e.g. for metrics
+        self.request_observer: Optional[Callable[[str, Any, float], None]] = None
+
+    def _observe(self, endpoint: str, status, started: float):
+        if self.request_observer:
+            self.request_observer(endpoint, status, time.perf_counter() - started)
 
     async def authenticate(self) -> bool:
         """Authenticate with iRacing"""
@@ -38,6 +45,7 @@ class iRacingAPI:
             encoded_password = base64.b64encode(password_hash).decode()
 
             # Authenticate
+            started = time.perf_counter()
             async with self.session.post(
                 f"{self.BASE_URL}/auth",
                 json={
@@ -45,6 +53,7 @@ class iRacingAPI:
                     "password": encoded_password
                 }
             ) as response:
+                self._observe("/auth", response.status, started)
                 if response.status == 200:
                     self.authenticated = True
                     self.auth_expires = datetime.now() + timedelta(hours=1)
@@ -63,17 +72,21 @@ class iRacingAPI:
         if not await self.authenticate():
             return None
 
+        started = time.perf_counter()
         try:
             url = f"{self.BASE_URL}{endpoint}"
             async with self.session.get(url, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
+                    self._observe(endpoint, response.status, started)
                     return data
                 else:
+                    self._observe(endpoint, response.status, started)
                     logger.error(f"API request failed: {response.status} - {endpoint}")
                     return None
 
         except Exception as e:
+            self._observe(endpoint, "error", started)
             logger.error(f"Error making API request to {endpoint}: {e}")
             return None
 
@@ -85,6 +98,24 @@ class iRacingAPI:
             return data['members'][0]
         return None
 
+    async def get_members_info(self, customer_ids: List[int], batch_size: int = 50) -> Dict[int, Dict[str, Any]]:
+        """Get information about many iRacing members, batching the lookups"""
+        members = {}
+        unique_ids = list(dict.fromkeys(customer_ids))
+
+        for i in range(0, len(unique_ids), batch_size):
+            batch = unique_ids[i:i + batch_size]
+            data = await self._make_request(
+                f"/data/member/get",
+                params={"cust_ids": ",".join(str(cid) for cid in batch)}
+            )
+
+            if data and 'members' in data:
+                for member in data['members']:
+                    members[member.get('cust_id')] = member
+
+        return members
+
     async def search_member(self, search_term: str) -> List[Dict[str, Any]]:
         """Search for iRacing members by name"""
         data = await self._make_request(
@@ -143,6 +174,8 @@ class iRacingAPI:
                     'cust_id': standing.get('cust_id'),
                     'display_name': standing.get('display_name'),
                     'car_number': standing.get('car_number', 0),
+                    # Standings are per car class in multi-class leagues
+                    'car_class_id': standing.get('car_class_id', roster_data.get('car_class_id')),
                     'helmet': standing.get('helmet', {}),
                 }
                 roster.append(member_info)
@@ -0,0 +1,117 @@
+"""
+Logging setup for iRacing Number Bot
+Log records are queued and written by a background thread, so the event loop never waits on disk
+"""
+
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+SLOW_LOGGER = 'iRacingBot.Slow'
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    """Compress the rotated file (runs on the listener thread)"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class _LoggerFilter(logging.Filter):
+    """Pass (or, with exclude, drop) records from one logger and its children"""
+
+    def __init__(self, name: str, exclude: bool = False):
+        super().__init__(name)
+        self.exclude = exclude
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        matched = super().filter(record)
+        return not matched if self.exclude else matched
+
+
+def _file_handler(config, filename: str) -> logging.Handler:
+    """Size-based rotation by default, or time-based when LOG_ROTATE_WHEN is set (e.g. 'midnight')"""
+    backups = config.get_int('LOG_BACKUP_COUNT', 5)
+    when = config.get('LOG_ROTATE_WHEN')
+
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename, when=when, backupCount=backups, encoding='utf-8', utc=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=config.get_int('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=backups, encoding='utf-8'
+        )
+
+    if config.get_bool('LOG_COMPRESS', True):
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def _apply_levels(config):
+    """LOG_LEVEL for everything, LOG_LEVELS like 'iRacingBot.Database=DEBUG,discord=WARNING' per module"""
+    level = config.get('LOG_LEVEL', 'INFO')
+    try:
+        logging.getLogger().setLevel(level.upper())
+    except ValueError:
+        logging.getLogger().setLevel(logging.INFO)
+        logging.getLogger('iRacingBot').warning(f"Invalid LOG_LEVEL {level!r}, using INFO")
+
+    for entry in (config.get('LOG_LEVELS') or '').split(','):
+        if '=' not in entry:
+            continue
+        name, level = entry.split('=', 1)
+        try:
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+        except ValueError:
+            logging.getLogger('iRacingBot').warning(f"Ignoring invalid log level in LOG_LEVELS: {entry}")
+
+
+def setup_logging(
+    config,
+    log_file: str = 'bot.log',
+    slow_log_file: Optional[str] = 'slow_commands.log'
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a QueueHandler to a listener thread that writes the
+    console, the rotating log file and the slow command log.
+
+    Replaces any handlers already on the root logger (including ones inherited by a
+    forked worker process). Stop the returned listener on exit to flush the queue.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    console = logging.StreamHandler()
+    file_handler = _file_handler(config, log_file)
+    handlers = [console, file_handler]
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.addFilter(_LoggerFilter(SLOW_LOGGER, exclude=True))
+
+    if slow_log_file:
+        slow_handler = _file_handler(config, slow_log_file)
+        slow_handler.addFilter(_LoggerFilter(SLOW_LOGGER))
+        handlers.append(slow_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _apply_levels(config)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
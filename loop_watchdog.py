@@ -0,0 +1,128 @@
+"""
+Event loop watchdog for iRacing Number Bot
+Measures event loop lag and captures the stack of whatever is blocking the loop
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any
+
+logger = logging.getLogger('iRacingBot.Watchdog')
+
+STACK_DEPTH = 15
+
+
+class LoopWatchdog:
+    """
+    A heartbeat task on the event loop plus a monitor thread.
+
+    The heartbeat wakes every `interval` seconds and records how late it woke
+    up (the loop lag). If the monitor thread sees no heartbeat for longer than
+    `threshold`, the loop is blocked by synchronous code, so it grabs the loop
+    thread's current stack and logs it once per stall.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        interval: float = 0.1,
+        history: int = 6000,
+        histogram=None
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.histogram = histogram
+        self.samples: deque = deque(maxlen=history)
+        self.stalls: deque = deque(maxlen=20)
+        self._last_beat = time.monotonic()
+        self._stalled = False
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start watching the running event loop"""
+        if self._task:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name='iRacingLoopWatchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+
+            self._last_beat = time.monotonic()
+            self.samples.append(lag)
+            if self.histogram:
+                self.histogram.observe(lag)
+
+            if self._stalled:
+                # The monitor saw this stall start; now we know how long it really was
+                self._stalled = False
+                if self.stalls:
+                    self.stalls[-1]['duration'] = lag
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._last_beat - self.interval
+            if blocked < self.threshold or self._stalled:
+                continue
+
+            self._stalled = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.extract_stack(frame)[-STACK_DEPTH:] if frame else []
+            self.stalls.append({
+                'at': datetime.utcnow(),
+                'duration': blocked,
+                'location': f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}" if stack else "unknown",
+            })
+            logger.warning(
+                f"Event loop blocked for over {blocked * 1000:.0f}ms, current stack:\n"
+                + "".join(traceback.format_list(stack))
+            )
+
+    def percentiles(self) -> Dict[str, float]:
+        """Lag percentiles over the recent samples, in seconds"""
+        if not self.samples:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {
+            'p50': ordered[int(last * 0.50)],
+            'p95': ordered[int(last * 0.95)],
+            'p99': ordered[int(last * 0.99)],
+            'max': ordered[-1],
+        }
+
+    def recent_stalls(self, limit: int = 5) -> List[Dict[str, Any]]:
+        return list(self.stalls)[-limit:][::-1]
@@ -0,0 +1,249 @@
+"""
+Metrics for iRacing Number Bot
+Counters, gauges and histograms served over HTTP in the Prometheus text format
+"""
+
+import functools
+import inspect
+import logging
+import time
+from typing import Optional, Dict, Tuple, List, Callable, Iterable
+
+from aiohttp import web
+
+logger = logging.getLogger('iRacingBot.Metrics')
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers fast cache hits up to slow iRacing calls and syncs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _Value(Metric):
+    """A value per label set, updated directly or read from a callback at scrape time"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        callback: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        if self.callback:
+            try:
+                return [f"{self.name} {self.callback()}"]
+            except Exception as e:
+                logger.warning(f"Metric callback for {self.name} failed: {e}")
+                return []
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in self._values.items()]
+
+
+class Counter(_Value):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Value):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self._sums[key] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ['+Inf'], counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {self._sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = (), callback=None) -> Counter:
+        return self.register(Counter(name, documentation, labels, callback))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+def instrument_methods(obj, histogram: Histogram, label: str = 'method'):
+    """Time every public coroutine method of an object into a histogram, labelled by method name"""
+    for name, method in inspect.getmembers(obj, inspect.iscoroutinefunction):
+        if name.startswith('_'):
+            continue
+
+        def wrap(method, name):
+            @functools.wraps(method)
+            async def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started, **{label: name})
+            return timed
+
+        setattr(obj, name, wrap(method, name))
+
+
+class BotMetrics:
+    """Every metric the bot exports, plus the HTTP endpoint that serves them"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.registry = registry = MetricsRegistry()
+
+        self.command_latency = registry.histogram(
+            'irbot_command_duration_seconds', 'Slash command handling time', ['command'])
+        self.command_errors = registry.counter(
+            'irbot_command_errors_total', 'Slash commands that raised an error', ['command', 'error'])
+        self.db_latency = registry.histogram(
+            'irbot_db_query_duration_seconds', 'Database method latency', ['method'])
+        self.iracing_latency = registry.histogram(
+            'irbot_iracing_request_duration_seconds', 'iRacing API request latency', ['endpoint', 'status'])
+        self.sync_duration = registry.histogram(
+            'irbot_sync_duration_seconds', 'iRacing sync pass duration', ['result'])
+        # Unlabeled: a guild_id label would add a series for every guild the bot ever syncs
+        self.sync_last_duration = registry.gauge(
+            'irbot_sync_last_duration_seconds', 'Duration of the latest sync pass')
+        self.boot_phase = registry.gauge(
+            'irbot_boot_phase_seconds', 'Duration of each startup phase in the last boot', ['phase'])
+        self.loop_lag = registry.histogram(
+            'irbot_event_loop_lag_seconds', 'Event loop scheduling delay',
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+        registry.counter('irbot_render_cache_hits_total', 'Rendered embed cache hits',
+                         callback=lambda: bot.render_cache.hits)
+        registry.counter('irbot_render_cache_misses_total', 'Rendered embed cache misses',
+                         callback=lambda: bot.render_cache.misses)
+        registry.gauge('irbot_announcement_queue_depth', 'Announcements waiting to be posted',
+                       callback=lambda: bot.announcer.queue_depth)
+        registry.counter('irbot_announcement_messages_total', 'Batched announcement messages posted',
+                         callback=lambda: bot.announcer.messages_sent)
+        registry.counter('irbot_announcement_events_total', 'Claim and release events announced',
+                         callback=lambda: bot.announcer.events_sent)
+        registry.gauge('irbot_pending_holds', 'Number holds waiting to expire',
+                       callback=lambda: bot.holds.pending)
+        registry.gauge('irbot_guilds', 'Guilds this process is connected to',
+                       callback=lambda: len(bot.guilds))
+
+        self._runner = None
+
+    def observe_iracing_request(self, endpoint: str, status, seconds: float):
+        self.iracing_latency.observe(seconds, endpoint=endpoint, status=status)
+
+    def observe_sync(self, success: bool, seconds: float):
+        self.sync_duration.observe(seconds, result='success' if success else 'failure')
+        self.sync_last_duration.set(seconds)
+
+    def observe_boot(self, timings: Dict[str, float]):
+        """Record the boot pipeline's phase timings (milliseconds)"""
+        for phase, ms in timings.items():
+            self.boot_phase.set(ms / 1000, phase=phase)
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self, host: str = '127.0.0.1', port: int = 9108):
+        """Serve /metrics (loop lag samples come from the bot's LoopWatchdog)"""
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,201 @@
+"""
+Occupancy index for iRacing Number Bot
+In-memory view of which numbers are taken in each guild, used for fast lookups
+"""
+
+import heapq
+import itertools
+import re
+from typing import Optional, List, Dict, Set, Iterable, Tuple
+
+# Digit patterns for pattern search: '?' is one digit, '*' is any number of digits
+PATTERN_CHARS = set("0123456789?*")
+
+# The guild's main number pool; named pools (e.g. 'GT3') have their own range and claims
+DEFAULT_CLASS = ''
+
+
+def normalize_class(car_class: Optional[str]) -> str:
+    """Canonical pool name: 'gt3 ' and 'GT3' are the same class, None is the main pool"""
+    return (car_class or '').strip().upper()
+
+
+def number_label(car_number: int, car_class: str = DEFAULT_CLASS) -> str:
+    """'#7' in the main pool, 'GT3 #7' in a class pool"""
+    return f"{car_class} #{car_number}" if car_class else f"#{car_number}"
+
+
+class GuildOccupancy:
+    """Claimed numbers and their holders for a single guild's number pool"""
+
+    def __init__(self, min_number: int, max_number: int, claims: Iterable[Tuple[int, Optional[int]]] = ()):
+        self.min_number = min_number
+        self.max_number = max_number
+        self.claimed: Dict[int, Optional[int]] = {}
+        self.by_user: Dict[int, Set[int]] = {}
+        # Bitset of free numbers: bit n is set when number n is in range and unclaimed
+        self.free_mask = ((1 << (max_number + 1)) - 1) ^ ((1 << min_number) - 1)
+        # Kept in step with free_mask so counting free numbers doesn't scan the range
+        self._free = max(0, max_number - min_number + 1)
+
+        for car_number, discord_user_id in claims:
+            self.claim(car_number, discord_user_id)
+
+    def in_range(self, number: int) -> bool:
+        return self.min_number <= number <= self.max_number
+
+    def is_free(self, number: int) -> bool:
+        return self.in_range(number) and number not in self.claimed
+
+    def claim(self, number: int, discord_user_id: Optional[int] = None):
+        """Record a number as taken"""
+        self.release(number)
+        self.claimed[number] = discord_user_id
+        if self.in_range(number):
+            self.free_mask &= ~(1 << number)
+            self._free -= 1
+        if discord_user_id:
+            self.by_user.setdefault(discord_user_id, set()).add(number)
+
+    def release(self, number: int):
+        """Record a number as free again"""
+        if number not in self.claimed:
+            return
+
+        holder = self.claimed.pop(number)
+        if self.in_range(number):
+            self.free_mask |= 1 << number
+            self._free += 1
+        if holder and holder in self.by_user:
+            self.by_user[holder].discard(number)
+            if not self.by_user[holder]:
+                del self.by_user[holder]
+
+    def free_count(self) -> int:
+        return self._free
+
+    def free_numbers(self) -> List[int]:
+        """All free numbers in the guild's range, in order"""
+        return [n for n in range(self.min_number, self.max_number + 1) if (self.free_mask >> n) & 1]
+
+    def free_near(self, target: int, limit: int = 25) -> List[int]:
+        """Free numbers closest to target, nearest first (ties go to the lower number)"""
+        target = min(max(target, self.min_number), self.max_number)
+        below = self.free_mask & ((1 << (target + 1)) - 1)
+        above = self.free_mask >> (target + 1)
+        result = []
+
+        next_below = below.bit_length() - 1 if below else None
+        next_above = target + 1 + ((above & -above).bit_length() - 1) if above else None
+
+        while len(result) < limit and (next_below is not None or next_above is not None):
+            if next_above is None or (next_below is not None and target - next_below <= next_above - target):
+                result.append(next_below)
+                below ^= 1 << next_below
+                next_below = below.bit_length() - 1 if below else None
+            else:
+                result.append(next_above)
+                above ^= 1 << (next_above - target - 1)
+                next_above = target + 1 + ((above & -above).bit_length() - 1) if above else None
+
+        return result
+
+    def free_matching(self, pattern: str, limit: int = 25) -> List[int]:
+        """Free numbers whose digits match a pattern like '7?', '*3' or '1*1', smallest first"""
+        if not pattern or not set(pattern) <= PATTERN_CHARS:
+            raise ValueError("Patterns may only contain digits, '?' and '*'")
+
+        # '**' matches the same numbers as '*', and each '*' multiplies the work
+        pattern = re.sub(r"\*+", "*", pattern)
+        max_digits = len(str(self.max_number))
+        fixed = len(pattern.replace("*", ""))
+        stars = pattern.count("*")
+        if fixed > max_digits or stars > max_digits:
+            raise ValueError(f"Patterns can't be longer than the largest number ({max_digits} digits)")
+        result = []
+
+        # Candidates are generated in ascending order (shorter numbers first, and each
+        # length merged across the ways '*' can expand), so we can stop at the limit
+        for length in range(max(fixed, 1), max_digits + 1):
+            streams = []
+            for split in _star_splits(length - fixed, stars):
+                expanded = pattern
+                for run in split:
+                    expanded = expanded.replace("*", "?" * run, 1)
+                streams.append(_expand_wildcards(expanded))
+
+            last = None
+            for number in heapq.merge(*streams):
+                if number == last:
+                    continue
+                last = number
+
+                if number > self.max_number:
+                    break
+                if number >= self.min_number and (self.free_mask >> number) & 1:
+                    result.append(number)
+                    if len(result) >= limit:
+                        return result
+
+        return result
+
+    def user_numbers(self, discord_user_id: int) -> List[int]:
+        return sorted(self.by_user.get(discord_user_id, ()))
+
+    def claimed_numbers(self) -> List[int]:
+        return sorted(self.claimed)
+
+
+def _star_splits(total: int, stars: int) -> Iterable[Tuple[int, ...]]:
+    """Ways to share `total` extra digits between `stars` wildcards"""
+    if stars == 0:
+        return [()] if total == 0 else []
+    if stars == 1:
+        return [(total,)]
+    return [
+        (first,) + rest
+        for first in range(total + 1)
+        for rest in _star_splits(total - first, stars - 1)
+    ]
+
+
+def _expand_wildcards(pattern: str) -> Iterable[int]:
+    """Every number spelled by a pattern of digits and '?' (no leading zeros)"""
+    choices = ["0123456789" if ch == "?" else ch for ch in pattern]
+    for digits in itertools.product(*choices):
+        if len(digits) > 1 and digits[0] == "0":
+            continue
+        yield int("".join(digits))
+
+
+class OccupancyIndex:
+    """Per-guild, per-class occupancy cache, kept current by the database's write methods"""
+
+    def __init__(self):
+        self._guilds: Dict[int, Dict[str, GuildOccupancy]] = {}
+
+    def get(self, guild_id: int, car_class: str = DEFAULT_CLASS) -> Optional[GuildOccupancy]:
+        return self._guilds.get(guild_id, {}).get(car_class)
+
+    def set(self, guild_id: int, occupancy: GuildOccupancy, car_class: str = DEFAULT_CLASS):
+        self._guilds.setdefault(guild_id, {})[car_class] = occupancy
+
+    def claim(
+        self,
+        guild_id: int,
+        number: int,
+        discord_user_id: Optional[int] = None,
+        car_class: str = DEFAULT_CLASS
+    ):
+        occupancy = self.get(guild_id, car_class)
+        if occupancy:
+            occupancy.claim(number, discord_user_id)
+
+    def release(self, guild_id: int, number: int, car_class: str = DEFAULT_CLASS):
+        occupancy = self.get(guild_id, car_class)
+        if occupancy:
+            occupancy.release(number)
+
+    def invalidate(self, guild_id: int):
+        """Drop a guild (every class) so it is reloaded from the database on next use"""
+        self._guilds.pop(guild_id, None)
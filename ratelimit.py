@@ -0,0 +1,164 @@
+"""
+Rate limiting for iRacing Number Bot
+Token buckets per (guild, user, command class) applied to slash commands with a decorator
+"""
+
+import math
+import time
+import logging
+from discord import app_commands
+from typing import Optional, Dict, Tuple
+
+logger = logging.getLogger('iRacingBot.RateLimit')
+
+# (capacity, period in seconds) per command class: per user, and shared by the whole guild
+DEFAULT_USER_LIMITS = {
+    'claim': (5, 30.0),
+    'lookup': (10, 30.0),
+    'export': (2, 60.0),
+    'sync': (2, 300.0),
+    'admin': (10, 60.0),
+}
+
+DEFAULT_GUILD_LIMITS = {
+    'claim': (60, 60.0),
+    'lookup': (120, 60.0),
+    'export': (10, 60.0),
+    'sync': (5, 300.0),
+    'admin': (60, 60.0),
+}
+
+PRUNE_INTERVAL = 300.0
+
+
+class RateLimited(app_commands.CheckFailure):
+    """Raised from a command check when the caller is over their limit"""
+
+    def __init__(self, command_class: str, retry_after: float, guild_wide: bool = False):
+        self.command_class = command_class
+        self.retry_after = retry_after
+        self.guild_wide = guild_wide
+        super().__init__(f"Rate limited on {command_class}, retry in {retry_after:.1f}s")
+
+
+class TokenBucket:
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: int, period: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """In-memory token buckets; idle (fully refilled) buckets are pruned periodically"""
+
+    def __init__(
+        self,
+        user_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        guild_limits: Optional[Dict[str, Tuple[int, float]]] = None
+    ):
+        self.user_limits = dict(DEFAULT_USER_LIMITS, **(user_limits or {}))
+        self.guild_limits = dict(DEFAULT_GUILD_LIMITS, **(guild_limits or {}))
+        self._buckets: Dict[Tuple[Optional[int], Optional[int], str], TokenBucket] = {}
+        self._last_prune = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config) -> "RateLimiter":
+        """Read RATE_LIMIT_<CLASS> and RATE_LIMIT_GUILD_<CLASS> settings like '5/30'"""
+        user_limits, guild_limits = {}, {}
+
+        for command_class in DEFAULT_USER_LIMITS:
+            for prefix, limits in (('RATE_LIMIT_', user_limits), ('RATE_LIMIT_GUILD_', guild_limits)):
+                value = config.get(f"{prefix}{command_class.upper()}")
+                if not value:
+                    continue
+                try:
+                    capacity, period = value.split('/', 1)
+                    capacity, period = int(capacity), float(period)
+                    # A zero capacity or period would divide by zero in the bucket
+                    if capacity <= 0 or not (0 < period < math.inf):
+                        raise ValueError(value)
+                    limits[command_class] = (capacity, period)
+                except ValueError:
+                    logger.warning(
+                        f"Ignoring invalid {prefix}{command_class.upper()} value: {value} "
+                        f"(expected '<capacity>/<seconds>', both positive)"
+                    )
+
+        return cls(user_limits, guild_limits)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _bucket(self, key, limit: Tuple[int, float], now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(limit[0], limit[1], now)
+        return bucket
+
+    def hit(self, guild_id: Optional[int], user_id: int, command_class: str) -> Optional[RateLimited]:
+        """Spend a token for this caller; returns a RateLimited error instead if over the limit"""
+        now = time.monotonic()
+        if now - self._last_prune > PRUNE_INTERVAL:
+            self.prune(now)
+
+        user_bucket = self._bucket(
+            (guild_id, user_id, command_class),
+            self.user_limits.get(command_class, DEFAULT_USER_LIMITS['lookup']),
+            now
+        )
+        guild_bucket = self._bucket(
+            (guild_id, None, command_class),
+            self.guild_limits.get(command_class, DEFAULT_GUILD_LIMITS['lookup']),
+            now
+        )
+
+        wait = user_bucket.retry_after(now)
+        if wait:
+            return RateLimited(command_class, wait)
+
+        wait = guild_bucket.retry_after(now)
+        if wait:
+            return RateLimited(command_class, wait, guild_wide=True)
+
+        user_bucket.take()
+        guild_bucket.take()
+        return None
+
+    def prune(self, now: Optional[float] = None):
+        """Drop buckets that have refilled completely; they'd be recreated identically"""
+        now = now if now is not None else time.monotonic()
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if not bucket.is_full(now)}
+        self._last_prune = now
+
+
+def rate_limited(command_class: str):
+    """Command check that applies the bot's RateLimiter to a slash command"""
+    async def predicate(interaction) -> bool:
+        limiter = getattr(interaction.client, 'rate_limiter', None)
+        if limiter is None:
+            return True
+
+        error = limiter.hit(interaction.guild_id, interaction.user.id, command_class)
+        if error:
+            raise error
+        return True
+
+    return app_commands.check(predicate)
@@ -0,0 +1,58 @@
+"""
+Render cache for iRacing Number Bot
+Keeps rendered embed payloads keyed by guild data version so repeat views skip the database
+"""
+
+import discord
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable
+
+logger = logging.getLogger('iRacingBot.RenderCache')
+
+CacheKey = Tuple[int, str, tuple, int]
+
+
+class RenderCache:
+    """Size-bounded LRU cache of embed payloads keyed by (guild, command, args, version)"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        payload = self._entries.get(key)
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, key: CacheKey, payload: Dict[str, Any]):
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_embed(
+        self,
+        key: CacheKey,
+        build: Callable[[], Awaitable[Optional[discord.Embed]]]
+    ) -> Optional[discord.Embed]:
+        """Return the cached embed for key, building and caching it on a miss"""
+        payload = self.get(key)
+        if payload is not None:
+            return discord.Embed.from_dict(payload)
+
+        embed = await build()
+        if embed is not None:
+            self.put(key, embed.to_dict())
+        return embed
@@ -0,0 +1,105 @@
+"""
+Roster exporter for iRacing Number Bot
+Streams assignments to CSV or JSON Lines without holding the whole roster in memory
+"""
+
+import codecs
+import csv
+import gzip
+import io
+import json
+import tempfile
+from typing import AsyncIterator, Dict, Any, Tuple, IO
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+CSV_HEADER = ["Car Class", "Car Number", "Discord User", "iRacing ID", "iRacing Name", "Status", "Claimed Date"]
+
+# Exports stay in memory up to this size, then spill to a temporary file
+DEFAULT_SPILL_THRESHOLD = 5 * 1024 * 1024
+
+
+class _SpillingBuffer:
+    """
+    Binary sink that starts in memory and moves to a temporary file past a threshold.
+
+    SpooledTemporaryFile would do this, but before Python 3.11 it is not an
+    io.IOBase, which discord.File and TextIOWrapper both require.
+    """
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.file: IO[bytes] = io.BytesIO()
+        self.spilled = False
+
+    def write(self, data: bytes) -> int:
+        written = self.file.write(data)
+        if not self.spilled and self.file.tell() > self.threshold:
+            spill = tempfile.TemporaryFile()
+            spill.write(self.file.getvalue())
+            self.file.close()
+            self.file = spill
+            self.spilled = True
+        return written
+
+    def flush(self):
+        self.file.flush()
+
+
+def _export_record(assignment: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'car_class': assignment.get('car_class') or '',
+        'car_number': assignment['car_number'],
+        'discord_user': assignment.get('discord_username') or '',
+        'iracing_id': assignment.get('iracing_id') or '',
+        'iracing_name': assignment.get('iracing_name') or '',
+        'status': 'Synced' if assignment.get('synced_with_iracing') else 'Pending',
+        'claimed_date': (assignment.get('claimed_at') or '')[:10]
+    }
+
+
+async def export_roster(
+    assignments: AsyncIterator[Dict[str, Any]],
+    fmt: str = 'csv',
+    compress: bool = False,
+    spill_threshold: int = DEFAULT_SPILL_THRESHOLD
+) -> Tuple[IO[bytes], int]:
+    """
+    Write assignments as they are read into memory, spilling to a temporary file
+    once the export grows past spill_threshold bytes.
+
+    Returns the file (rewound to the start) and the number of rows written.
+    The caller owns the file and must close it.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    spool = _SpillingBuffer(spill_threshold)
+    raw = gzip.GzipFile(fileobj=spool, mode='wb') if compress else spool
+    text = codecs.getwriter('utf-8')(raw)
+
+    count = 0
+    try:
+        if fmt == 'csv':
+            writer = csv.writer(text)
+            writer.writerow(CSV_HEADER)
+            async for assignment in assignments:
+                writer.writerow(_export_record(assignment).values())
+                count += 1
+        else:
+            async for assignment in assignments:
+                text.write(json.dumps(_export_record(assignment)) + "\n")
+                count += 1
+
+        if compress:
+            raw.close()
+    except BaseException:
+        spool.file.close()
+        raise
+
+    spool.file.seek(0)
+    return spool.file, count
+
+
+def export_filename(base: str, fmt: str, compress: bool) -> str:
+    return f"{base}.{fmt}" + (".gz" if compress else "")
@@ -0,0 +1,81 @@
+"""
+Shard ownership for iRacing Number Bot
+Decides which guilds this process is responsible for when the bot runs as several processes
+"""
+
+import logging
+from typing import Optional, List, Tuple, Any
+
+logger = logging.getLogger('iRacingBot.Sharding')
+
+
+def parse_shard_ids(value: Optional[str]) -> Optional[List[int]]:
+    """Parse SHARD_IDS like '0,1,2' or '0-3' (ranges and lists can be mixed)"""
+    if not value or not value.strip():
+        return None
+
+    shard_ids = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            shard_ids.update(range(int(start), int(end) + 1))
+        else:
+            shard_ids.add(int(part))
+
+    return sorted(shard_ids)
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Discord's shard formula: (guild_id >> 22) % shard_count"""
+    return (guild_id >> 22) % shard_count
+
+
+class ShardPlan:
+    """
+    The shards this process connects to, out of shard_count in total.
+
+    With no shard_count (a single unsharded process, or Discord's recommended
+    count with every shard in this process) the plan owns every guild.
+    """
+
+    def __init__(self, shard_count: Optional[int] = None, shard_ids: Optional[List[int]] = None):
+        if shard_ids and not shard_count:
+            raise ValueError("SHARD_IDS requires SHARD_COUNT")
+        if shard_ids and any(not 0 <= shard_id < shard_count for shard_id in shard_ids):
+            raise ValueError(f"SHARD_IDS must be between 0 and {shard_count - 1}")
+
+        self.shard_count = shard_count
+        self.shard_ids = sorted(shard_ids) if shard_ids else None
+
+    @classmethod
+    def from_config(cls, config) -> "ShardPlan":
+        shard_count = config.get_int('SHARD_COUNT', 0) or None
+        shard_ids = parse_shard_ids(config.get('SHARD_IDS'))
+        return cls(shard_count, shard_ids)
+
+    @property
+    def partitioned(self) -> bool:
+        """True when other processes own some of the shards"""
+        return bool(self.shard_ids) and len(self.shard_ids) < self.shard_count
+
+    def owns(self, guild_id: int) -> bool:
+        if not self.partitioned:
+            return True
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    def sql_filter(self, column: str = 'guild_id') -> Tuple[str, List[Any]]:
+        """WHERE-clause fragment (and parameters) matching guilds on our shards"""
+        if not self.partitioned:
+            return "1 = 1", []
+        placeholders = ", ".join("?" * len(self.shard_ids))
+        return f"(({column} >> 22) % ?) IN ({placeholders})", [self.shard_count] + self.shard_ids
+
+    def describe(self) -> str:
+        if not self.shard_count:
+            return "automatic sharding (all shards)"
+        if not self.shard_ids:
+            return f"all {self.shard_count} shard(s)"
+        return f"shard(s) {', '.join(map(str, self.shard_ids))} of {self.shard_count}"
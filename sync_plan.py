@@ -0,0 +1,139 @@
+"""
+Sync planning for iRacing Number Bot
+Diffs the Discord roster against an iRacing league roster without writing anything
+"""
+
+import csv
+import io
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+from occupancy import DEFAULT_CLASS
+
+
+@dataclass
+class SyncPlan:
+    """What a sync would do for one guild"""
+    to_add: List[Dict[str, Any]] = field(default_factory=list)
+    matched: List[Dict[str, Any]] = field(default_factory=list)
+    conflicts: List[Dict[str, Any]] = field(default_factory=list)
+    missing: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_csv(self) -> str:
+        """Render the plan as a CSV report"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["Category", "Car Class", "Car Number", "iRacing ID", "iRacing Name", "Discord User", "Details"])
+
+        for entry in self.to_add:
+            writer.writerow([
+                "add", entry['car_class'], entry['car_number'], entry['iracing_id'], entry['iracing_name'], "", ""
+            ])
+
+        for entry in self.conflicts:
+            writer.writerow([
+                "conflict", entry['car_class'], entry['car_number'], entry['iracing_id'], entry['iracing_name'],
+                entry['discord_username'], entry['reason']
+            ])
+
+        for entry in self.missing:
+            writer.writerow([
+                "missing", entry['car_class'], entry['car_number'], entry['iracing_id'] or "",
+                entry['iracing_name'] or "", entry['discord_username'], entry['reason']
+            ])
+
+        for entry in self.matched:
+            writer.writerow([
+                "matched", entry['car_class'], entry['car_number'], entry['iracing_id'], entry['iracing_name'],
+                entry['discord_username'], ""
+            ])
+
+        return output.getvalue()
+
+
+def build_sync_plan(
+    assignments: List[Dict[str, Any]],
+    roster: List[Dict[str, Any]],
+    class_map: Optional[Dict[int, str]] = None
+) -> SyncPlan:
+    """
+    Compare Discord assignments with an iRacing roster in a single pass.
+
+    class_map maps iRacing car class IDs to the guild's number pools; drivers in
+    unmapped classes go to the main pool. Assignments are indexed by (class, car number)
+    once, so each roster entry is an O(1) lookup instead of a database query per number.
+    """
+    plan = SyncPlan()
+    class_map = class_map or {}
+    by_number = {(a.get('car_class') or DEFAULT_CLASS, a['car_number']): a for a in assignments}
+    roster_numbers = set()
+    roster_drivers = set()
+
+    for member in roster:
+        customer_id = member.get('cust_id')
+        car_number = member.get('car_number')
+
+        if not customer_id:
+            continue
+        roster_drivers.add(customer_id)
+
+        if not car_number:
+            continue
+        car_class = class_map.get(member.get('car_class_id'), DEFAULT_CLASS)
+        roster_numbers.add((car_class, car_number))
+
+        iracing_name = member.get('display_name', 'Unknown')
+        existing = by_number.get((car_class, car_number))
+
+        if not existing:
+            plan.to_add.append({
+                'car_class': car_class,
+                'car_number': car_number,
+                'iracing_id': customer_id,
+                'iracing_name': iracing_name,
+                'member': member
+            })
+        elif existing.get('iracing_id') == customer_id:
+            plan.matched.append({
+                'car_class': car_class,
+                'car_number': car_number,
+                'iracing_id': customer_id,
+                'iracing_name': iracing_name,
+                'discord_username': existing.get('discord_username') or ''
+            })
+        else:
+            if existing.get('iracing_id'):
+                reason = f"Claimed for iRacing ID {existing['iracing_id']}"
+            else:
+                reason = "Discord claim is not linked to an iRacing account"
+
+            plan.conflicts.append({
+                'car_class': car_class,
+                'car_number': car_number,
+                'iracing_id': customer_id,
+                'iracing_name': iracing_name,
+                'discord_username': existing.get('discord_username') or 'Unknown',
+                'reason': reason
+            })
+
+    # Discord claims that iRacing doesn't know about yet
+    for assignment in assignments:
+        car_class = assignment.get('car_class') or DEFAULT_CLASS
+        if not assignment.get('discord_user_id') or (car_class, assignment['car_number']) in roster_numbers:
+            continue
+
+        iracing_id = assignment.get('iracing_id')
+        if iracing_id and iracing_id not in roster_drivers:
+            reason = "Driver is not in the iRacing league"
+        else:
+            reason = "Number not assigned in iRacing"
+
+        plan.missing.append({
+            'car_class': car_class,
+            'car_number': assignment['car_number'],
+            'iracing_id': iracing_id,
+            'iracing_name': assignment.get('iracing_name'),
+            'discord_username': assignment.get('discord_username') or 'Unknown',
+            'reason': reason
+        })
+
+    return plan
@@ -0,0 +1,404 @@
+"""
+Sync worker for iRacing Number Bot
+Runs iRacing syncs in a separate process so the Discord gateway stays responsive
+"""
+
+import asyncio
+import json
+import logging
+from typing import Optional, Dict, Any, Set, Tuple
+
+from config import Config
+from database import Database
+from logging_config import setup_logging
+from iracing_api import iRacingAPI
+from sync_plan import SyncPlan, build_sync_plan
+
+logger = logging.getLogger('iRacingBot.SyncWorker')
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def _error_result(job_id: Any, error: str) -> Dict[str, Any]:
+    """Result frame for a job that failed or never ran, so the bot isn't left waiting"""
+    return {'type': 'result', 'id': job_id, 'success': False, 'synced': 0, 'error': error}
+
+
+async def perform_sync(db: Database, iracing: iRacingAPI, guild_id: int, league_id: int) -> Dict[str, Any]:
+    """Sync car numbers from iRacing into the database for one guild"""
+    try:
+        # Authenticate with iRacing
+        if not await iracing.authenticate():
+            logger.error("Failed to authenticate with iRacing")
+            return {'success': False, 'synced': 0, 'error': 'authentication failed'}
+
+        # Get league roster from iRacing
+        roster = await iracing.get_league_roster(league_id)
+
+        if not roster:
+            logger.warning(f"No roster data found for league {league_id}")
+            return {'success': False, 'synced': 0, 'error': 'no roster data'}
+
+        # Diff against the current roster in one pass, then add the free numbers
+        assignments = await db.get_all_assignments(guild_id)
+        plan = build_sync_plan(assignments, roster, await db.get_iracing_class_map(guild_id))
+
+        sync_count = 0
+        for entry in plan.to_add:
+            await db.sync_iracing_assignment(
+                guild_id=guild_id,
+                car_number=entry['car_number'],
+                iracing_id=entry['iracing_id'],
+                iracing_data=entry['member'],
+                car_class=entry['car_class']
+            )
+            sync_count += 1
+
+        if plan.conflicts:
+            logger.info(f"Skipped {len(plan.conflicts)} conflicting number(s) for guild {guild_id}")
+
+        logger.info(f"Synced {sync_count} assignments from iRacing for guild {guild_id}")
+        return {'success': True, 'synced': sync_count, 'error': None}
+
+    except Exception as e:
+        logger.error(f"Error syncing with iRacing: {e}")
+        return {'success': False, 'synced': 0, 'error': str(e)}
+
+
+async def preview_sync(db: Database, iracing: iRacingAPI, guild_id: int, league_id: int) -> Optional[SyncPlan]:
+    """Work out what a sync would change without writing anything"""
+    if not await iracing.authenticate():
+        logger.error("Failed to authenticate with iRacing")
+        return None
+
+    roster = await iracing.get_league_roster(league_id)
+
+    if not roster:
+        logger.warning(f"No roster data found for league {league_id}")
+        return None
+
+    assignments = await db.get_all_assignments(guild_id)
+    return build_sync_plan(assignments, roster, await db.get_iracing_class_map(guild_id))
+
+
+class SyncWorkerServer:
+    """Worker side: owns the iRacing client and processes sync jobs one at a time"""
+
+    def __init__(
+        self,
+        db: Database,
+        iracing: iRacingAPI,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        token: Optional[str] = None
+    ):
+        self.db = db
+        self.iracing = iracing
+        self.host = host
+        self.port = port
+        self.token = token
+        self.jobs: asyncio.Queue = asyncio.Queue()
+        self.server = None
+        # Jobs are keyed by (connection, job id); ids are only unique per connection
+        self._queued: Set[Tuple[asyncio.StreamWriter, Any]] = set()
+        self._cancelled: Set[Tuple[asyncio.StreamWriter, Any]] = set()
+        self._running: Optional[Tuple[asyncio.StreamWriter, Any, asyncio.Task]] = None
+
+    async def serve_forever(self):
+        """Start listening for the bot and run jobs until cancelled"""
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Sync worker listening on {self.host}:{self.port}")
+
+        consumer = asyncio.create_task(self._consume_jobs())
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            consumer.cancel()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Read job requests from a connected bot process"""
+        peer = writer.get_extra_info('peername')
+
+        try:
+            hello = json.loads(await reader.readline() or b'{}')
+            if hello.get('type') != 'hello' or (self.token and hello.get('token') != self.token):
+                logger.warning(f"Rejected sync worker connection from {peer}")
+                return
+
+            await self._send(writer, {'type': 'welcome'})
+            logger.info(f"Bot connected to sync worker from {peer}")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Malformed job from {peer}")
+                    await self._send(writer, _error_result(None, 'malformed job'))
+                    continue
+
+                kind = message.get('type')
+                if kind == 'sync':
+                    try:
+                        int(message['guild_id']), int(message['league_id'])
+                    except (KeyError, TypeError, ValueError):
+                        logger.warning(f"Invalid sync job from {peer}: {message}")
+                        await self._send(writer, _error_result(message.get('id'), 'invalid sync job'))
+                        continue
+
+                    self._queued.add((writer, message.get('id')))
+                    await self.jobs.put((message, writer))
+                elif kind == 'cancel':
+                    self._cancel(writer, message.get('id'))
+                else:
+                    await self._send(writer, _error_result(message.get('id'), f"unknown message type: {kind}"))
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # Nobody is waiting for this connection's jobs any more
+            for key in [key for key in self._queued if key[0] is writer]:
+                self._cancelled.add(key)
+            if self._running and self._running[0] is writer:
+                self._running[2].cancel()
+
+            writer.close()
+            logger.info(f"Bot disconnected from sync worker ({peer})")
+
+    def _cancel(self, writer: asyncio.StreamWriter, job_id: Any):
+        """Cancel a queued or running job; the consumer replies with a 'cancelled' result"""
+        key = (writer, job_id)
+        if key in self._queued:
+            self._cancelled.add(key)
+        elif self._running and self._running[:2] == key:
+            self._running[2].cancel()
+
+    async def _consume_jobs(self):
+        """Run queued sync jobs sequentially and report the results back"""
+        while True:
+            message, writer = await self.jobs.get()
+            job_id = message.get('id')
+            key = (writer, job_id)
+            self._queued.discard(key)
+            task = None
+
+            try:
+                if key in self._cancelled:
+                    self._cancelled.discard(key)
+                    result = _error_result(job_id, 'cancelled')
+                else:
+                    task = asyncio.create_task(perform_sync(
+                        self.db,
+                        self.iracing,
+                        int(message['guild_id']),
+                        int(message['league_id'])
+                    ))
+                    self._running = (writer, job_id, task)
+                    await asyncio.wait({task})
+
+                    if task.cancelled():
+                        logger.info(f"Cancelled sync job {job_id} for guild {message['guild_id']}")
+                        result = _error_result(job_id, 'cancelled')
+                    else:
+                        result = task.result()
+                        result.update({'type': 'result', 'id': job_id})
+            except Exception as e:
+                logger.error(f"Sync worker job failed: {e}")
+                result = _error_result(job_id, str(e))
+            finally:
+                self._running = None
+                if task and not task.done():
+                    task.cancel()
+                self.jobs.task_done()
+
+            if not writer.is_closing():
+                try:
+                    await self._send(writer, result)
+                except ConnectionError:
+                    pass
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, payload: Dict[str, Any]):
+        writer.write(json.dumps(payload).encode() + b'\n')
+        await writer.drain()
+
+
+class SyncWorkerClient:
+    """Bot side: submits sync jobs to the worker process and awaits the results"""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        token: Optional[str] = None,
+        timeout: float = 600,
+        cancel_timeout: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self.cancel_timeout = cancel_timeout
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self, retries: int = 5, delay: float = 1.0):
+        """Connect to the worker, retrying while a freshly spawned worker starts up"""
+        async with self._connect_lock:
+            if self.connected:
+                return
+
+            last_error = None
+            for _ in range(retries):
+                try:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                    writer.write(json.dumps({'type': 'hello', 'token': self.token}).encode() + b'\n')
+                    await writer.drain()
+
+                    welcome = json.loads(await reader.readline() or b'{}')
+                    if welcome.get('type') != 'welcome':
+                        writer.close()
+                        raise ConnectionError("Sync worker rejected the connection")
+
+                    self._reader, self._writer = reader, writer
+                    self._read_task = asyncio.create_task(self._read_results())
+                    logger.info(f"Connected to sync worker at {self.host}:{self.port}")
+                    return
+                except (OSError, json.JSONDecodeError) as e:
+                    last_error = e
+                    await asyncio.sleep(delay)
+
+            raise ConnectionError(f"Could not connect to sync worker: {last_error}")
+
+    async def submit(self, guild_id: int, league_id: int) -> Dict[str, Any]:
+        """
+        Queue a sync job on the worker and wait for its result.
+
+        On timeout the job is cancelled on the worker before asyncio.TimeoutError is
+        raised, so the caller can safely sync in-process instead. If the worker doesn't
+        confirm the cancellation, RuntimeError is raised: the job may still be writing.
+        """
+        if not self.connected:
+            await self.connect()
+
+        self._next_id += 1
+        job_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[job_id] = future
+
+        try:
+            self._writer.write(json.dumps({
+                'type': 'sync',
+                'id': job_id,
+                'guild_id': guild_id,
+                'league_id': league_id
+            }).encode() + b'\n')
+            await self._writer.drain()
+
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                await self._cancel(job_id, future)
+                raise
+        finally:
+            self._pending.pop(job_id, None)
+
+    async def _cancel(self, job_id: int, future: asyncio.Future):
+        """Ask the worker to cancel a job and wait until it confirms or the connection drops"""
+        try:
+            if not self.connected:
+                raise ConnectionError("Sync worker connection closed")
+            self._writer.write(json.dumps({'type': 'cancel', 'id': job_id}).encode() + b'\n')
+            await self._writer.drain()
+            await asyncio.wait_for(future, timeout=self.cancel_timeout)
+        except ConnectionError:
+            # The worker drops a connection's jobs when it goes away
+            pass
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Sync worker did not cancel job {job_id}") from None
+
+    async def _read_results(self):
+        """Resolve pending jobs as results arrive from the worker"""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+
+                message = json.loads(line)
+                future = self._pending.get(message.get('id'))
+                if future and not future.done():
+                    future.set_result(message)
+                elif message.get('error'):
+                    logger.warning(f"Sync worker error: {message['error']}")
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.error(f"Lost connection to sync worker: {e}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Sync worker connection closed"))
+            if self._writer:
+                self._writer.close()
+            self._writer = None
+
+    async def close(self):
+        """Close the connection to the worker"""
+        if self._read_task:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+
+async def _run_worker(host: str, port: int, token: Optional[str], db_path: str,
+                      username: Optional[str], password: Optional[str]):
+    db = Database(db_path)
+    await db.initialize()
+    iracing = iRacingAPI(username=username, password=password)
+
+    try:
+        await SyncWorkerServer(db, iracing, host, port, token).serve_forever()
+    finally:
+        await iracing.close()
+        await db.close()
+
+
+def run_worker(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, token: Optional[str] = None,
+               db_path: str = "iracing_numbers.db", username: Optional[str] = None,
+               password: Optional[str] = None):
+    """Process entry point for the sync worker"""
+    # A forked worker inherits the bot's queue handler but not its listener thread,
+    # so it sets up its own, writing to a separate file
+    log_listener = setup_logging(Config(), log_file='sync_worker.log', slow_log_file=None)
+
+    try:
+        asyncio.run(_run_worker(host, port, token, db_path, username, password))
+    except KeyboardInterrupt:
+        logger.info("Sync worker stopped")
+    finally:
+        log_listener.stop()
+
+
+if __name__ == "__main__":
+    config = Config()
+    run_worker(
+        host=config.get('SYNC_WORKER_HOST', DEFAULT_HOST),
+        port=config.get_int('SYNC_WORKER_PORT', DEFAULT_PORT),
+        token=config.get('SYNC_WORKER_TOKEN'),
+        username=config.get('IRACING_USERNAME'),
+        password=config.get('IRACING_PASSWORD')
+    )
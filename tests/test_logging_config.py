@@ -0,0 +1,42 @@
+"""
+Logging setup from configuration
+"""
+
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from logging_config import setup_logging
+
+
+class FakeConfig:
+    def __init__(self, **values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_int(self, key, default=0):
+        return int(self.values.get(key, default))
+
+    def get_bool(self, key, default=False):
+        return self.values.get(key, default)
+
+
+def test_invalid_log_level_falls_back_to_info(tmp_path):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+
+    listener = setup_logging(FakeConfig(LOG_LEVEL='LOUD'), log_file=str(tmp_path / 'bot.log'), slow_log_file=None)
+    try:
+        assert root.level == logging.INFO
+    finally:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    assert "Invalid LOG_LEVEL 'LOUD', using INFO" in (tmp_path / 'bot.log').read_text()
@@ -0,0 +1,99 @@
+"""
+Schema migrations when the bot and the sync worker start against the same file
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import sys
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import Database, MIGRATIONS
+
+
+def _initialize(db_path, barrier, errors):
+    class RacingDatabase(Database):
+        """Wait for the other process before the first migration, so both see the old version"""
+        waited = False
+
+        @asynccontextmanager
+        async def transaction(self, guild_id=None):
+            if not self.waited:
+                self.waited = True
+                barrier.wait(timeout=30)
+            async with super().transaction(guild_id) as db:
+                yield db
+
+    async def run():
+        db = RacingDatabase(db_path)
+        try:
+            await db.initialize()
+        finally:
+            await db.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        errors.put(repr(e))
+
+
+def test_two_processes_migrate_the_same_database(tmp_path):
+    db_path = str(tmp_path / "shared.db")
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(2)
+    errors = ctx.Queue()
+
+    processes = [ctx.Process(target=_initialize, args=(db_path, barrier, errors)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+
+    assert [p.exitcode for p in processes] == [0, 0]
+    assert errors.empty(), errors.get()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == MIGRATIONS[-1][0]
+
+
+def test_only_verified_ids_count_as_verified_links(tmp_path, monkeypatch):
+    import database
+    db_path = str(tmp_path / "identity.db")
+
+    async def run():
+        # A database from before the users table, with one verified and one unverified claim
+        monkeypatch.setattr(database, "MIGRATIONS", MIGRATIONS[:2])
+        db = Database(db_path)
+        await db.initialize()
+        await db.db.executemany("""
+            INSERT INTO number_assignments
+            (guild_id, car_number, discord_user_id, discord_username, iracing_id, iracing_verified)
+            VALUES (1, ?, ?, ?, ?, ?)
+        """, [(7, 10, 'verified', 1001, 1), (8, 20, 'typed', 2002, 0)])
+        await db.db.commit()
+        await db.close()
+
+        monkeypatch.setattr(database, "MIGRATIONS", MIGRATIONS)
+        db = Database(db_path)
+        await db.initialize()
+        try:
+            verified = await db.get_user(10)
+            assert verified['iracing_id'] == 1001 and verified['iracing_verified'] == 1
+            assert await db.get_user(20) is None
+
+            async with db.db.execute(
+                "SELECT car_number, iracing_verified FROM assignment_details ORDER BY car_number"
+            ) as cursor:
+                assert await cursor.fetchall() == [(7, 1), (8, 0)]
+
+            await db.link_user(20, 'typed', 2002, 'Typed Driver')
+            async with db.db.execute(
+                "SELECT iracing_verified FROM assignment_details WHERE car_number = 8"
+            ) as cursor:
+                assert (await cursor.fetchone())[0] == 1
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+"""
+Pattern search in the occupancy index
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from occupancy import GuildOccupancy
+
+
+def test_free_matching_patterns():
+    occupancy = GuildOccupancy(1, 999, [(13, 1), (101, 2)])
+
+    assert occupancy.free_matching('7?', 3) == [70, 71, 72]
+    assert occupancy.free_matching('*3', 4) == [3, 23, 33, 43]
+    assert occupancy.free_matching('1*1', 3) == [11, 111, 121]
+
+
+def test_free_matching_collapses_repeated_stars():
+    occupancy = GuildOccupancy(0, 9999)
+
+    assert occupancy.free_matching('*' * 40 + '5' + '*' * 40, 5) == occupancy.free_matching('*5*', 5)
+
+
+def test_free_matching_rejects_patterns_longer_than_the_range():
+    occupancy = GuildOccupancy(0, 999)
+
+    with pytest.raises(ValueError):
+        occupancy.free_matching('1234')
+    with pytest.raises(ValueError):
+        occupancy.free_matching('1*2*3*4*')
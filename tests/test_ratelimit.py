@@ -0,0 +1,42 @@
+"""
+Rate limit settings from the environment
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ratelimit import RateLimiter, DEFAULT_USER_LIMITS, DEFAULT_GUILD_LIMITS
+
+
+class FakeConfig:
+    def __init__(self, **values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+def test_valid_limits_override_defaults():
+    limiter = RateLimiter.from_config(FakeConfig(RATE_LIMIT_CLAIM='3/10', RATE_LIMIT_GUILD_SYNC='1/60'))
+
+    assert limiter.user_limits['claim'] == (3, 10.0)
+    assert limiter.guild_limits['sync'] == (1, 60.0)
+
+
+def test_non_positive_limits_keep_the_default():
+    limiter = RateLimiter.from_config(FakeConfig(
+        RATE_LIMIT_CLAIM='0/30',
+        RATE_LIMIT_LOOKUP='5/0',
+        RATE_LIMIT_EXPORT='-1/60',
+        RATE_LIMIT_GUILD_ADMIN='5/inf',
+        RATE_LIMIT_GUILD_SYNC='nonsense'
+    ))
+
+    for command_class in ('claim', 'lookup', 'export'):
+        assert limiter.user_limits[command_class] == DEFAULT_USER_LIMITS[command_class]
+    for command_class in ('admin', 'sync'):
+        assert limiter.guild_limits[command_class] == DEFAULT_GUILD_LIMITS[command_class]
+
+    assert limiter.hit(1, 2, 'claim') is None
@@ -0,0 +1,53 @@
+"""
+Roster export output, including on the oldest supported Python (3.10)
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from roster_export import export_roster, CSV_HEADER
+
+
+def _assignments(count):
+    async def rows():
+        for n in range(count):
+            yield {
+                'car_class': 'GT3' if n % 2 else '',
+                'car_number': n,
+                'discord_username': f'driver{n} ü',
+                'iracing_id': str(100000 + n),
+                'iracing_name': f'Driver {n}',
+                'synced_with_iracing': n % 3 == 0,
+                'claimed_at': '2026-01-02T03:04:05'
+            }
+    return rows()
+
+
+def test_csv_export_in_memory():
+    file, count = asyncio.run(export_roster(_assignments(3)))
+    with file:
+        assert isinstance(file, io.IOBase)
+        rows = list(csv.reader(io.StringIO(file.read().decode('utf-8'), newline='')))
+
+    assert count == 3
+    assert rows[0] == CSV_HEADER
+    assert rows[2] == ['GT3', '1', 'driver1 ü', '100001', 'Driver 1', 'Pending', '2026-01-02']
+
+
+def test_compressed_jsonl_export_spills_to_disk():
+    file, count = asyncio.run(export_roster(_assignments(200), fmt='jsonl', compress=True, spill_threshold=512))
+    with file:
+        assert isinstance(file, io.IOBase)
+        assert not isinstance(file, io.BytesIO)
+        lines = gzip.decompress(file.read()).decode('utf-8').splitlines()
+
+    assert count == 200
+    assert len(lines) == 200
+    assert json.loads(lines[199])['car_number'] == 199
@@ -0,0 +1,35 @@
+"""
+Shutdown runs to completion when driven through Client.run
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bot import iRacingNumberBot
+from database import Database
+
+
+def test_close_through_client_run_closes_database(tmp_path):
+    bot = iRacingNumberBot()
+    bot.db = Database(str(tmp_path / "shutdown.db"))
+    bot.holds.db = bot.db
+    steps = []
+
+    async def fake_start(token, *, reconnect=True):
+        """Stand in for the gateway: return as soon as the gateway has been closed, like start() does"""
+        await bot.db.initialize()
+        asyncio.create_task(bot.close("SIGTERM"))
+        while bot._closing_task is None:
+            await asyncio.sleep(0)
+        await bot._closing_task
+        steps.append("gateway closed")
+
+    bot.start = fake_start
+    bot.run("token", log_handler=None)
+
+    assert steps == ["gateway closed"]
+    assert bot._shutdown_task.done() and not bot._shutdown_task.cancelled()
+    assert bot.db.db is None
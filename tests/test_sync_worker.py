@@ -0,0 +1,77 @@
+"""
+Sync worker protocol: every job gets a reply, and timed-out jobs are cancelled
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sync_worker
+from sync_worker import SyncWorkerServer, SyncWorkerClient
+
+
+async def _start_server(token='secret'):
+    server = SyncWorkerServer(db=None, iracing=None, port=0, token=token)
+    task = asyncio.create_task(server.serve_forever())
+    while server.server is None:
+        await asyncio.sleep(0)
+    port = server.server.sockets[0].getsockname()[1]
+    return server, task, port
+
+
+def test_invalid_jobs_get_an_error_reply():
+    async def run():
+        server, task, port = await _start_server()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            writer.write(json.dumps({'type': 'hello', 'token': 'secret'}).encode() + b'\n')
+            assert json.loads(await reader.readline())['type'] == 'welcome'
+
+            writer.write(b'not json\n')
+            writer.write(json.dumps({'type': 'sync', 'id': 2, 'guild_id': 'x'}).encode() + b'\n')
+            writer.write(json.dumps({'type': 'resync', 'id': 3}).encode() + b'\n')
+            await writer.drain()
+
+            replies = [json.loads(await asyncio.wait_for(reader.readline(), 5)) for _ in range(3)]
+            assert [(r['type'], r['id'], r['success']) for r in replies] == [
+                ('result', None, False), ('result', 2, False), ('result', 3, False)
+            ]
+        finally:
+            writer.close()
+            task.cancel()
+
+    asyncio.run(run())
+
+
+def test_timed_out_job_is_cancelled_on_the_worker(monkeypatch):
+    state = {'cancelled': False}
+
+    async def slow_sync(db, iracing, guild_id, league_id):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            state['cancelled'] = True
+            raise
+
+    monkeypatch.setattr(sync_worker, 'perform_sync', slow_sync)
+
+    async def run():
+        server, task, port = await _start_server()
+        client = SyncWorkerClient(port=port, token='secret', timeout=0.2, cancel_timeout=5)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.submit(1, 2)
+
+            # By the time submit gives up, the worker has stopped the job
+            assert state['cancelled']
+            assert server._running is None
+        finally:
+            await client.close()
+            task.cancel()
+
+    asyncio.run(run())
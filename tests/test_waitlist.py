@@ -0,0 +1,84 @@
+"""
+Holds and waitlists in class number pools
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import Database
+
+
+async def _database(tmp_path) -> Database:
+    db = Database(str(tmp_path / "waitlist.db"))
+    await db.initialize()
+    await db.set_guild_config(1, min_number=1, max_number=99)
+    await db.set_number_pool(1, 'GT3', 1, 99)
+    return db
+
+
+def test_hold_and_confirm_in_a_class_pool(tmp_path):
+    async def run():
+        db = await _database(tmp_path)
+        try:
+            expires = datetime.utcnow() + timedelta(minutes=30)
+            held = await db.try_claim(1, 7, 10, 'driver', hold_expires_at=expires, car_class='GT3')
+            assert held['assignment']['status'] == 'held'
+
+            # The main pool's #7 is a different number
+            assert await db.confirm_hold(1, 7, 10) == 'no_hold'
+            assert await db.confirm_hold(1, 7, 10, 'GT3', now=expires + timedelta(seconds=1)) == 'expired'
+            assert await db.confirm_hold(1, 7, 10, 'GT3') == 'confirmed'
+            assert (await db.get_number_assignment(1, 7, 'GT3'))['status'] == 'claimed'
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+def test_release_hands_a_class_number_to_its_waitlist(tmp_path):
+    async def run():
+        db = await _database(tmp_path)
+        try:
+            await db.try_claim(1, 7, 10, 'holder', car_class='GT3')
+            await db.try_claim(1, 7, 30, 'main holder')
+            assert await db.join_waitlist(1, 7, 20, 'waiting', 'GT3') == 1
+            assert await db.get_user_waitlists(1, 20) == [('GT3', 7, 1)]
+
+            released, handoff = await db.release_number_with_handoff(1, 7, 10, 'GT3')
+
+            assert released
+            assert handoff['discord_user_id'] == 20 and handoff['car_class'] == 'GT3'
+            assert (await db.get_number_assignment(1, 7, 'GT3'))['discord_user_id'] == 20
+            assert (await db.get_number_assignment(1, 7))['discord_user_id'] == 30
+            assert (await db.get_occupancy(1, 'GT3')).claimed[7] == 20
+            assert await db.get_waitlist(1, 7, 'GT3') == []
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+def test_user_waitlist_positions(tmp_path):
+    async def run():
+        db = await _database(tmp_path)
+        try:
+            for number in (3, 5):
+                await db.try_claim(1, number, 10, 'holder')
+            await db.try_claim(1, 5, 10, 'holder', car_class='GT3')
+
+            await db.join_waitlist(1, 3, 20, 'first')
+            await db.join_waitlist(1, 3, 30, 'second')
+            await db.join_waitlist(1, 5, 30, 'second')
+            await db.join_waitlist(1, 5, 20, 'first', 'GT3')
+            await db.join_waitlist(1, 5, 30, 'second', 'GT3')
+
+            assert await db.get_user_waitlists(1, 30) == [('', 3, 2), ('', 5, 1), ('GT3', 5, 2)]
+            assert await db.get_user_waitlists(1, 99) == []
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,112 @@
+"""
+Tracing for iRacing Number Bot
+Lightweight spans that break a slash command down into where its time went
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Optional, List, Tuple
+
+# The trace for the interaction being handled in this task, and how deep we are in it
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar('irbot_trace', default=None)
+_current_depth: ContextVar[int] = ContextVar('irbot_span_depth', default=0)
+
+WATERFALL_WIDTH = 40
+
+
+class Trace:
+    """Spans recorded while handling one interaction"""
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        # (name, depth, start offset, duration, failed) in seconds
+        self.spans: List[Tuple[str, int, float, float, bool]] = []
+
+    def activate(self):
+        """Make this the current trace for the running task"""
+        _current_trace.set(self)
+        _current_depth.set(0)
+
+    def finish(self) -> float:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+        return self.duration
+
+    def waterfall(self) -> str:
+        """The trace as text, one bar per span positioned on a shared timeline"""
+        total = self.finish()
+        scale = WATERFALL_WIDTH / total if total > 0 else 0
+        details = " ".join(f"{key}={value}" for key, value in self.attributes.items())
+        lines = [f"{self.name} took {total * 1000:.0f}ms {details}".rstrip()]
+
+        # Spans are recorded as they end; show them in the order they started, parents first
+        for name, depth, offset, duration, failed in sorted(self.spans, key=lambda s: (s[2], s[1])):
+            start = int(offset * scale)
+            length = max(1, int(duration * scale))
+            bar = " " * start + "█" * min(length, WATERFALL_WIDTH - start)
+            marker = " !" if failed else ""
+            lines.append(
+                f"  {offset * 1000:7.0f}ms |{bar:<{WATERFALL_WIDTH}}| {duration * 1000:7.1f}ms "
+                f"{'  ' * depth}{name}{marker}"
+            )
+
+        covered = sum(duration for _, depth, _, duration, _ in self.spans if depth == 0)
+        lines.append(f"  untracked: {max(0.0, total - covered) * 1000:.0f}ms (Discord API, rendering, etc.)")
+        return "\n".join(lines)
+
+
+class span:
+    """
+    Time a block as part of the current trace; does nothing when there is none.
+
+        async with span("iracing.verify"):
+            ...
+
+    Also works as a decorator for coroutine functions.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._trace = None
+
+    def __enter__(self):
+        self._trace = _current_trace.get()
+        if self._trace:
+            self._depth = _current_depth.get()
+            self._token = _current_depth.set(self._depth + 1)
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._trace:
+            ended = time.perf_counter()
+            _current_depth.reset(self._token)
+            self._trace.spans.append((
+                self.name, self._depth, self._started - self._trace.started, ended - self._started, exc_type is not None
+            ))
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        async def traced(*args, **kwargs):
+            with span(self.name):
+                return await func(*args, **kwargs)
+        return traced
+
+
+def trace_methods(obj, prefix: str):
+    """Wrap every public coroutine method of an object in a span named prefix.method"""
+    for name, method in inspect.getmembers(obj, inspect.iscoroutinefunction):
+        if not name.startswith('_'):
+            setattr(obj, name, span(f"{prefix}.{name}")(method))